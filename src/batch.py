@@ -0,0 +1,140 @@
+"""Headless batch runner for many projects."""
+
+import json
+import os
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from typing_extensions import TypedDict
+from common import Usage
+from tracing import close_trace
+from workflows.users import ScriptedUser
+from workflows.workflow import PlaningWorkflow
+
+class BatchResult(TypedDict):
+    """
+    Represents the result of a project planned by the batch runner.
+
+    Attributes:
+        project_name (str): The name of the project.
+        session_id (str): The id of the planning session.
+        status (str): "ok" if the session finished or "error" if it failed.
+        error (str | None): The error that made the session fail.
+        wall_time (float): The duration of the session in seconds.
+        usage (Usage | None): The LLM token usage of the session.
+        report_path (str): The path of the report file.
+    """
+    project_name: str
+    session_id: str
+    status: str
+    error: str | None
+    wall_time: float
+    usage: Usage | None
+    report_path: str
+
+class BatchRunner():
+    """
+    Runs many planning sessions concurrently from a JSONL file, without console interaction.
+
+    Each line of the input file is a JSON object with the project "name" and "description"
+    and, optionally, the "answers" to the analyst questions (a list used in order or an
+    object keyed by question text) and the "max_rounds" of questionnaires.
+
+    Attributes:
+        workers (int): The maximum number of sessions running at the same time.
+        output_dir (str): The directory where the reports and the summary are written.
+        checkpointer (BaseCheckpointSaver | None): Stores the checkpoints of the sessions.
+    """
+
+    def __init__(self, workers: int = 4, output_dir: str = 'reports', checkpointer=None):
+        self.workers = workers
+        self.output_dir = output_dir
+        self.checkpointer = checkpointer
+
+    @staticmethod
+    def load(path: str) -> list[dict]:
+        """
+        Load the projects of a JSONL file.
+
+        Args:
+            path (str): The path of the JSONL file.
+
+        Returns:
+            list[dict]: The projects, one per non-empty line.
+        """
+        with open(path, "r", encoding="utf-8") as file:
+            return [json.loads(line) for line in file if line.strip()]
+
+    def run(self, projects: list[dict]) -> list[BatchResult]:
+        """
+        Plan the projects concurrently and write the summary of the sessions.
+
+        Args:
+            projects (list[dict]): The projects to plan.
+
+        Returns:
+            list[BatchResult]: The results of the sessions, in the order of the projects.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        names = set[str]()
+        paths = []
+        for project in projects:
+            slug = re.sub(r'[^a-z0-9]+', '-', project['name'].lower()).strip('-') or 'project'
+            name, index = slug, 1
+            while name in names:
+                index += 1
+                name = f"{slug}-{index}"
+            names.add(name)
+            paths.append(os.path.join(self.output_dir, f"{name}.md"))
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(self._run_project, projects, paths))
+        self._write_summary(results, time.perf_counter() - start)
+        return results
+
+    def _run_project(self, project: dict, report_path: str) -> BatchResult:
+        session_id = uuid.uuid4().hex
+        user = ScriptedUser(project.get('answers'), max_rounds=project.get('max_rounds', 3))
+        app = PlaningWorkflow(checkpointer=self.checkpointer, user=user).app
+        state = {
+            'session_id': session_id,
+            'project_name': project['name'],
+            'project_description': project['description'],
+            'report_path': report_path,
+        }
+        config = {'configurable': {'thread_id': session_id}}
+        start = time.perf_counter()
+        try:
+            state = app.invoke(state, config)
+            status, error = 'ok', None
+        except Exception as e:  # pylint: disable=broad-except
+            status, error = 'error', f"{type(e).__name__}: {e}"
+        wall_time = time.perf_counter() - start
+        close_trace(session_id).export(os.path.join(self.output_dir, 'traces'))
+        return BatchResult(
+            project_name=project['name'],
+            session_id=session_id,
+            status=status,
+            error=error,
+            wall_time=wall_time,
+            usage=state.get('usage'),
+            report_path=report_path,
+        )
+
+    def _write_summary(self, results: list[BatchResult], wall_time: float):
+        summary = {
+            'sessions': len(results),
+            'failed': sum(1 for result in results if result['status'] != 'ok'),
+            'wall_time': wall_time,
+            'total_tokens': sum((result['usage'] or {}).get('total_tokens', 0) for result in results),
+            'results': results,
+        }
+        with open(os.path.join(self.output_dir, "summary.json"), "w", encoding="utf-8") as file:
+            json.dump(summary, file, indent=2)
+        print(f"{'Project':<40} {'Status':<6} {'Time (s)':>9} {'Tokens':>9}")
+        for result in results:
+            tokens = (result['usage'] or {}).get('total_tokens', 0)
+            print(f"{result['project_name'][:40]:<40} {result['status']:<6} {result['wall_time']:>9.1f} {tokens:>9}")
+        print(f"{len(results)} sessions, {summary['failed']} failed, {wall_time:.1f}s, {summary['total_tokens']} tokens.")
@@ -0,0 +1,5 @@
+"""Offline benchmarks of the planning workflow.
+
+A regular package (not a namespace one), so it is not shadowed by the top-level
+"benchmarks" package installed by pysbd, a dependency of crewai.
+"""
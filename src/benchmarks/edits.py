@@ -0,0 +1,107 @@
+"""Offline benchmark of the description edits mode.
+
+Runs the same analysis rounds with the analyst regenerating the whole description and with
+the analyst returning edits of its sections, against the scripted stub model with a
+generation time proportional to the length of the answers, and compares the output size
+and the latency of each round.
+
+Run from the src folder:
+    python -m benchmarks.edits [--rounds N] [--growth CHARS] [--token-latency SECONDS]
+"""
+
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+def option(name: str, default):
+    """Get the value of a command line option, converted to the type of its default."""
+    if name in sys.argv and sys.argv.index(name) + 1 < len(sys.argv):
+        return type(default)(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+WORK_DIR = tempfile.mkdtemp(prefix='planning-edits-')
+os.environ['CREW_CACHE_DIR'] = os.path.join(WORK_DIR, 'cache')
+os.environ['CREW_CACHE_BYPASS'] = '1'
+os.environ['TRACE_DIR'] = os.path.join(WORK_DIR, 'traces')
+os.environ['LIBRARY_DB'] = os.path.join(WORK_DIR, 'library.db')
+
+# pylint: disable=wrong-import-position
+from benchmarks.stub import StubChatModel
+from crews.crew import AnalysisCrew
+
+def run(config: dict, edits: bool) -> list[dict]:
+    """Run the analysis rounds of one session and measure each of them."""
+    stats = {}
+    stub = StubChatModel(
+        questions=config['questions'], growth=config['growth'], token_latency=config['token_latency'], stats=stats, rounds={})
+    crew = AnalysisCrew(llm=stub, edits=edits)
+    state = {
+        'session_id': None,
+        'project_name': f"Edits Benchmark {edits}",
+        'project_description': "The project description. " * 20,
+        'queries': [],
+        'finish': False,
+    }
+    rounds = []
+    for number in range(1, config['rounds'] + 1):
+        tokens = stats.get('output_tokens', 0)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            update = crew.kickoff(state)
+        duration = time.perf_counter() - start
+        rounds.append({
+            'round': number,
+            'output_tokens': stats['output_tokens'] - tokens,
+            'description_tokens': update['revisions'][0]['description_tokens'],
+            'seconds': duration,
+        })
+        queries = [{'question': question['text'], 'answer': f"Answer {i}."} for i, question in enumerate(update['questions'])]
+        state = {
+            **state,
+            **{key: value for key, value in update.items() if key not in ('queries', 'revisions', 'description_sections')},
+            'description_sections': {**(state.get('description_sections') or {}), **(update.get('description_sections') or {})},
+            'queries': state['queries'] + queries,
+            'revisions': (state.get('revisions') or []) + update['revisions'],
+        }
+    return rounds
+
+def main():
+    """Run the benchmark, print the results and save them."""
+    config = {
+        'rounds': option('--rounds', 10),
+        'questions': option('--questions', 5),
+        'growth': option('--growth', 400),
+        'token_latency': option('--token-latency', 0.001),
+    }
+    whole = run(config, edits=False)
+    edited = run(config, edits=True)
+
+    print(f"{'Round':>5} {'Whole (tok)':>12} {'Edits (tok)':>12} {'Whole (s)':>10} {'Edits (s)':>10}")
+    for a, b in zip(whole, edited):
+        print(f"{a['round']:>5} {a['output_tokens']:>12} {b['output_tokens']:>12} {a['seconds']:>10.2f} {b['seconds']:>10.2f}")
+    totals = {
+        'whole_output_tokens': sum(result['output_tokens'] for result in whole),
+        'edits_output_tokens': sum(result['output_tokens'] for result in edited),
+        'whole_s': sum(result['seconds'] for result in whole),
+        'edits_s': sum(result['seconds'] for result in edited),
+    }
+    print(f"output tokens: {totals['whole_output_tokens']} whole, {totals['edits_output_tokens']} with edits "
+          f"({1 - totals['edits_output_tokens'] / max(totals['whole_output_tokens'], 1):.0%} fewer)")
+    print(f"analysis time: {totals['whole_s']:.2f}s whole, {totals['edits_s']:.2f}s with edits")
+
+    revision = subprocess.run(
+        ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=False).stdout.strip()
+    folder = os.path.join(os.path.dirname(__file__), 'results')
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"edits-{revision or 'local'}.json")
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'revision': revision or None, 'config': config, 'whole': whole, 'edits': edited, **totals}, file, indent=2)
+    print(f"Results saved to {path}")
+
+if __name__ == '__main__':
+    main()
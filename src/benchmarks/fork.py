@@ -0,0 +1,112 @@
+"""Offline benchmark of the Define_Requirements fork/join.
+
+Runs short planning sessions against the scripted stub model, with a different simulated
+generation time for each requirements branch, and compares the wall time of the fork with
+the duration of the slower branch and with the sum of both branches.
+
+Run from the src folder:
+    python -m benchmarks.fork [--sessions N] [--business SECONDS] [--system SECONDS]
+"""
+
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import uuid
+
+WORK_DIR = tempfile.mkdtemp(prefix='planning-fork-')
+os.environ['CREW_CACHE_DIR'] = os.path.join(WORK_DIR, 'cache')
+os.environ['CREW_CACHE_BYPASS'] = '1'
+os.environ['TRACE_DIR'] = os.path.join(WORK_DIR, 'traces')
+os.environ['LIBRARY_DB'] = os.path.join(WORK_DIR, 'library.db')
+
+# pylint: disable=wrong-import-position
+from benchmarks.stub import StubChatModel
+from tracing import close_trace
+from workflows.users import ScriptedUser
+from workflows.workflow import PlaningWorkflow
+
+BRANCHES = ('identify_business_requirements', 'identify_system_requirements')
+
+def option(name: str, default):
+    """Get the value of a command line option, converted to the type of its default."""
+    if name in sys.argv and sys.argv.index(name) + 1 < len(sys.argv):
+        return type(default)(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+def run_session(config: dict) -> dict:
+    """
+    Run one planning session and measure its requirements branches.
+
+    Args:
+        config (dict): The benchmark configuration.
+
+    Returns:
+        dict: The duration of each branch and the wall time of the fork in seconds.
+    """
+    session_id = uuid.uuid4().hex
+    stub = StubChatModel(
+        questions=3,
+        delays={'BUSINESS REQUIREMENTS': config['business'], 'SYSTEM REQUIREMENTS': config['system']},
+        stats={},
+        rounds={},
+    )
+    app = PlaningWorkflow(user=ScriptedUser([], max_rounds=1), pipelined=False, llm=stub, speculative=False).app
+    state = {
+        'session_id': session_id,
+        'project_name': f"Fork {session_id[:8]}",
+        'project_description': "The project description.",
+        'report_path': os.path.join(WORK_DIR, f"{session_id}.md"),
+    }
+    with contextlib.redirect_stdout(io.StringIO()):
+        state = app.invoke(state, {'configurable': {'thread_id': session_id}})
+    spans = [span for span in close_trace(session_id).spans if span['kind'] == 'node' and span['name'] in BRANCHES]
+    start = min(span['start'] for span in spans)
+    end = max(span['start'] + span['duration'] for span in spans)
+    return {
+        'branches': {span['name']: span['duration'] for span in spans},
+        'fork': end - start,
+        'requirements': sum(len(items) for items in (state.get('requirements') or {}).values()),
+    }
+
+def main():
+    """Run the benchmark, print the results and save them."""
+    config = {
+        'sessions': option('--sessions', 3),
+        'business': option('--business', 0.6),
+        'system': option('--system', 1.0),
+    }
+    sessions = [run_session(config) for _ in range(config['sessions'])]
+    fork = statistics.mean(session['fork'] for session in sessions)
+    slower = statistics.mean(max(session['branches'].values()) for session in sessions)
+    total = statistics.mean(sum(session['branches'].values()) for session in sessions)
+    revision = subprocess.run(
+        ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=False).stdout.strip()
+    results = {
+        'revision': revision or None,
+        'config': config,
+        'fork_s': fork,
+        'slower_branch_s': slower,
+        'sum_of_branches_s': total,
+        'fork_to_slower_ratio': fork / slower,
+        'requirements': sessions[0]['requirements'],
+    }
+
+    print(f"{config['sessions']} sessions, {results['requirements']} requirements per session")
+    print(f"fork wall time: {fork:.3f}s")
+    print(f"slower branch:  {slower:.3f}s (fork is {results['fork_to_slower_ratio']:.2f}x)")
+    print(f"sum of branches: {total:.3f}s (saved {total - fork:.3f}s)")
+
+    folder = os.path.join(os.path.dirname(__file__), 'results')
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"fork-{revision or 'local'}.json")
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+    print(f"Results saved to {path}")
+
+if __name__ == '__main__':
+    main()
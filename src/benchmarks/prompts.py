@@ -0,0 +1,99 @@
+"""Offline measurement of the prompt prefixes shared between analysis rounds.
+
+Builds the analysis and report prompts of a simulated session, round after round, and
+reports for each round the prompt size, the prefix shared with the previous prompt
+(what a provider-side prompt cache can reuse), the tokens saved at the cache discount
+and the time to build the prompt.
+
+Run from the src folder:
+    python -m benchmarks.prompts [--rounds N] [--questions N] [--discount FRACTION]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+from crews.context import estimate_tokens
+from crews.tasks import PlanningTasks, prefix_tokens
+
+def option(name: str, default):
+    """Get the value of a command line option, converted to the type of its default."""
+    if name in sys.argv and sys.argv.index(name) + 1 < len(sys.argv):
+        return type(default)(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+def shared_prefix(first: str, second: str) -> str:
+    """Get the longest common prefix of two prompts."""
+    length = 0
+    for a, b in zip(first, second):
+        if a != b:
+            break
+        length += 1
+    return first[:length]
+
+def main():
+    """Run the measurement, print the results and save them."""
+    config = {
+        'rounds': option('--rounds', 10),
+        'questions': option('--questions', 10),
+        'discount': option('--discount', 0.5),
+    }
+    tasks = PlanningTasks(metrics=False)
+    state = {
+        'project_name': "Benchmark",
+        'project_description': "The project description. " * 40,
+        'queries': [],
+        'queries_analyzed': 0,
+        'finish': False,
+    }
+    previous = None
+    rounds = []
+    for number in range(1, config['rounds'] + 1):
+        start = time.perf_counter()
+        description = tasks.initial_analysis(None, state).description
+        build_time = time.perf_counter() - start
+        cached = estimate_tokens(shared_prefix(previous, description)) if previous is not None else 0
+        rounds.append({
+            'round': number,
+            'prompt_tokens': estimate_tokens(description),
+            'static_prefix_tokens': prefix_tokens('initial_analysis'),
+            'cached_prefix_tokens': cached,
+            'saved_tokens': cached * config['discount'],
+            'build_us': 1e6 * build_time,
+        })
+        previous = description
+        state = {
+            **state,
+            'project_description': state['project_description'] + f"Details of round {number}. " * 10,
+            'queries_analyzed': len(state['queries']),
+            'queries': state['queries'] + [
+                {'question': f"Round {number} question {i}?", 'answer': f"Answer {i} of round {number}."}
+                for i in range(config['questions'])
+            ],
+        }
+    start = time.perf_counter()
+    report = tasks.final_report(None, state).description
+    report_build = time.perf_counter() - start
+
+    print(f"{'Round':>5} {'Prompt':>8} {'Cached':>8} {'Saved':>8} {'Build (us)':>11}")
+    for result in rounds:
+        print(f"{result['round']:>5} {result['prompt_tokens']:>8} {result['cached_prefix_tokens']:>8} "
+              f"{result['saved_tokens']:>8.0f} {result['build_us']:>11.0f}")
+    saved = sum(result['saved_tokens'] for result in rounds)
+    print(f"static prefix: {prefix_tokens('initial_analysis')} tokens (analysis), {prefix_tokens('final_report')} tokens (report)")
+    print(f"saved: {saved:.0f} prompt tokens over {len(rounds)} rounds at a {config['discount']:.0%} cache discount")
+    print(f"report prompt: {estimate_tokens(report)} tokens built in {1e6 * report_build:.0f}us")
+
+    revision = subprocess.run(
+        ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=False).stdout.strip()
+    folder = os.path.join(os.path.dirname(__file__), 'results')
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"prompts-{revision or 'local'}.json")
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'revision': revision or None, 'config': config, 'rounds': rounds, 'saved_tokens': saved}, file, indent=2)
+    print(f"Results saved to {path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Offline benchmark of the report generation.
+
+Generates the report of the same state with the single-shot report task and with the
+section-parallel mode, against the scripted stub model with a generation time proportional
+to the length of the answers, and compares their end-to-end latency.
+
+Run from the src folder:
+    python -m benchmarks.report [--runs N] [--token-latency SECONDS] [--latency SECONDS] [--concurrency N]
+"""
+
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+def option(name: str, default):
+    """Get the value of a command line option, converted to the type of its default."""
+    if name in sys.argv and sys.argv.index(name) + 1 < len(sys.argv):
+        return type(default)(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+WORK_DIR = tempfile.mkdtemp(prefix='planning-report-')
+os.environ['CREW_CACHE_DIR'] = os.path.join(WORK_DIR, 'cache')
+os.environ['CREW_CACHE_BYPASS'] = '1'
+os.environ['TRACE_DIR'] = os.path.join(WORK_DIR, 'traces')
+os.environ['LIBRARY_DB'] = os.path.join(WORK_DIR, 'library.db')
+os.environ['LLM_CONCURRENCY'] = str(option('--concurrency', 12))
+os.environ['WORK_CONCURRENCY'] = os.environ['LLM_CONCURRENCY']
+
+# pylint: disable=wrong-import-position
+from benchmarks.stub import StubChatModel
+from crews.crew import ReportingCrew
+
+def main():
+    """Run the benchmark, print the results and save them."""
+    config = {
+        'runs': option('--runs', 3),
+        'token_latency': option('--token-latency', 0.002),
+        'latency': option('--latency', 0.2),
+        'concurrency': int(os.environ['LLM_CONCURRENCY']),
+    }
+    stub = StubChatModel(latency=config['latency'], token_latency=config['token_latency'], stats={}, rounds={})
+    state = {
+        'session_id': None,
+        'project_name': "Report Benchmark",
+        'project_description': "The project description. " * 40,
+        'queries': [{'question': f"Question {i}?", 'answer': f"Answer {i}."} for i in range(20)],
+        'queries_analyzed': 20,
+        'report_path': os.path.join(WORK_DIR, 'report.md'),
+    }
+    latencies = {}
+    for mode, parallel in (('single', False), ('sections', True)):
+        crew = ReportingCrew(streaming=False, llm=stub, parallel=parallel)
+        latencies[mode] = []
+        for _ in range(config['runs']):
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                crew.kickoff(state)
+            latencies[mode].append(time.perf_counter() - start)
+    single = statistics.mean(latencies['single'])
+    sections = statistics.mean(latencies['sections'])
+    revision = subprocess.run(
+        ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=False).stdout.strip()
+    results = {
+        'revision': revision or None,
+        'config': config,
+        'single_s': single,
+        'sections_s': sections,
+        'speedup': single / sections,
+        'latencies': latencies,
+    }
+
+    print(f"single-shot report:      {single:.2f}s")
+    print(f"section-parallel report: {sections:.2f}s ({results['speedup']:.1f}x faster)")
+
+    folder = os.path.join(os.path.dirname(__file__), 'results')
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"report-{revision or 'local'}.json")
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+    print(f"Results saved to {path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""Load test of the async planning service against a local stub model endpoint.
+
+Starts an OpenAI-compatible HTTP endpoint answered by the scripted stub model, then runs
+many concurrent sessions through PlanningService, answering their prompts through the
+session API. The crews talk to the endpoint through the pooled HTTP clients, exactly as
+they would talk to the model provider.
+
+Run from the src folder:
+    python -m benchmarks.service [--sessions N] [--rounds N] [--questions N] [--latency SECONDS]
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def option(name: str, default):
+    """Get the value of a command line option, converted to the type of its default."""
+    if name in sys.argv and sys.argv.index(name) + 1 < len(sys.argv):
+        return type(default)(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+WORK_DIR = tempfile.mkdtemp(prefix='planning-service-')
+os.environ['CREW_CACHE_DIR'] = os.path.join(WORK_DIR, 'cache')
+os.environ['CREW_CACHE_BYPASS'] = '1'
+os.environ['TRACE_DIR'] = os.path.join(WORK_DIR, 'traces')
+os.environ['LIBRARY_DB'] = os.path.join(WORK_DIR, 'library.db')
+os.environ['REPORT_STREAMING'] = '0'
+# The number of rounds is set by the scripted answers, not by the round scheduler,
+# and the stub repeats its questions in every round, so they are not answered from the earlier rounds.
+os.environ['ANALYSIS_MAX_ROUNDS'] = '0'
+os.environ['ANALYSIS_MIN_CHANGE'] = '0'
+os.environ['ANALYSIS_MAX_DUPLICATES'] = '0'
+os.environ['QUESTION_DEDUP_THRESHOLD'] = '0'
+os.environ['OPENAI_API_KEY'] = 'stub'
+os.environ['OPENAI_MODEL_NAME'] = 'gpt-4'
+os.environ.setdefault('LLM_CONCURRENCY', '32')
+
+# pylint: disable=wrong-import-position
+from benchmarks.stub import StubChatModel
+from workflows.service import PlanningService
+
+class StubEndpoint(ThreadingHTTPServer):
+    """
+    An OpenAI-compatible chat completions endpoint answered by the stub model.
+
+    Attributes:
+        model (StubChatModel): The model that writes the answers.
+        latency (float): The simulated generation time per request in seconds.
+        connections (set): The client addresses seen, one per TCP connection.
+        requests (int): The number of requests served.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, model: StubChatModel, latency: float):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.model = model
+        self.latency = latency
+        self.connections = set()
+        self.requests = 0
+        self.lock = threading.Lock()
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Answer a chat completion request."""
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)))
+        prompt = "\n".join(str(message.get('content') or '') for message in body.get('messages') or [])
+        text = "Thought: I now can give a great answer\nFinal Answer: " + self.server.model._answer(prompt)  # pylint: disable=protected-access
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.connections.add(self.client_address)
+            self.server.requests += 1
+        prompt_tokens, completion_tokens = len(prompt) // 4, len(text) // 4
+        payload = json.dumps({
+            'id': f"stub-{self.server.requests}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+            },
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Do not log the requests."""
+
+async def run_session(service: PlanningService, index: int, config: dict) -> list[float]:
+    """
+    Run one session, answering its prompts like a user who replies immediately.
+
+    Args:
+        service (PlanningService): The planning service.
+        index (int): The number of the session.
+        config (dict): The benchmark configuration.
+
+    Returns:
+        list[float]: The round latencies of the session in seconds, from the end of a
+            questionnaire (or the start) to the first question of the next one.
+    """
+    session_id = await service.start(
+        f"Project {index}", "The project description. " * 40, os.path.join(WORK_DIR, f"report-{index}.md"))
+    latencies = list[float]()
+    waiting = time.perf_counter()
+    rounds = 0
+    while (prompt := await service.prompt(session_id)) is not None:
+        if prompt['kind'] == 'confirm':
+            rounds += 1
+            reply = 'yes' if rounds >= config['rounds'] else 'no'
+            waiting = time.perf_counter()
+        elif prompt['kind'] == 'question':
+            if waiting is not None:
+                latencies.append(time.perf_counter() - waiting)
+                waiting = None
+            reply = f"Answer to question {prompt['id']} of session {index}."
+        else:
+            reply = ''
+        await service.reply(session_id, reply)
+    await service.result(session_id)
+    return latencies
+
+async def run(config: dict, endpoint: StubEndpoint) -> dict:
+    """Run the sessions concurrently and measure them."""
+    service = PlanningService()
+    start = time.perf_counter()
+    sessions = await asyncio.gather(*(run_session(service, index, config) for index in range(config['sessions'])))
+    wall_time = time.perf_counter() - start
+    latencies = sorted(latency for session in sessions for latency in session)
+    return {
+        'wall_time_s': wall_time,
+        'sessions_per_s': config['sessions'] / wall_time,
+        'rounds': len(latencies),
+        'round_latency_ms': 1000 * statistics.mean(latencies) if latencies else 0.0,
+        'round_latency_p95_ms': 1000 * latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else 0.0,
+        'llm_requests': endpoint.requests,
+        'connections': len(endpoint.connections),
+    }
+
+def main():
+    """Run the load test, print the results and save them."""
+    config = {
+        'sessions': option('--sessions', 20),
+        'rounds': option('--rounds', 3),
+        'questions': option('--questions', 5),
+        'latency': option('--latency', 0.05),
+        'llm_concurrency': int(os.environ['LLM_CONCURRENCY']),
+    }
+    model = StubChatModel(questions=config['questions'], work={'features': 3, 'activities': 2, 'tasks': 2}, stats={}, rounds={})
+    endpoint = StubEndpoint(model, config['latency'])
+    threading.Thread(target=endpoint.serve_forever, name='stub-endpoint', daemon=True).start()
+    os.environ['OPENAI_API_BASE'] = f"http://127.0.0.1:{endpoint.server_address[1]}/v1"
+    try:
+        results = asyncio.run(run(config, endpoint))
+    finally:
+        endpoint.shutdown()
+    revision = subprocess.run(
+        ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=False).stdout.strip()
+    results = {'revision': revision or None, 'config': config, **results}
+
+    print(f"{config['sessions']} sessions in {results['wall_time_s']:.2f}s: {results['sessions_per_s']:.2f} sessions/s")
+    print(f"round latency: {results['round_latency_ms']:.0f}ms (p95 {results['round_latency_p95_ms']:.0f}ms) over {results['rounds']} rounds")
+    print(f"{results['llm_requests']} LLM requests over {results['connections']} connections")
+
+    folder = os.path.join(os.path.dirname(__file__), 'results')
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"service-{revision or 'local'}.json")
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+    print(f"Results saved to {path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Startup time benchmark of the entry-point modes.
+
+Run from the src folder:
+    python -m benchmarks.startup [--runs N]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    'graph': (
+        "from workflows.workflow import PlaningWorkflow\n"
+        "PlaningWorkflow().app.get_graph()"
+    ),
+    'sessions': (
+        "from workflows.checkpoints import SqliteCheckpointer\n"
+        "SqliteCheckpointer(':memory:').sessions()"
+    ),
+    'batch': (
+        "from batch import BatchRunner\n"
+        "from workflows.workflow import PlaningWorkflow\n"
+        "PlaningWorkflow()"
+    ),
+    'interactive': (
+        "from workflows.workflow import PlaningWorkflow\n"
+        "from workflows.checkpoints import SqliteCheckpointer\n"
+        "PlaningWorkflow(checkpointer=SqliteCheckpointer(':memory:'))"
+    ),
+    'first_crew': (
+        "from crews.crew import AnalysisCrew\n"
+        "AnalysisCrew.shared().system_analyst"
+    ),
+}
+
+def _imports(stderr: str, top: int = 5) -> list[tuple[str, float]]:
+    packages = dict[str, int]()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.startswith('  '):
+            continue
+        name = name.strip().split('.')[0]
+        packages[name] = max(packages.get(name, 0), int(cumulative))
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [(name, micros / 1000) for name, micros in ranked]
+
+def measure(mode: str, runs: int) -> dict:
+    """
+    Measure the startup time of an entry-point mode in fresh interpreters.
+
+    Args:
+        mode (str): The name of the mode.
+        runs (int): The number of runs.
+
+    Returns:
+        dict: The median, min and max wall time in ms and the slowest top-level imports.
+    """
+    times = []
+    stderr = ''
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', MODES[mode]],
+            cwd=SOURCE_DIR, capture_output=True, text=True, check=False)
+        times.append((time.perf_counter() - start) * 1000)
+        stderr = process.stderr
+        if process.returncode != 0:
+            error = stderr.strip().splitlines()[-1] if stderr.strip() else f"exit code {process.returncode}"
+            return {'error': error}
+    return {
+        'median_ms': statistics.median(times),
+        'min_ms': min(times),
+        'max_ms': max(times),
+        'imports_ms': _imports(stderr),
+    }
+
+def main():
+    """Run the benchmark and save the results."""
+    runs = int(sys.argv[sys.argv.index('--runs') + 1]) if '--runs' in sys.argv else 5
+    revision = subprocess.run(
+        ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=False).stdout.strip()
+    results = {'revision': revision or None, 'runs': runs, 'modes': {}}
+    for mode in MODES:
+        result = measure(mode, runs)
+        results['modes'][mode] = result
+        if 'error' in result:
+            print(f"{mode:<12} failed: {result['error']}")
+            continue
+        imports = ', '.join(f"{name} {ms:.0f}ms" for name, ms in result['imports_ms'])
+        print(f"{mode:<12} {result['median_ms']:>8.0f}ms  ({imports})")
+    folder = os.path.join(os.path.dirname(__file__), 'results')
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"startup-{revision or 'local'}.json")
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+    print(f"Results saved to {path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Scripted stub chat model for offline benchmarks."""
+
+import json
+import re
+import threading
+import time
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from crews.context import estimate_tokens
+
+_lock = threading.Lock()
+
+class StubChatModel(BaseChatModel):
+    """
+    A deterministic chat model that answers the planning prompts without any network access.
+
+    Analysis prompts get an updated description and `questions` new questions, or no
+    questions once the prompt says "Finish: True". Requirements prompts get `questions`
+    requirements, work breakdown prompts get the number of items set in `work` for their
+    level (3 by default), report prompts get a markdown report and report section prompts
+    get the section of their template.
+    The description grows by `growth` characters per round to mimic long sessions; when the
+    prompt asks for "edits", only the new characters are returned, as an edit of one section.
+
+    Attributes:
+        model_name (str): The model name reported to crewai (a tiktoken-known name).
+        questions (int): The number of questions generated per analysis round.
+        growth (int): The number of characters added to the description per round.
+        latency (float): The simulated generation time per call in seconds.
+        token_latency (float): The simulated generation time per word of the answer in seconds.
+        delays (dict): Extra generation time in seconds for the prompts containing each key.
+        work (dict): The number of "features", "activities" and "tasks" generated per work breakdown prompt.
+        stats (dict): The number of "calls" served, the total "generation_time" in seconds and the
+            estimated "output_tokens" of the answers, shared with the copies of the model (e.g. its streaming copies).
+    """
+
+    model_name: str = "gpt-4"
+    questions: int = 10
+    growth: int = 400
+    latency: float = 0.0
+    token_latency: float = 0.0
+    delays: dict = {}
+    work: dict = {}
+    streaming: bool = False
+    stats: dict = {}
+    rounds: dict = {}
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        start = time.perf_counter()
+        prompt = "\n".join(str(message.content) for message in messages)
+        text = "Thought: I now can give a great answer\nFinal Answer: " + self._answer(prompt)
+        latency = self.latency + sum(delay for key, delay in self.delays.items() if key in prompt)
+        latency += self.token_latency * len(text.split())
+        if latency:
+            time.sleep(latency)
+        if self.streaming and run_manager is not None:
+            for token in re.findall(r'\S+\s*', text):
+                run_manager.on_llm_new_token(token, chunk=ChatGenerationChunk(message=AIMessageChunk(content=token)))
+        with _lock:
+            self.stats['calls'] = self.stats.get('calls', 0) + 1
+            self.stats['generation_time'] = self.stats.get('generation_time', 0.0) + time.perf_counter() - start
+            self.stats['output_tokens'] = self.stats.get('output_tokens', 0) + estimate_tokens(text)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _answer(self, prompt: str) -> str:
+        name = re.search(r'Project Name: (.*)', prompt)
+        name = name.group(1).strip() if name else 'Project'
+        if 'Section Template:' in prompt:
+            heading = re.findall(r'^## .*', prompt, re.MULTILINE)[-1]
+            return f"{heading}\n" + "Details of the project. " * 20
+        if 'Project Summary Report' in prompt:
+            headings = re.findall(r'^## .*', prompt, re.MULTILINE) or [f"## Section {i}" for i in range(15)]
+            sections = '\n\n'.join(f"{heading}\n" + "Details of the project. " * 20 for heading in headings)
+            return f"# {name}\n#### Project Summary Report\n\n{sections}"
+        if '"requirements"' in prompt:
+            requirements = [
+                {'name': f"Requirement {i}", 'description': f"{name} must support aspect {i}."}
+                for i in range(self.questions)
+            ]
+            return json.dumps({'requirements': requirements})
+        if '"items"' in prompt:
+            level = next(level for level in ('features', 'activities', 'tasks') if level.upper() in prompt)
+            subjects = re.findall(r'(?:Activity|Feature): (.*)', prompt)
+            subject = subjects[-1].strip() if subjects and level != 'features' else name
+            items = [
+                {'name': f"{subject} / {level} {i}", 'description': f"The {level} {i} of {subject}."}
+                for i in range(self.work.get(level, 3))
+            ]
+            return json.dumps({'items': items})
+        with _lock:
+            current = self.rounds.get(name, 0) + 1
+            self.rounds[name] = current
+        questions = [] if 'Finish: True' in prompt else [
+            {'text': f"Round {current} question {i}: what about aspect {i} of {name}?",
+             'proposal': f"A reasonable proposal for aspect {i}." if i % 2 else ''}
+            for i in range(self.questions)
+        ]
+        if '"edits"' in prompt:
+            edit = {'section': f"Aspect {current % 8}", 'action': 'add', 'text': "It has more details. " * (self.growth // 21)}
+            return json.dumps({'edits': [edit], 'questions': questions})
+        description = f"{name} is a project. " + "It has more details. " * (self.growth * current // 21)
+        return json.dumps({'description': description, 'questions': questions})
@@ -0,0 +1,98 @@
+"""Offline benchmark of the Define_Work fan-out.
+
+Runs a planning session against the scripted stub model with many features, and compares
+the wall time of the work breakdown (features -> activities -> tasks) with the time the
+same LLM calls would take one after the other.
+
+Run from the src folder:
+    python -m benchmarks.work [--features N] [--activities N] [--tasks N] [--latency SECONDS] [--concurrency N]
+"""
+
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import uuid
+
+def option(name: str, default):
+    """Get the value of a command line option, converted to the type of its default."""
+    if name in sys.argv and sys.argv.index(name) + 1 < len(sys.argv):
+        return type(default)(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+WORK_DIR = tempfile.mkdtemp(prefix='planning-work-')
+os.environ['CREW_CACHE_DIR'] = os.path.join(WORK_DIR, 'cache')
+os.environ['CREW_CACHE_BYPASS'] = '1'
+os.environ['TRACE_DIR'] = os.path.join(WORK_DIR, 'traces')
+os.environ['LIBRARY_DB'] = os.path.join(WORK_DIR, 'library.db')
+os.environ['LLM_CONCURRENCY'] = str(option('--concurrency', 8))
+os.environ['WORK_CONCURRENCY'] = os.environ['LLM_CONCURRENCY']
+
+# pylint: disable=wrong-import-position
+from benchmarks.stub import StubChatModel
+from tracing import close_trace
+from workflows.users import ScriptedUser
+from workflows.workflow import PlaningWorkflow
+
+def main():
+    """Run the benchmark, print the results and save them."""
+    config = {
+        'features': option('--features', 30),
+        'activities': option('--activities', 4),
+        'tasks': option('--tasks', 4),
+        'latency': option('--latency', 0.2),
+        'concurrency': int(os.environ['LLM_CONCURRENCY']),
+    }
+    session_id = uuid.uuid4().hex
+    stub = StubChatModel(
+        questions=3,
+        latency=config['latency'],
+        work={level: config[level] for level in ('features', 'activities', 'tasks')},
+        stats={},
+        rounds={},
+    )
+    app = PlaningWorkflow(user=ScriptedUser([], max_rounds=1), pipelined=False, llm=stub, speculative=False).app
+    state = {
+        'session_id': session_id,
+        'project_name': f"Work {session_id[:8]}",
+        'project_description': "The project description.",
+        'report_path': os.path.join(WORK_DIR, f"{session_id}.md"),
+    }
+    with contextlib.redirect_stdout(io.StringIO()):
+        state = app.invoke(state, {'configurable': {'thread_id': session_id}})
+
+    spans = [span for span in close_trace(session_id).spans if span['kind'] == 'node']
+    stage = [span for span in spans if span['name'] in ('identify_features', 'decompose_feature', 'join_work')]
+    wall_time = max(span['start'] + span['duration'] for span in stage) - min(span['start'] for span in stage)
+    calls = 1 + config['features'] * (1 + config['activities'])
+    sequential = calls * config['latency']
+    work = state.get('work') or {}
+    revision = subprocess.run(
+        ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=False).stdout.strip()
+    results = {
+        'revision': revision or None,
+        'config': config,
+        'llm_calls': calls,
+        'wall_time_s': wall_time,
+        'sequential_estimate_s': sequential,
+        'speedup': sequential / wall_time,
+        'features': len(work),
+        'tasks': sum(len(activity['tasks']) for feature in work.values() for activity in feature['activities']),
+        'failed_features': sum(1 for feature in work.values() if feature.get('errors')),
+    }
+
+    print(f"{results['features']} features, {results['tasks']} tasks, {calls} LLM calls")
+    print(f"work breakdown: {wall_time:.2f}s (sequential estimate {sequential:.2f}s, {results['speedup']:.1f}x faster)")
+
+    folder = os.path.join(os.path.dirname(__file__), 'results')
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"work-{revision or 'local'}.json")
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+    print(f"Results saved to {path}")
+
+if __name__ == '__main__':
+    main()
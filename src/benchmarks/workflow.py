@@ -0,0 +1,169 @@
+"""Offline end-to-end benchmark of the planning workflow.
+
+Runs PlaningWorkflow against the scripted stub model and scripted user answers, so only
+the workflow itself is measured (graph overhead, prompt rendering, state copying, parsing).
+
+Run from the src folder:
+    python -m benchmarks.workflow [--sessions N] [--rounds N] [--questions N] [--description-kb N]
+                                  [--latency SECONDS] [--checkpoint] [--pipelined] [--speculative]
+                                  [--compare FILE]
+"""
+
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+WORK_DIR = tempfile.mkdtemp(prefix='planning-benchmark-')
+os.environ['CREW_CACHE_DIR'] = os.path.join(WORK_DIR, 'cache')
+os.environ['CREW_CACHE_BYPASS'] = '1'
+os.environ['TRACE_DIR'] = os.path.join(WORK_DIR, 'traces')
+os.environ['LIBRARY_DB'] = os.path.join(WORK_DIR, 'library.db')
+# The number of rounds is set by the scripted answers, not by the round scheduler,
+# and the stub repeats its questions in every round, so they are not answered from the earlier rounds.
+os.environ['ANALYSIS_MAX_ROUNDS'] = '0'
+os.environ['ANALYSIS_MIN_CHANGE'] = '0'
+os.environ['ANALYSIS_MAX_DUPLICATES'] = '0'
+os.environ['QUESTION_DEDUP_THRESHOLD'] = '0'
+
+# pylint: disable=wrong-import-position
+from benchmarks.stub import StubChatModel
+from tracing import close_trace
+from workflows.checkpoints import SqliteCheckpointer
+from workflows.users import ScriptedUser
+from workflows.workflow import PlaningWorkflow
+
+def option(name: str, default):
+    """Get the value of a command line option, converted to the type of its default."""
+    if name in sys.argv and sys.argv.index(name) + 1 < len(sys.argv):
+        return type(default)(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Get a percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def run_session(config: dict, checkpointer) -> dict:
+    """
+    Run one planning session against the stub model.
+
+    Args:
+        config (dict): The benchmark configuration.
+        checkpointer (SqliteCheckpointer | None): The checkpointer of the session.
+
+    Returns:
+        dict: The wall time, rounds, queries, node durations, prompt sizes and stub time of the session.
+    """
+    session_id = uuid.uuid4().hex
+    stub = StubChatModel(questions=config['questions'], latency=config['latency'], stats={}, rounds={})
+    answers = [f"Answer {i}: " + "a detailed answer " * 10 for i in range(config['rounds'] * config['questions'])]
+    user = ScriptedUser(answers, max_rounds=config['rounds'])
+    app = PlaningWorkflow(
+        checkpointer=checkpointer, user=user, pipelined=config['pipelined'], llm=stub,
+        speculative=config['speculative']).app
+    state = {
+        'session_id': session_id,
+        'project_name': f"Benchmark {session_id[:8]}",
+        'project_description': "The project description. " * (config['description_kb'] * 1024 // 25),
+        'report_path': os.path.join(WORK_DIR, f"{session_id}.md"),
+    }
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        state = app.invoke(state, {
+            'configurable': {'thread_id': session_id},
+            'recursion_limit': 4 * config['rounds'] + 10,
+        })
+    wall_time = time.perf_counter() - start
+    trace = close_trace(session_id)
+    nodes = dict[str, list[float]]()
+    for span in trace.spans:
+        if span['kind'] == 'node':
+            nodes.setdefault(span['name'], []).append(span['duration'])
+    prompts = [span['prompt_size'] for span in trace.spans if span['kind'] == 'crew' and span['name'] == 'initial_analysis']
+    return {
+        'wall_time': wall_time,
+        'rounds': len(nodes.get('analyze_description', [])),
+        'queries': len(state.get('queries') or []),
+        'llm_calls': stub.stats.get('calls', 0),
+        'llm_time': stub.stats.get('generation_time', 0.0),
+        'nodes': nodes,
+        'prompt_sizes': prompts,
+    }
+
+def main():
+    """Run the benchmark, print the results and save them for later comparisons."""
+    config = {
+        'sessions': option('--sessions', 3),
+        'rounds': option('--rounds', 20),
+        'questions': option('--questions', 25),
+        'description_kb': option('--description-kb', 16),
+        'latency': option('--latency', 0.0),
+        'checkpoint': '--checkpoint' in sys.argv,
+        'pipelined': '--pipelined' in sys.argv,
+        'speculative': '--speculative' in sys.argv,
+    }
+    checkpointer = SqliteCheckpointer(os.path.join(WORK_DIR, 'sessions.db')) if config['checkpoint'] else None
+    sessions = [run_session(config, checkpointer) for _ in range(config['sessions'])]
+
+    wall_time = sum(session['wall_time'] for session in sessions)
+    rounds = sum(session['rounds'] for session in sessions)
+    queries = sum(session['queries'] for session in sessions)
+    overheads = []
+    for session in sessions:
+        llm_time_per_call = session['llm_time'] / max(session['llm_calls'], 1)
+        overheads += [duration - llm_time_per_call for duration in session['nodes'].get('analyze_description', [])]
+    node_ms = {
+        name: 1000 * statistics.mean(duration for session in sessions for duration in session['nodes'].get(name, []))
+        for name in sessions[0]['nodes']
+    }
+    revision = subprocess.run(
+        ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=False).stdout.strip()
+    results = {
+        'revision': revision or None,
+        'config': config,
+        'wall_time_s': wall_time,
+        'rounds': rounds,
+        'queries': queries,
+        'rounds_per_s': rounds / wall_time,
+        'queries_per_s': queries / wall_time,
+        'round_overhead_ms': 1000 * statistics.mean(overheads) if overheads else 0.0,
+        'round_overhead_p95_ms': 1000 * percentile(overheads, 0.95),
+        'node_ms': node_ms,
+        'prompt_tokens_by_round': sessions[0]['prompt_sizes'],
+    }
+
+    print(f"{config['sessions']} sessions, {rounds} rounds, {queries} queries in {wall_time:.2f}s")
+    print(f"throughput: {results['rounds_per_s']:.1f} rounds/s, {results['queries_per_s']:.0f} queries/s")
+    print(f"round overhead: {results['round_overhead_ms']:.1f}ms (p95 {results['round_overhead_p95_ms']:.1f}ms)")
+    print("node time: " + ", ".join(f"{name} {ms:.1f}ms" for name, ms in node_ms.items()))
+    sizes = results['prompt_tokens_by_round']
+    if sizes:
+        print(f"prompt size: {sizes[0]} tokens in round 1, {sizes[-1]} tokens in round {len(sizes)}")
+
+    compare = option('--compare', '')
+    if compare:
+        with open(compare, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        for metric in ('rounds_per_s', 'queries_per_s', 'round_overhead_ms', 'round_overhead_p95_ms'):
+            before, after = baseline.get(metric), results[metric]
+            if before:
+                print(f"{metric}: {before:.2f} -> {after:.2f} ({100 * (after - before) / before:+.1f}%)")
+
+    folder = os.path.join(os.path.dirname(__file__), 'results')
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"workflow-{revision or 'local'}.json")
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+    print(f"Results saved to {path}")
+
+if __name__ == '__main__':
+    main()
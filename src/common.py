@@ -1,6 +1,9 @@
 """Global models."""
 
-from typing_extensions import TypedDict
+import re
+from collections import Counter
+
+from typing_extensions import NotRequired, TypedDict
 
 class Query(TypedDict):
     """
@@ -20,6 +23,205 @@ class Question(TypedDict):
     Attributes:
         text (str): The text of the question.
         proposal (str): The proposed answer to the question.
+        past_answer (str): The answer given to a similar question of a past project, if any.
+            It is shown to the user, and only used as the answer when the user picks it.
     """
     text: str
     proposal: str
+    past_answer: NotRequired[str]
+
+class Revision(TypedDict):
+    """
+    Represents a revision of the project description by an analysis round.
+
+    Attributes:
+        round (int): The number of the analysis round.
+        queries_analyzed (int): The number of queries the round analyzed.
+        length (int): The length of the revised description in characters.
+        change (float): The share of the words of the description changed by the round.
+        output_tokens (int): The completion tokens of the round (0 when the response was cached).
+        description_tokens (int): The estimated tokens of the whole revised description, the least
+            a round regenerating the description has to output.
+    """
+    round: int
+    queries_analyzed: int
+    length: int
+    change: float
+    output_tokens: int
+    description_tokens: int
+
+class DescriptionEdit(TypedDict):
+    """
+    Represents an edit of a section of the project description by the analyst.
+
+    Attributes:
+        section (str): The topic of the section, e.g. "Security".
+        action (str): "add" to append the text to the section or "replace" to replace the section.
+        text (str): The text of the edit.
+    """
+    section: str
+    action: str
+    text: str
+
+class Requirement(TypedDict):
+    """
+    Represents a business or system requirement of the project.
+
+    Attributes:
+        name (str): The short name of the requirement.
+        description (str): The detailed description of the requirement.
+    """
+    name: str
+    description: str
+
+class WorkItem(TypedDict):
+    """
+    Represents an item of the work breakdown of the project (a feature, an activity, or a task).
+
+    Attributes:
+        name (str): The short name of the item.
+        description (str): The detailed description of the item.
+    """
+    name: str
+    description: str
+
+class Activity(WorkItem):
+    """
+    Represents an activity of a feature and the tasks it is broken into.
+
+    Attributes:
+        tasks (list[WorkItem]): The tasks of the activity.
+    """
+    tasks: list[WorkItem]
+
+class Feature(WorkItem):
+    """
+    Represents a feature of the project and the activities it is broken into.
+
+    Attributes:
+        activities (list[Activity]): The activities of the feature.
+        errors (list[str]): The errors of the items that could not be broken down.
+    """
+    activities: list[Activity]
+    errors: list[str]
+
+class Usage(TypedDict):
+    """
+    Represents the LLM token usage of a session.
+
+    Attributes:
+        prompt_tokens (int): The number of prompt tokens.
+        completion_tokens (int): The number of completion tokens.
+        total_tokens (int): The total number of tokens.
+        successful_requests (int): The number of LLM requests.
+    """
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    successful_requests: int
+
+def add_usage(usage: Usage | None, metrics: dict | None) -> Usage:
+    """
+    Add the usage metrics of a crew kickoff to the usage of a session.
+
+    Args:
+        usage (Usage | None): The usage of the session so far.
+        metrics (dict | None): The usage metrics of the crew kickoff.
+
+    Returns:
+        Usage: The updated usage of the session.
+    """
+    usage = usage or {}
+    metrics = metrics or {}
+    return Usage(**{key: usage.get(key, 0) + metrics.get(key, 0) for key in Usage.__annotations__})
+
+def apply_edits(sections: dict[str, str] | None, edits: list[DescriptionEdit]) -> dict[str, str]:
+    """
+    Apply the edits of the analyst to the sections of the project description.
+
+    A section is matched by its topic regardless of case, and a section replaced by an empty
+    text is removed from the description.
+
+    Args:
+        sections (dict[str, str] | None): The sections of the description, by topic.
+        edits (list[DescriptionEdit]): The edits, in order.
+
+    Returns:
+        dict[str, str]: The new text of the edited sections, by topic.
+    """
+    sections = sections or {}
+    topics = {topic.lower(): topic for topic in sections}
+    changed = dict[str, str]()
+    for edit in edits:
+        topic = topics.setdefault(edit['section'].strip().lower(), edit['section'].strip())
+        current = changed.get(topic, sections.get(topic, ''))
+        text = edit['text'].strip()
+        if edit['action'] != 'replace' and current:
+            text = f"{current}\n{text}" if text else current
+        changed[topic] = text
+    return changed
+
+def render_description(sections: dict[str, str]) -> str:
+    """
+    Render the sections of the project description as text.
+
+    Args:
+        sections (dict[str, str]): The sections of the description, by topic.
+
+    Returns:
+        str: The description, with a "### " heading per section.
+    """
+    return "\n\n".join(f"### {topic}\n{text}" for topic, text in sections.items() if text.strip())
+
+def project_description(state: dict) -> str:
+    """
+    Get the project description of a state, rendering its sections when the analyst edits them.
+
+    Args:
+        state (dict): The state of the workflow.
+
+    Returns:
+        str: The description of the project.
+    """
+    sections = state.get('description_sections')
+    return render_description(sections) if sections else state.get('project_description') or ''
+
+_STOP_WORDS = frozenset((
+    'the', 'and', 'for', 'are', 'what', 'which', 'how', 'should', 'would', 'will', 'does', 'with',
+    'that', 'this', 'there', 'any', 'you', 'your', 'can', 'have', 'has', 'from', 'about', 'into',
+))
+
+def words(text: str | None) -> list[str]:
+    """
+    Split a text into the lower case words that carry its meaning.
+
+    Plural words are reduced to their singular, so "users" and "user" are the same word.
+
+    Args:
+        text (str | None): The text to split.
+
+    Returns:
+        list[str]: The words, without the short words and the common question words.
+    """
+    return [
+        word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
+        for word in re.findall(r'[a-z0-9]+', (text or '').lower())
+        if len(word) > 2 and word not in _STOP_WORDS
+    ]
+
+def change(previous: str | None, current: str | None) -> float:
+    """
+    Measure how much a text changed, from the words it gained or lost.
+
+    Args:
+        previous (str | None): The previous version of the text.
+        current (str | None): The current version of the text.
+
+    Returns:
+        float: The share of the words that changed, from 0 (same words) to 1 (no common words).
+    """
+    before, after = Counter(words(previous)), Counter(words(current))
+    total = max(sum(before.values()), sum(after.values()))
+    if total == 0:
+        return 0.0
+    return 1 - sum((before & after).values()) / total
@@ -13,17 +13,23 @@ class PlanningAgents():
 
     Methods:
         system_analyst: Represents a system analyst planning agent.
+        business_analyst: Represents a business analyst planning agent.
+        project_manager: Represents a project manager planning agent.
 
     """
 
-    def system_analyst(self):
+    def system_analyst(self, llm=None):
         """
         Represents a system analyst planning agent.
 
+        Args:
+            llm (BaseLanguageModel, optional): The language model used by the agent. Defaults to the crewai default model.
+
         Returns:
             Agent: An instance of the Agent class representing a system analyst.
 
         """
+        options = {} if llm is None else {'llm': llm}
         return Agent(
             role='Senior System Analyst',
             goal='Expand the project description by getting more information from the user.',
@@ -48,7 +54,69 @@ class PlanningAgents():
                              You will analyze the current information about the project and ask the user for more details to refine the project description.
                              You will keep asking until you have all the information you need to properly define the project or until the user asks you to proceed.
                              """),
-            memory=True,
+            memory=False,
+            verbose=True,
+            allow_delegation=False,
+            **options
+        )
+
+    def business_analyst(self, llm=None):
+        """
+        Represents a business analyst planning agent.
+
+        Args:
+            llm (BaseLanguageModel, optional): The language model used by the agent. Defaults to the crewai default model.
+
+        Returns:
+            Agent: An instance of the Agent class representing a business analyst.
+
+        """
+        options = {} if llm is None else {'llm': llm}
+        return Agent(
+            role='Senior Business Analyst',
+            goal='Identify the business requirements of the project from its description.',
+            backstory=dedent("""\
+                             You are an expert in business analysis.
+                             You are able to translate the goals of the stakeholders into clear and verifiable business requirements.
+                             You understand the business processes, the users, and the value the project must deliver.
+                             You are attentive to details and able to identify rules, policies, and constraints implied by the information provided.
+                             You will cover all the most important aspects of the business, including but not limited to:
+                                - the business goals and the expected benefits;
+                                - the users, their roles, and their needs;
+                                - the business processes and rules;
+                                - the legal, regulatory, and compliance constraints;
+                                - the success criteria and the metrics to measure them;
+                             """),
+            memory=False,
+            verbose=True,
+            allow_delegation=False,
+            **options
+        )
+
+    def project_manager(self, llm=None):
+        """
+        Represents a project manager planning agent.
+
+        Args:
+            llm (BaseLanguageModel, optional): The language model used by the agent. Defaults to the crewai default model.
+
+        Returns:
+            Agent: An instance of the Agent class representing a project manager.
+
+        """
+        options = {} if llm is None else {'llm': llm}
+        return Agent(
+            role='Senior Project Manager',
+            goal='Break the project down into features, activities, and tasks that the team can plan and execute.',
+            backstory=dedent("""\
+                             You are an expert in software project management.
+                             You are able to break down a project into a clear and complete work breakdown structure.
+                             You know how to split the work into pieces small enough to be estimated, assigned, and tracked.
+                             You are attentive to the dependencies between the pieces of work and to the deliverables of each of them.
+                             You never add work that is not required by the project.
+                             """),
+            memory=False,
             verbose=True,
-            allow_delegation=False
+            allow_delegation=False,
+            **options
         )
@@ -0,0 +1,232 @@
+"""Disk-backed cache for crew responses."""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from functools import cache
+
+
+SWEEP_INTERVAL = 300
+LOW_WATER = 0.9
+
+class ResponseCache():
+    """
+    A persistent, content-addressed cache of crew responses.
+
+    Each entry is stored as a JSON file named after the SHA-256 hash of the model,
+    the agent configuration and the rendered task text, so byte-identical prompts
+    are only paid for once. Entries expire a TTL after they were created, and the least
+    recently used entries are evicted when the cache grows beyond its size limits.
+
+    The modification time of an entry file is its creation time and its access time is
+    its last use. The size of the cache is tracked as entries are written, and the
+    directory is only scanned when a limit is exceeded (evicting down to 90% of the
+    limits, so the next writes do not scan again) or every SWEEP_INTERVAL seconds to
+    remove the expired entries.
+
+    Attributes:
+        directory (str): The directory where the entries are stored.
+        ttl (float): The time to live of an entry in seconds (0 disables expiration).
+        max_entries (int): The maximum number of entries kept on disk (0 disables the limit).
+        max_bytes (int): The maximum total size of the entries in bytes (0 disables the limit).
+        bypass (bool): When set, lookups always miss but fresh responses are still stored.
+        hits (int): The number of lookups served from the cache.
+        misses (int): The number of lookups not served from the cache.
+        evictions (int): The number of entries removed by expiration or size limits.
+    """
+
+    def __init__(self, directory: str, ttl: float = 0, max_entries: int = 0, max_bytes: int = 0, bypass: bool = False):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = None
+        self._bytes = 0
+        self._swept = 0.0
+
+    @classmethod
+    def from_env(cls) -> 'ResponseCache':
+        """
+        Create a cache configured from the CREW_CACHE_* environment variables.
+
+        Returns:
+            ResponseCache: The configured cache.
+        """
+        return cls(
+            directory=os.environ.get('CREW_CACHE_DIR') or '.cache/crews',
+            ttl=float(os.environ.get('CREW_CACHE_TTL') or 7 * 24 * 3600),
+            max_entries=int(os.environ.get('CREW_CACHE_MAX_ENTRIES') or 1000),
+            max_bytes=int(os.environ.get('CREW_CACHE_MAX_BYTES') or 50 * 1024 * 1024),
+            bypass=(os.environ.get('CREW_CACHE_BYPASS') or '').lower() in ('1', 'true', 'yes'),
+        )
+
+    @staticmethod
+    @cache
+    def shared() -> 'ResponseCache':
+        """
+        Get the cache shared by all the crews of the process.
+
+        Returns:
+            ResponseCache: The shared cache.
+        """
+        return ResponseCache.from_env()
+
+    @staticmethod
+    def key_for(agent, task) -> str:
+        """
+        Compute the cache key of a task executed by an agent.
+
+        Args:
+            agent (Agent): The agent that executes the task.
+            task (Task): The task with its rendered description.
+
+        Returns:
+            str: The hexadecimal SHA-256 digest identifying the request.
+        """
+        llm = getattr(agent, 'llm', None)
+        model = getattr(llm, 'model_name', None) or getattr(llm, 'model', None)
+        output_json = getattr(task, 'output_json', None)
+        payload = {
+            'model': str(model),
+            'temperature': getattr(llm, 'temperature', None),
+            'agent': {
+                'role': agent.role,
+                'goal': agent.goal,
+                'backstory': agent.backstory,
+            },
+            'task': {
+                'description': task.description,
+                'expected_output': task.expected_output,
+                'output_json': getattr(output_json, '__name__', None),
+            },
+        }
+        data = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> str | dict | None:
+        """
+        Get the cached response of a request.
+
+        Args:
+            key (str): The cache key of the request.
+
+        Returns:
+            str | dict | None: The cached response or None if it is missing, expired or bypassed.
+        """
+        with self._lock:
+            if self.bypass:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    entry = json.load(file)
+            except (OSError, ValueError):
+                self.misses += 1
+                return None
+            if self.ttl and time.time() - entry['created'] > self.ttl:
+                self._remove(path)
+                self.misses += 1
+                return None
+            os.utime(path, (time.time(), entry['created']))
+            self.hits += 1
+            return entry['response']
+
+    def set(self, key: str, response: str | dict):
+        """
+        Store the response of a request and evict old entries if needed.
+
+        Args:
+            key (str): The cache key of the request.
+            response (str | dict): The response to store.
+        """
+        with self._lock:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            replaced = self._size(path)
+            created = time.time()
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump({'created': created, 'response': response}, file, ensure_ascii=False)
+            os.utime(temp_path, (created, created))
+            os.replace(temp_path, path)
+            if self._entries is not None:
+                self._entries += 1 if replaced is None else 0
+                self._bytes += (self._size(path) or 0) - (replaced or 0)
+            if self._entries is None or self._over(1.0) or created - self._swept > SWEEP_INTERVAL:
+                self._evict()
+
+    def stats(self) -> dict:
+        """
+        Get the cache counters.
+
+        Returns:
+            dict: The hits, misses, hit rate and evictions of the cache.
+        """
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'evictions': self.evictions,
+        }
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    @staticmethod
+    def _size(path: str) -> int | None:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return None
+
+    def _over(self, share: float) -> bool:
+        """Whether the tracked size of the cache exceeds a share of its limits."""
+        return bool((self.max_entries and self._entries > self.max_entries * share)
+                    or (self.max_bytes and self._bytes > self.max_bytes * share))
+
+    def _remove(self, path: str):
+        size = self._size(path)
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        self.evictions += 1
+        if self._entries is not None:
+            self._entries -= 1
+            self._bytes -= size or 0
+
+    def _evict(self):
+        """Scan the cache, remove the expired entries and evict the least recently used ones down to the low water mark."""
+        self._entries = None
+        entries = []
+        now = time.time()
+        for folder in os.scandir(self.directory):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if not entry.name.endswith('.json'):
+                    continue
+                info = entry.stat()
+                if self.ttl and now - info.st_mtime > self.ttl:
+                    self._remove(entry.path)
+                    continue
+                entries.append((info.st_atime, info.st_size, entry.path))
+        entries.sort()
+        self._entries = len(entries)
+        self._bytes = sum(size for _, size, _ in entries)
+        self._swept = now
+        if not self._over(1.0):
+            return
+        for _, _, path in entries:
+            if not self._over(LOW_WATER):
+                break
+            self._remove(path)
@@ -0,0 +1,64 @@
+"""HTTP clients shared by the crews of the process."""
+
+import os
+from functools import cache
+
+@cache
+def http_clients():
+    """
+    Get the pooled HTTP clients used for every request to the model provider.
+
+    All the sessions of the process share the same connections, so concurrent sessions
+    reuse warm keep-alive connections instead of opening a new one per request.
+    The pool size is read from the LLM_MAX_CONNECTIONS environment variable (default 100)
+    and the request timeout from LLM_TIMEOUT (default 600 seconds).
+
+    Returns:
+        tuple[httpx.Client, httpx.AsyncClient]: The shared sync and async clients.
+    """
+    import httpx
+    connections = int(os.environ.get('LLM_MAX_CONNECTIONS') or 100)
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections, keepalive_expiry=60)
+    timeout = httpx.Timeout(float(os.environ.get('LLM_TIMEOUT') or 600), connect=10)
+    return httpx.Client(limits=limits, timeout=timeout), httpx.AsyncClient(limits=limits, timeout=timeout)
+
+@cache
+def default_model() -> str:
+    """
+    Get the model crewai gives to an agent created without one.
+
+    It is read from the default of the `llm` field of the crewai Agent (the OPENAI_MODEL_NAME
+    environment variable, or the default model of the installed crewai), so the agents keep
+    the model they had before their requests went through the shared HTTP clients.
+
+    Returns:
+        str: The name of the model.
+    """
+    from crewai import Agent
+    llm = Agent.model_fields['llm'].get_default(call_default_factory=True)
+    return llm.model_name
+
+def pooled_llm(model: str | None = None, timeout: float | None = None):
+    """
+    Create a chat model for an agent that sends its requests through the shared HTTP clients.
+
+    Every agent gets its own model instance, because crewai sets the callbacks of the model
+    of each agent, but the connections are shared by all of them.
+    The default model is the default model of crewai (see default_model).
+
+    Args:
+        model (str, optional): The name of the model. Defaults to the default model.
+        timeout (float, optional): The request timeout in seconds. Defaults to the timeout of the HTTP clients.
+
+    Returns:
+        ChatOpenAI: The chat model.
+    """
+    from langchain_openai import ChatOpenAI
+    client, async_client = http_clients()
+    options = {} if timeout is None else {'timeout': timeout}
+    return ChatOpenAI(
+        model=model or default_model(),
+        http_client=client,
+        http_async_client=async_client,
+        **options,
+    )
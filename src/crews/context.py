@@ -0,0 +1,174 @@
+"""Context builder for the planning prompts."""
+
+import logging
+import os
+from functools import lru_cache
+
+from typing_extensions import TypedDict
+from common import Query
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=1)
+def _encoding():
+    return tiktoken.get_encoding("cl100k_base") if tiktoken is not None else None
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens of a text.
+
+    Uses tiktoken when it is installed and falls back to ~4 characters per token.
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+def as_text(value) -> str:
+    """
+    Convert a query field to text.
+
+    Args:
+        value: The value of a question or answer, possibly wrapped in a tuple.
+
+    Returns:
+        str: The text of the value.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, (tuple, list)):
+        return ' '.join(as_text(item) for item in value)
+    return str(value)
+
+@lru_cache(maxsize=4096)
+def _compact(question: str, answer: str, width: int) -> str:
+    title = question.strip().splitlines()[0] if question.strip() else ''
+    answer = ' '.join(answer.split())
+    if len(answer) > width:
+        answer = answer[:width - 3].rstrip() + '...'
+    return f"{title} => {answer}"
+
+class ContextUsage(TypedDict):
+    """
+    Represents how much of the token budget a prompt uses.
+
+    Attributes:
+        prompt_tokens (int): The estimated number of tokens of the whole prompt.
+        budget (int): The token budget of the prompt.
+        summary_queries (int): The number of queries sent as compacted summary lines.
+        delta_queries (int): The number of new queries sent in full.
+        omitted_queries (int): The number of summary lines dropped to respect the budget.
+    """
+    prompt_tokens: int
+    budget: int
+    summary_queries: int
+    delta_queries: int
+    omitted_queries: int
+
+class ContextBuilder():
+    """
+    Builds the queries section of the planning prompts within a token budget.
+
+    Queries already seen by the analyst are folded into the updated project description,
+    so they are only sent as a compacted summary (question title and a short answer).
+    Queries answered since the last analysis round are sent in full. When the prompt
+    exceeds the budget the oldest summary lines are dropped first.
+
+    Attributes:
+        budget (int): The maximum number of tokens of a prompt.
+        answer_width (int): The maximum number of characters of an answer in the summary.
+    """
+
+    def __init__(self, budget: int = 8000, answer_width: int = 160):
+        self.budget = budget
+        self.answer_width = answer_width
+
+    @classmethod
+    def from_env(cls) -> 'ContextBuilder':
+        """
+        Create a context builder configured from the CONTEXT_* environment variables.
+
+        Returns:
+            ContextBuilder: The configured context builder.
+        """
+        return cls(
+            budget=int(os.environ.get('CONTEXT_TOKEN_BUDGET') or 8000),
+            answer_width=int(os.environ.get('CONTEXT_ANSWER_WIDTH') or 160),
+        )
+
+    def build(self, queries: list[Query] | None, analyzed: int, reserved_tokens: int) -> tuple[str, ContextUsage]:
+        """
+        Build the queries section of a prompt.
+
+        Args:
+            queries (list[Query] | None): All the queries answered by the user.
+            analyzed (int): The number of queries already seen by the analyst.
+            reserved_tokens (int): The tokens used by the rest of the prompt.
+
+        Returns:
+            tuple[str, ContextUsage]: The queries section and the budget usage of the prompt.
+        """
+        queries = queries or []
+        analyzed = min(analyzed or 0, len(queries))
+        deltas = [
+            f"{i + 1}. {as_text(query['question'])}\n{as_text(query['answer'])}\n"
+            for i, query in enumerate(queries[analyzed:], start=analyzed)
+        ]
+        summary = [
+            f"{i + 1}. {_compact(as_text(query['question']), as_text(query['answer']), self.answer_width)}"
+            for i, query in enumerate(queries[:analyzed])
+        ]
+        available = self.budget - reserved_tokens - sum(estimate_tokens(delta) for delta in deltas)
+        costs = [estimate_tokens(line) + 1 for line in summary]
+        omitted = 0
+        remaining = sum(costs)
+        while omitted < len(summary) and remaining > available:
+            remaining -= costs[omitted]
+            omitted += 1
+        summary = summary[omitted:]
+
+        output = ''
+        if summary or omitted:
+            output += "\n\nPrevious Queries (already included in the description):\n"
+            if omitted:
+                output += f"[{omitted} earlier queries omitted]\n"
+            output += ''.join(f"{line}\n" for line in summary)
+        if deltas:
+            output += "\n\nNew Queries:\n" + '\n'.join(deltas)
+
+        usage = ContextUsage(
+            prompt_tokens=reserved_tokens + estimate_tokens(output),
+            budget=self.budget,
+            summary_queries=len(summary),
+            delta_queries=len(deltas),
+            omitted_queries=omitted,
+        )
+        if usage['prompt_tokens'] > self.budget:
+            logger.warning("Prompt uses %d tokens, over the budget of %d.", usage['prompt_tokens'], self.budget)
+        return output, usage
+
+def log_usage(name: str, usage: ContextUsage):
+    """
+    Log the budget usage of a prompt.
+
+    Args:
+        name (str): The name of the prompt.
+        usage (ContextUsage): The budget usage of the prompt.
+    """
+    logger.info(
+        "%s prompt: %d/%d tokens (%.0f%%), %d new queries, %d summarized, %d omitted.",
+        name, usage['prompt_tokens'], usage['budget'], 100 * usage['prompt_tokens'] / usage['budget'],
+        usage['delta_queries'], usage['summary_queries'], usage['omitted_queries'])
@@ -1,64 +1,504 @@
 """Email filter crew."""
 
-from crewai import Crew
+import asyncio
+import contextvars
+import logging
+import os
+import sqlite3
+import threading
+import time
 
-from crews.agents import PlanningAgents
-from crews.tasks import PlanningTasks
-from crews.models import CrewOutput
-from workflows.states import AnalysisState
+from crews.cache import ResponseCache
+from crews.context import estimate_tokens
+from crews.library import project_library
+from crews.limits import is_transient, llm_slots, llm_stats, rate_limiter, single_flight, with_retries, work_pool
+from crews.memory import memory_store
+from crews.models import CrewOutput, EditsOutput, RequirementsOutput, WorkOutput
+from crews.parsing import CrewOutputParser
+from crews.routing import Route, model_router
+from workflows.states import AnalysisState, FeatureState
+from common import Activity, Feature, Question, Revision, Usage, add_usage, apply_edits, change, project_description
+from tracing import crew_span
 
-class AnalysisCrew():
+logger = logging.getLogger(__name__)
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+class PlanningCrew():
+    """
+    Base class of the planning crews.
+
+    crewai and the agents are only loaded when a crew is first kicked off, so building
+    the workflow graph stays cheap, and the crews are shared by all the workflows of the process.
+    crewai keeps the state of a kickoff on its agent (its executor, task and token counter),
+    so the crews hold no agent: every task gets a new agent with its own model instance,
+    and only the pooled HTTP clients of the model provider are shared.
+
+    Each task is served by the model routed to it (see ModelRouter), and falls back to the
+    next model of its route when the model times out or is rate limited. The calls of all the
+    crews go through the rate limiter of the process, the transient errors of the last model
+    of a route are retried (LLM_RETRIES attempts, default 3), and identical calls in flight at
+    the same time are sent once (except the streamed ones).
+
+    Attributes:
+        cache: The response cache shared by the crews.
+        llm: The language model of the agents (None for a model using the HTTP clients shared by the process).
+        router: The routes of the tasks to the models.
+    """
+
+    def __init__(self, llm=None):
+        self.cache = ResponseCache.shared()
+        self.llm = llm
+        self.router = model_router()
+        self._roles = {}
+
+    @classmethod
+    def shared(cls):
+        """
+        Get the instance of the crew shared by the process.
+
+        Returns:
+            PlanningCrew: The shared crew.
+        """
+        with _shared_lock:
+            if cls not in _shared:
+                _shared[cls] = cls()
+            return _shared[cls]
+
+    @property
+    def system_analyst(self):
+        """A new system analyst agent."""
+        return self._build_agent('system_analyst')
+
+    @property
+    def business_analyst(self):
+        """A new business analyst agent."""
+        return self._build_agent('business_analyst')
+
+    def _routed(self, name: str, task_name: str):
+        """A new agent served by the first model routed to the task."""
+        return self._build_agent(name, self.router.primary(task_name))
+
+    def _build_agent(self, name: str, route: Route | None = None, llm=None):
+        from crews.agents import PlanningAgents
+        agent = getattr(PlanningAgents(), name)(llm=llm if llm is not None else self._new_llm(route))
+        self._roles[agent.role] = name
+        return agent
+
+    def _new_llm(self, route: Route | None = None):
+        model, timeout = route or (None, None)
+        if self.llm is not None:
+            update = {'callbacks': list(self.llm.callbacks or [])}
+            return _copy_llm(self.llm, **update, model_name=model) if model else _copy_llm(self.llm, **update)
+        from crews.clients import pooled_llm
+        return pooled_llm(model, timeout)
+
+    def _lookup(self, name: str, task):
+        key = self.cache.key_for(task.agent, task)
+        response = self.cache.get(key)
+        if response is not None:
+            with crew_span(name, task) as span:
+                span['model'] = _model_name(task.agent)
+                span['cached'] = True
+        return key, response
+
+    def _run(self, name: str, task, usage) -> tuple[str, Usage]:
+        key, response = self._lookup(name, task)
+        if response is None:
+            response, usage = self._execute(name, task, usage)
+            self.cache.set(key, response)
+        return response, add_usage(usage, None)
+
+    def _execute(self, name: str, task, usage, stream=None):
+        if stream is not None:
+            response, metrics = self._call(name, task, stream)
+            return response, add_usage(usage, metrics)
+        key = self.cache.key_for(task.agent, task)
+        (response, metrics), shared = single_flight().do(key, lambda: self._call(name, task))
+        return response, add_usage(usage, None if shared else metrics)
+
+    def _call(self, name: str, task, stream=None) -> tuple[str, dict]:
+        """
+        Kick off a task on the models of its route, retrying the transient errors of the last one.
+
+        Only the first attempt is streamed: the part of its answer already forwarded cannot be
+        taken back, so the stream is interrupted when it fails and the fallbacks and retries
+        run without streaming.
+        """
+        pending = [stream]
+        failed = None
+
+        def attempt():
+            current, pending[0] = pending[0], None
+            try:
+                return self._kickoff(name, task, current, failed)
+            except BaseException:
+                if current is not None:
+                    current.interrupt()
+                raise
+
+        for fallback in self.router.routes_of(name)[1:]:
+            try:
+                return attempt()
+            except Exception as e:  # pylint: disable=broad-except
+                if not is_transient(e):
+                    raise
+                failed = _model_name(task.agent)
+                logger.warning("%s: %s failed (%s), falling back to %s.", name, failed, e, fallback.model)
+                task.agent = self._build_agent(self._roles[task.agent.role], fallback)
+        return with_retries(attempt, f"{name} ({_model_name(task.agent)})", retry=_retry_transient)
+
+    def _kickoff(self, name: str, task, stream=None, fallback: str | None = None) -> tuple[str, dict]:
+        agent = task.agent
+        if stream is not None:
+            llm = _copy_llm(agent.llm, streaming=True, callbacks=[stream])
+            task.agent = self._build_agent(self._roles[agent.role], llm=llm)
+        try:
+            return self._run_crew(name, task, stream, fallback)
+        finally:
+            task.agent = agent
+
+    def _run_crew(self, name: str, task, stream=None, fallback: str | None = None) -> tuple[str, dict]:
+        from crewai import Crew
+        crew = Crew(
+            agents=[task.agent],
+            tasks=[task],
+            verbose=stream is None
+        )
+        with crew_span(name, task) as span:
+            span['model'] = _model_name(task.agent)
+            span['cached'] = False
+            if fallback is not None:
+                span['fallback'] = fallback
+            estimated = estimate_tokens(f"{task.description}\n{task.expected_output}")
+            throttled = rate_limiter().acquire(estimated)
+            if throttled:
+                span['throttled'] = throttled
+            before = _token_counts(task.agent)
+            with llm_slots():
+                llm_stats().add(calls=1)
+                response = crew.kickoff()
+            metrics = _token_counts(task.agent)
+            metrics = {name: count - before.get(name, 0) for name, count in metrics.items()}
+            if fallback is not None:
+                logger.info("%s: served by %s after %s failed.", name, span['model'], fallback)
+            rate_limiter().settle(estimated, metrics.get('total_tokens', 0))
+            span['prompt_tokens'] = metrics.get('prompt_tokens', 0)
+            span['completion_tokens'] = metrics.get('completion_tokens', 0)
+        return response, metrics
+
+def _retry_transient(error: Exception) -> bool:
+    if not is_transient(error):
+        return False
+    llm_stats().add(retries=1)
+    return True
+
+def _copy_llm(llm, **fields):
+    """
+    Copy a language model with some of its fields changed.
+
+    pydantic's copy leaves out the fields excluded from serialization (e.g. the tags and the
+    callbacks of the langchain models), so all the fields of the model are passed to it.
+    """
+    return llm.copy(update={**llm.__dict__, **fields})
+
+def _token_counts(agent) -> dict:
+    """
+    The tokens counted by an agent so far.
+
+    crewai builds the usage metrics of a crew from the token counter of its agents, which
+    is never reset, so the usage of a kickoff is the difference of the counts around it.
+    """
+    process = getattr(agent, '_token_process', None)
+    return dict(process.get_summary()) if process is not None else {}
+
+def _model_name(agent) -> str | None:
+    llm = getattr(agent, 'llm', None)
+    return getattr(llm, 'model_name', None) or getattr(llm, 'model', None)
+
+class AnalysisCrew(PlanningCrew):
     """
     Represents a crew responsible for analysis tasks.
 
+    In the edits mode, the analyst returns edits of the sections of the description instead
+    of the whole description, so the output of a round stays small as the description grows.
+    The edits are applied to the sections held in the state, and the description is rendered
+    from them when a prompt needs it. Every round records its output tokens and the size of
+    the whole description in its revision, to compare the modes.
+
     Attributes:
         system_analyst: The system analyst agent assigned to the crew.
+        cache: The response cache shared by the crews.
+        edits: Whether the analyst edits the sections of the description (DESCRIPTION_EDITS).
     """
 
-    def __init__(self):
-        agents = PlanningAgents()
-        self.system_analyst = agents.system_analyst()
+    def __init__(self, llm=None, edits: bool | None = None):
+        super().__init__(llm)
+        if edits is None:
+            edits = (os.environ.get('DESCRIPTION_EDITS') or '').lower() in ('1', 'true', 'yes')
+        self.edits = edits
 
-    def kickoff(self, state: AnalysisState) -> AnalysisState:
+    def kickoff(self, state: AnalysisState, on_question=None) -> dict:
         """
         Kick off the crew's analysis process.
 
         Args:
             state (AnalysisState): The initial state of the analysis.
+            on_question (Callable[[Question], None], optional): Receives each question as soon as
+                the analyst generates it. Enables streaming of the analyst answer.
 
         Returns:
-            AnalysisState: The updated state of the analysis after the crew's kickoff.
+            dict: The updates of the state: the revised description (or its edited sections), its revision,
+                the new questions and the usage.
 
         """
+        from crews.tasks import PlanningTasks
         tasks = PlanningTasks()
-        crew = Crew(
-            agents=[self.system_analyst],
-            tasks=[
-                tasks.initial_analysis(self.system_analyst, state),
-            ],
-            verbose=True
+        seeded = {}
+        if self.edits and not state.get("description_sections"):
+            seeded = {"Overview": state.get("project_description") or ''}
+            state = {**state, "description_sections": seeded}
+        task = tasks.initial_analysis(self._routed('system_analyst', 'initial_analysis'), state, self.edits)
+        key, response = self._lookup("initial_analysis", task)
+        usage = state.get("usage")
+        library = project_library()
+        proposed = dict[str, Question]()
+        def propose(question: Question) -> Question:
+            if library is None:
+                return question
+            if question['text'] not in proposed:
+                proposed[question['text']] = library.propose(question, state.get("session_id"))
+            return proposed[question['text']]
+        streamed = list[Question]()
+        if response is None:
+            stream = None
+            if on_question is not None:
+                from crews.streaming import FinalAnswerStream
+                def forward(question: Question):
+                    streamed.append(question)
+                    on_question(propose(question))
+                parser = CrewOutputParser(forward)
+                stream = FinalAnswerStream(parser.feed)
+            response, usage = self._execute("initial_analysis", task, usage, stream)
+            self.cache.set(key, response)
+        result = EditsOutput.from_json(response) if self.edits else CrewOutput.from_json(response)
+        questions = [propose(question) for question in result.questions]
+        if on_question is not None:
+            sent = {question['text'] for question in streamed}
+            for question in questions:
+                if question['text'] not in sent:
+                    on_question(question)
+        analyzed = len(state.get("queries") or [])
+        number = len(state.get("revisions") or []) + 1
+        if state.get("session_id") and result.questions:
+            memory_store().remember(
+                state["session_id"], "initial_analysis",
+                f"Round {number} asked: " + " ".join(question['text'] for question in result.questions),
+                key=str(number))
+        previous = project_description(state)
+        if self.edits:
+            edited = {**seeded, **apply_edits(state["description_sections"], result.edits)}
+            description = project_description({"description_sections": {**state["description_sections"], **edited}})
+            update = {"description_sections": edited}
+        elif result.description is None:
+            logger.warning("Analysis round %d returned no description; keeping the previous one.", number)
+            description = previous
+            update = {}
+        else:
+            description = result.description
+            update = {"project_description": description}
+        output_tokens = (usage or {}).get('completion_tokens', 0) - (state.get("usage") or {}).get('completion_tokens', 0)
+        revision = Revision(
+            round=number,
+            queries_analyzed=analyzed,
+            length=len(description),
+            change=change(previous, description),
+            output_tokens=output_tokens,
+            description_tokens=estimate_tokens(description),
         )
-        response = crew.kickoff()
-        result = CrewOutput.from_json(response)
+        logger.info(
+            "Analysis round %d: %d output tokens (%s); the whole description is ~%d tokens.",
+            number, output_tokens,
+            f"{len(result.edits)} edits of {len(update['description_sections'])} sections" if self.edits else "whole description",
+            revision['description_tokens'])
+        return {
+            "usage": usage,
+            **update,
+            "questions": questions,
+            "queries_analyzed": analyzed,
+            "revisions": [revision],
+        }
+
+    async def akickoff(self, state: AnalysisState) -> dict:
+        """
+        Kick off the crew's analysis process without blocking the event loop.
+
+        crewai runs the crews synchronously, so the kickoff runs on a worker thread while
+        the event loop keeps serving the other sessions.
+
+        Args:
+            state (AnalysisState): The initial state of the analysis.
+
+        Returns:
+            dict: The updates of the state after the crew's kickoff.
+        """
+        return await asyncio.to_thread(self.kickoff, state)
+
+class RequirementsCrew(PlanningCrew):
+    """
+    Represents a crew responsible for identifying the requirements of the project.
+
+    The business and system requirements are identified by different agents, so both
+    can run at the same time in the parallel branches of the workflow. Each branch only
+    returns its own entries of the state, which are joined by the state reducers.
+
+    Attributes:
+        system_analyst: The system analyst agent identifying the system requirements.
+        business_analyst: The business analyst agent identifying the business requirements.
+        cache: The response cache shared by the crews.
+    """
+
+    def business_requirements(self, state: AnalysisState) -> dict:
+        """
+        Identify the business requirements of the project.
+
+        Args:
+            state (AnalysisState): The current state of the analysis.
+
+        Returns:
+            dict: The "business" entries of the requirements and of the branch usage.
+        """
+        from crews.tasks import PlanningTasks
+        return self._identify('business', PlanningTasks().business_requirements(
+            self._routed('business_analyst', 'business_requirements'), state))
+
+    def system_requirements(self, state: AnalysisState) -> dict:
+        """
+        Identify the system requirements of the project.
+
+        Args:
+            state (AnalysisState): The current state of the analysis.
+
+        Returns:
+            dict: The "system" entries of the requirements and of the branch usage.
+        """
+        from crews.tasks import PlanningTasks
+        return self._identify('system', PlanningTasks().system_requirements(
+            self._routed('system_analyst', 'system_requirements'), state))
+
+    def _identify(self, kind: str, task) -> dict:
+        response, usage = self._run(f"{kind}_requirements", task, None)
         return {
-            **state,
-            "project_description": result.description,
-            "questions": result.questions,
+            "requirements": {kind: RequirementsOutput.from_json(response).requirements},
+            "branch_usage": {kind: usage},
         }
 
-class ReportingCrew():
+class WorkCrew(PlanningCrew):
+    """
+    Represents a crew responsible for breaking the project down into features, activities, and tasks.
+
+    Each feature is broken down in its own branch of the workflow, and the tasks of its
+    activities are identified concurrently on the shared work pool, so the features do
+    not wait for each other. Every item is retried on its own (see PlanningCrew), and an
+    item that keeps failing is recorded in the errors of its feature instead of failing the stage.
+
+    Attributes:
+        cache: The response cache shared by the crews.
+    """
+
+    def identify_features(self, state: AnalysisState) -> dict:
+        """
+        Identify the features of the project.
+
+        Args:
+            state (AnalysisState): The current state of the analysis.
+
+        Returns:
+            dict: The identified features and the updated usage of the session.
+        """
+        from crews.tasks import PlanningTasks
+        tasks = PlanningTasks()
+        response, usage = self._run(
+            "identify_features", tasks.identify_features(self._routed('project_manager', 'identify_features'), state), state.get("usage"))
+        features = WorkOutput.from_json(response).items
+        logger.info("Identified %d features.", len(features))
+        return {
+            "features": features,
+            "usage": usage,
+        }
+
+    def decompose_feature(self, state: FeatureState) -> dict:
+        """
+        Break a feature into activities, and each activity into tasks.
+
+        Args:
+            state (FeatureState): The state of the feature branch.
+
+        Returns:
+            dict: The entries of the feature in the work breakdown and in the branch usage.
+        """
+        from crews.tasks import PlanningTasks
+        tasks = PlanningTasks()
+        feature = state["feature"]
+        usage = add_usage(None, None)
+        errors = list[str]()
+        try:
+            response, usage = self._run(
+                "identify_activities", tasks.identify_activities(self._routed('project_manager', 'identify_activities'), state), usage)
+            activities = WorkOutput.from_json(response).items
+        except Exception as e:  # pylint: disable=broad-except
+            errors.append(f"Activities: {type(e).__name__}: {e}")
+            activities = []
+
+        def breakdown(activity):
+            return self._run("identify_tasks", tasks.identify_tasks(self._routed('project_manager', 'identify_tasks'), state, activity), None)
+
+        futures = [work_pool().submit(contextvars.copy_context().run, breakdown, activity) for activity in activities]
+        results = list[Activity]()
+        for activity, future in zip(activities, futures):
+            items = []
+            try:
+                response, used = future.result()
+                usage = add_usage(usage, used)
+                items = WorkOutput.from_json(response).items
+            except Exception as e:  # pylint: disable=broad-except
+                errors.append(f"Tasks of {activity['name']}: {type(e).__name__}: {e}")
+            results.append(Activity(**activity, tasks=items))
+        logger.info(
+            "Feature '%s' broken into %d activities and %d tasks%s.",
+            feature['name'], len(results), sum(len(activity['tasks']) for activity in results),
+            f" ({len(errors)} failed)" if errors else "")
+        return {
+            "work": {feature["name"]: Feature(**feature, activities=results, errors=errors)},
+            "branch_usage": {f"feature:{feature['name']}": usage},
+        }
+
+class ReportingCrew(PlanningCrew):
     """
     A crew responsible for generating a final report based on the analysis state.
 
+    In the parallel mode, each section of the report template is written by its own task
+    at the same time, and the sections are assembled in the order of the template. A failed
+    section is retried on its own (see PlanningCrew), and the sections already written are kept in the cache.
+
     Attributes:
         system_analyst: The system analyst agent responsible for analyzing the system.
+        cache: The response cache shared by the crews.
+        streaming: Whether the report is streamed to the console and the report file as it is generated.
+        parallel: Whether the sections of the report are generated concurrently (the report is not streamed).
     """
 
-    def __init__(self):
-        agents = PlanningAgents()
-        self.system_analyst = agents.system_analyst()
+    def __init__(self, streaming: bool | None = None, llm=None, parallel: bool | None = None):
+        super().__init__(llm)
+        if streaming is None:
+            streaming = (os.environ.get('REPORT_STREAMING') or '').lower() in ('1', 'true', 'yes')
+        if parallel is None:
+            parallel = (os.environ.get('REPORT_PARALLEL') or '').lower() in ('1', 'true', 'yes')
+        self.streaming = streaming
+        self.parallel = parallel
 
-    def kickoff(self, state: AnalysisState) -> AnalysisState:
+    def kickoff(self, state: AnalysisState) -> dict:
         """
         Kick off the crew's analysis process.
 
@@ -66,21 +506,104 @@ class ReportingCrew():
             state (AnalysisState): The initial analysis state.
 
         Returns:
-            AnalysisState: The updated analysis state with the final report.
+            dict: The updates of the state: the final report and the usage.
 
         """
+        report_path = state.get("report_path") or "report.md"
+        if self.parallel:
+            response, usage = self._sections(state)
+            with open(report_path, "w", encoding="utf-8") as file:
+                file.write(response)
+            self._index(state, response)
+            return {
+                "usage": add_usage(state.get("usage"), usage),
+                "final_report": response,
+            }
+        from crews.tasks import PlanningTasks
         tasks = PlanningTasks()
-        crew = Crew(
-            agents=[self.system_analyst],
-            tasks=[
-                tasks.final_report(self.system_analyst, state),
-            ],
-            verbose=True
-        )
-        response = crew.kickoff()
-        with open("report.md", "w", encoding="utf-8") as file:
-            file.write(response)
+        task = tasks.final_report(self._routed('system_analyst', 'final_report'), state)
+        key, response = self._lookup("final_report", task)
+        usage = state.get("usage")
+        if response is not None or not self.streaming:
+            if response is None:
+                response, usage = self._execute("final_report", task, usage)
+                self.cache.set(key, response)
+            with open(report_path, "w", encoding="utf-8") as file:
+                file.write(response)
+        else:
+            response, metrics = self._stream(task, report_path)
+            usage = add_usage(usage, metrics)
+            self.cache.set(key, response)
+        self._index(state, response)
         return {
-            **state,
+            "usage": usage,
             "final_report": response,
         }
+
+    @staticmethod
+    def _index(state: AnalysisState, report: str):
+        """Add the finished session to the project library, without failing the session if it cannot."""
+        library = project_library()
+        if library is None:
+            return
+        try:
+            library.add_session({**state, "final_report": str(report)})
+        except sqlite3.Error as e:
+            logger.warning("Could not add the session to the project library: %s", e)
+
+    async def akickoff(self, state: AnalysisState) -> dict:
+        """
+        Kick off the crew's reporting process without blocking the event loop.
+
+        Args:
+            state (AnalysisState): The initial analysis state.
+
+        Returns:
+            dict: The updates of the state: the final report and the usage.
+        """
+        return await asyncio.to_thread(self.kickoff, state)
+
+    def _sections(self, state: AnalysisState) -> tuple[str, Usage]:
+        """Generate the sections of the report concurrently and assemble them in the order of the template."""
+        from crews.tasks import REPORT_SECTIONS, PlanningTasks
+        tasks = PlanningTasks()
+        start = time.perf_counter()
+
+        def generate(section: str):
+            started = time.perf_counter()
+            response, usage = self._run(
+                "report_section", tasks.report_section(self._routed('system_analyst', 'report_section'), state, section), None)
+            return str(response).strip(), usage, time.perf_counter() - started
+
+        futures = [work_pool().submit(contextvars.copy_context().run, generate, section) for section in REPORT_SECTIONS]
+        usage = add_usage(None, None)
+        parts = [f"# {state['project_name']}\n#### Project Summary Report"]
+        slowest = (0.0, '')
+        for section, future in zip(REPORT_SECTIONS, futures):
+            response, used, duration = future.result()
+            usage = add_usage(usage, used)
+            heading = section.splitlines()[0]
+            if not response.startswith('#'):
+                response = f"{heading}\n{response}"
+            parts.append(response)
+            slowest = max(slowest, (duration, heading[3:]))
+        logger.info(
+            "Report generated from %d sections in %.2fs (slowest: '%s' in %.2fs).",
+            len(REPORT_SECTIONS), time.perf_counter() - start, slowest[1], slowest[0])
+        return "\n\n".join(parts) + "\n", usage
+
+    def _stream(self, task, path: str) -> tuple[str, dict | None]:
+        from crews.streaming import FinalAnswerStream, ReportWriter, log_stream
+        writer = ReportWriter(path)
+        stream = FinalAnswerStream(writer)
+        start = time.perf_counter()
+        try:
+            response, usage = self._execute("final_report", task, None, stream)
+        except BaseException:
+            writer.close()
+            raise
+        writer.finalize(response)
+        if stream.interrupted:
+            logger.warning("The streamed report was interrupted and generated again, see %s for the whole report.", path)
+        log_stream("final_report", stream, time.perf_counter() - start)
+        return response, usage
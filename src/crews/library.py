@@ -0,0 +1,265 @@
+"""Local index of the finished planning sessions."""
+
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import cache
+
+from common import Question
+from crews.context import estimate_tokens
+from common import words
+from workflows.states import AnalysisState
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    session_id TEXT PRIMARY KEY,
+    project_name TEXT,
+    indexed REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS answers USING fts5(
+    question, answer, session_id UNINDEXED, project_name UNINDEXED, tokenize='porter unicode61');
+CREATE VIRTUAL TABLE IF NOT EXISTS sections USING fts5(
+    heading, body, session_id UNINDEXED, project_name UNINDEXED, tokenize='porter unicode61');
+"""
+
+MAX_TERMS = 32
+
+def _match(text: str) -> str | None:
+    """Build the full-text query matching any of the words of a text."""
+    terms = list(dict.fromkeys(words(text)))[:MAX_TERMS]
+    return " OR ".join(f'"{term}"' for term in terms) or None
+
+def _similarity(first: str, second: str) -> float:
+    """The cosine similarity of the sets of words of two texts."""
+    a, b = set(words(first)), set(words(second))
+    return len(a & b) / math.sqrt(len(a) * len(b)) if a and b else 0.0
+
+class ProjectLibrary():
+    """
+    A full-text index of the answered questions and the reports of the finished sessions.
+
+    New sessions start from what similar past projects already settled: the first analysis
+    prompts end with the past answers and report excerpts most relevant to the project, and
+    the questions of the analyst without a proposal show the answer given to the most similar
+    past question. A past answer belongs to another project, so it is kept apart from the
+    proposal of the analyst (see Question.past_answer) and is only used if the user picks it.
+    The index is a SQLite FTS5 database, updated when a session generates its report, and can
+    be rebuilt from the sessions of the checkpointer.
+
+    The library shares the answers of every project with the others, so it is only enabled
+    when LIBRARY_DB is set (see project_library).
+
+    Attributes:
+        path (str): The path of the SQLite file.
+        context_tokens (int): The maximum number of tokens of past answers added to a prompt (0 disables).
+        proposal_similarity (float): The similarity from which a past answer is shown (0 disables).
+    """
+
+    def __init__(self, path: str, context_tokens: int = 400, proposal_similarity: float = 0.6):
+        self.path = path
+        self.context_tokens = context_tokens
+        self.proposal_similarity = proposal_similarity
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._counters = {'indexed': 0, 'index_time': 0.0, 'queries': 0, 'query_time': 0.0, 'max_query_time': 0.0, 'proposals': 0}
+
+    @classmethod
+    def from_env(cls) -> 'ProjectLibrary':
+        """
+        Create a library configured from the LIBRARY_* environment variables.
+
+        Returns:
+            ProjectLibrary: The configured library.
+        """
+        return cls(
+            path=os.environ.get('LIBRARY_DB') or '.cache/library.db',
+            context_tokens=int(os.environ.get('LIBRARY_CONTEXT_TOKENS') or 400),
+            proposal_similarity=float(os.environ.get('LIBRARY_PROPOSAL_SIMILARITY') or 0.6),
+        )
+
+    def add_session(self, state: AnalysisState):
+        """
+        Index the answered questions and the report of a session, replacing its previous entries.
+
+        Args:
+            state (AnalysisState): The state of the session, with its final report.
+        """
+        session_id = state.get('session_id')
+        if not session_id:
+            return
+        start = time.perf_counter()
+        name = state.get('project_name')
+        answers = [
+            (query['question'], query['answer'], session_id, name)
+            for query in state.get('queries') or []
+            if query.get('question') and (query.get('answer') or '').strip()
+        ]
+        sections = [(heading, body, session_id, name) for heading, body in _sections(state.get('final_report'))]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM answers WHERE session_id = ?", (session_id,))
+                self._conn.execute("DELETE FROM sections WHERE session_id = ?", (session_id,))
+                self._conn.executemany("INSERT INTO answers VALUES (?, ?, ?, ?)", answers)
+                self._conn.executemany("INSERT INTO sections VALUES (?, ?, ?, ?)", sections)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO projects VALUES (?, ?, ?)", (session_id, name, time.time()))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._counters['indexed'] += 1
+            self._counters['index_time'] += time.perf_counter() - start
+        logger.debug("Indexed %d answers and %d report sections of session %s.", len(answers), len(sections), session_id)
+
+    def rebuild(self, checkpointer) -> int:
+        """
+        Index the finished sessions stored by a checkpointer.
+
+        Args:
+            checkpointer (SqliteCheckpointer): The checkpointer with the sessions.
+
+        Returns:
+            int: The number of sessions indexed.
+        """
+        count = 0
+        for session in checkpointer.sessions():
+            if not session['finished']:
+                continue
+            saved = checkpointer.get_tuple({'configurable': {'thread_id': session['session_id']}})
+            if saved is None:
+                continue
+            self.add_session({**saved.checkpoint['channel_values'], 'session_id': session['session_id']})
+            count += 1
+        return count
+
+    def _query(self, sql: str, parameters: tuple) -> list[tuple]:
+        start = time.perf_counter()
+        with self._lock:
+            rows = self._conn.execute(sql, parameters).fetchall()
+            elapsed = time.perf_counter() - start
+            self._counters['queries'] += 1
+            self._counters['query_time'] += elapsed
+            self._counters['max_query_time'] = max(self._counters['max_query_time'], elapsed)
+        return rows
+
+    def context(self, text: str, exclude: str | None = None) -> str:
+        """
+        Get the past answers and report excerpts most relevant to a project, for a prompt.
+
+        Args:
+            text (str): The name and description of the project.
+            exclude (str | None): The id of the current session, left out of the results.
+
+        Returns:
+            str: The section of the prompt with the past answers, or an empty string if none matches.
+        """
+        match = _match(text)
+        if self.context_tokens <= 0 or match is None:
+            return ''
+        answers = self._query(
+            "SELECT question, answer, project_name FROM answers WHERE answers MATCH ? AND session_id != ? "
+            "ORDER BY bm25(answers) LIMIT 12", (match, exclude or ''))
+        excerpts = self._query(
+            "SELECT heading, snippet(sections, 1, '', '', '...', 24), project_name FROM sections "
+            "WHERE sections MATCH ? AND session_id != ? ORDER BY bm25(sections) LIMIT 3", (match, exclude or ''))
+        lines = [f"- [{name}] {question} {answer}" for question, answer, name in answers]
+        lines += [f"- [{name}, report: {heading}] {body}" for heading, body, name in excerpts]
+        budget = self.context_tokens
+        chosen = list[str]()
+        for line in lines:
+            size = estimate_tokens(line)
+            if size <= budget:
+                chosen.append(line)
+                budget -= size
+        if not chosen:
+            return ''
+        return (
+            "\nAnswers from similar past projects (use them to propose answers, not as facts about this project):\n"
+            + "".join(f"{line}\n" for line in chosen))
+
+    def propose(self, question: Question, exclude: str | None = None) -> Question:
+        """
+        Find the answer given to the most similar past question, for a question without a proposal.
+
+        Args:
+            question (Question): The question of the analyst.
+            exclude (str | None): The id of the current session, left out of the results.
+
+        Returns:
+            Question: The question, with the past answer as its `past_answer` if one is similar enough.
+        """
+        match = _match(question['text'])
+        if question.get('proposal') or self.proposal_similarity <= 0 or match is None:
+            return question
+        rows = self._query(
+            "SELECT question, answer, project_name FROM answers WHERE answers MATCH ? AND session_id != ? "
+            "ORDER BY bm25(answers) LIMIT 5", (match, exclude or ''))
+        best, score = None, 0.0
+        for row in rows:
+            similarity = _similarity(question['text'], row[0])
+            if similarity > score:
+                best, score = row, similarity
+        if best is None or score < self.proposal_similarity:
+            return question
+        with self._lock:
+            self._counters['proposals'] += 1
+        return Question(text=question['text'], proposal='', past_answer=f"{best[1]} (as answered for {best[2]})")
+
+    def stats(self) -> dict:
+        """
+        Get the size of the index and the timings of its updates and lookups.
+
+        Returns:
+            dict: The projects indexed, the sessions indexed by the process and their average time,
+                the lookups and their average and maximum time in milliseconds, and the proposals made.
+        """
+        with self._lock:
+            projects = self._conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+            counters = dict(self._counters)
+        return {
+            'projects': projects,
+            'indexed': counters['indexed'],
+            'index_ms': 1000 * counters['index_time'] / max(counters['indexed'], 1),
+            'queries': counters['queries'],
+            'query_ms': 1000 * counters['query_time'] / max(counters['queries'], 1),
+            'max_query_ms': 1000 * counters['max_query_time'],
+            'proposals': counters['proposals'],
+        }
+
+def _sections(report: str | None) -> list[tuple[str, str]]:
+    """Split a report into its "## " sections."""
+    sections = list[tuple[str, str]]()
+    heading, body = None, list[str]()
+    for line in (report or '').splitlines():
+        if line.startswith('## '):
+            if heading is not None and ''.join(body).strip():
+                sections.append((heading, '\n'.join(body).strip()))
+            heading, body = line[3:].strip(), []
+        elif heading is not None:
+            body.append(line)
+    if heading is not None and ''.join(body).strip():
+        sections.append((heading, '\n'.join(body).strip()))
+    return sections
+
+@cache
+def project_library() -> ProjectLibrary | None:
+    """
+    Get the library of the process, or None if LIBRARY_DB is not set (or is "off").
+
+    Returns:
+        ProjectLibrary | None: The shared library.
+    """
+    if (os.environ.get('LIBRARY_DB') or 'off').lower() == 'off':
+        return None
+    return ProjectLibrary.from_env()
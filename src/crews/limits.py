@@ -0,0 +1,347 @@
+"""Limits shared by the crews of the process."""
+
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import cache
+from typing import Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+@cache
+def llm_slots() -> threading.BoundedSemaphore:
+    """
+    Get the semaphore that limits the number of concurrent crew kickoffs of the process.
+
+    The limit is read from the LLM_CONCURRENCY environment variable (default 4).
+
+    Returns:
+        threading.BoundedSemaphore: The shared semaphore.
+    """
+    return threading.BoundedSemaphore(int(os.environ.get('LLM_CONCURRENCY') or 4))
+
+@cache
+def work_pool() -> ThreadPoolExecutor:
+    """
+    Get the worker pool that runs the fan-out items of the crews (e.g. the tasks of each activity).
+
+    The size is read from the WORK_CONCURRENCY environment variable (default 8). The LLM calls
+    of the items are still limited by `llm_slots`.
+
+    Returns:
+        ThreadPoolExecutor: The shared worker pool.
+    """
+    return ThreadPoolExecutor(max_workers=int(os.environ.get('WORK_CONCURRENCY') or 8), thread_name_prefix='work')
+
+class LlmStats():
+    """
+    Counters of the LLM call layer of the process.
+
+    Attributes:
+        calls (int): The number of LLM calls sent to the provider.
+        throttled (int): The number of calls delayed by the rate limiter.
+        throttle_time (float): The total time the calls waited for the rate limiter in seconds.
+        retries (int): The number of calls retried after a transient error.
+        coalesced (int): The number of calls that shared the response of an identical call in flight.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.throttled = 0
+        self.throttle_time = 0.0
+        self.retries = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+
+    def add(self, **counts):
+        """
+        Add to the counters.
+
+        Args:
+            counts: The amount to add to each counter, by name.
+        """
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    def summary(self) -> str:
+        """
+        Describe the counters.
+
+        Returns:
+            str: The counters and the throttling and coalescing rates.
+        """
+        requests = max(self.calls + self.coalesced, 1)
+        return (
+            f"{self.calls} calls, {self.throttled} throttled ({self.throttled / max(self.calls, 1):.0%}, "
+            f"{self.throttle_time:.1f}s), {self.retries} retries, "
+            f"{self.coalesced} coalesced ({self.coalesced / requests:.0%})")
+
+@cache
+def llm_stats() -> LlmStats:
+    """
+    Get the counters of the LLM calls of the process.
+
+    Returns:
+        LlmStats: The shared counters.
+    """
+    return LlmStats()
+
+class TokenBucket():
+    """
+    A token bucket refilled at a constant rate.
+
+    The bucket can go into debt (e.g. when a call used more tokens than estimated), which
+    delays the next acquisitions until it is paid back.
+
+    Attributes:
+        rate (float): The amount refilled per second.
+        capacity (float): The maximum amount in the bucket.
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = float(per_minute)
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self, amount: float) -> float:
+        """
+        Take an amount from the bucket, or get the time to wait for it.
+
+        Args:
+            amount (float): The amount to take (at most the capacity).
+
+        Returns:
+            float: 0 if the amount was taken, or the seconds to wait before trying again.
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            if self._level >= amount:
+                self._level -= amount
+                return 0.0
+            return (amount - self._level) / self.rate
+
+    def settle(self, amount: float):
+        """
+        Take (or give back, if negative) an amount after the fact, without waiting.
+
+        Args:
+            amount (float): The amount.
+        """
+        with self._lock:
+            self._refill()
+            self._level = min(self.capacity, self._level - amount)
+
+class RateLimiter():
+    """
+    Limits the requests and tokens per minute sent to the model provider by the process.
+
+    The tokens of a call are taken up front from the estimated prompt size, and the
+    difference with the tokens reported by the provider is settled after the call.
+    A crewai kickoff counts as one request, even when the agent sends several.
+
+    Attributes:
+        requests (TokenBucket | None): The requests per minute, or None if unlimited.
+        tokens (TokenBucket | None): The tokens per minute, or None if unlimited.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def acquire(self, tokens: int) -> float:
+        """
+        Wait until a call of the given size fits in the limits.
+
+        Args:
+            tokens (int): The estimated tokens of the call.
+
+        Returns:
+            float: The time waited in seconds.
+        """
+        waited = 0.0
+        for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+            if bucket is None:
+                continue
+            while (wait := bucket.take(amount)) > 0:
+                time.sleep(wait)
+                waited += wait
+        if waited:
+            llm_stats().add(throttled=1, throttle_time=waited)
+        return waited
+
+    def settle(self, estimated: int, used: int):
+        """
+        Settle the tokens of a call once the provider reported its usage.
+
+        Args:
+            estimated (int): The tokens taken when the call was acquired.
+            used (int): The tokens used by the call.
+        """
+        if self.tokens is not None and used:
+            self.tokens.settle(used - estimated)
+
+@cache
+def rate_limiter() -> RateLimiter:
+    """
+    Get the rate limiter of the process.
+
+    The limits are read from the LLM_REQUESTS_PER_MINUTE and LLM_TOKENS_PER_MINUTE
+    environment variables (default 0, unlimited).
+
+    Returns:
+        RateLimiter: The shared rate limiter.
+    """
+    return RateLimiter(
+        float(os.environ.get('LLM_REQUESTS_PER_MINUTE') or 0),
+        float(os.environ.get('LLM_TOKENS_PER_MINUTE') or 0))
+
+class SingleFlight():
+    """
+    Coalesces concurrent identical calls: while a call with a key is in flight, the calls
+    with the same key wait for its result instead of being sent again.
+    """
+
+    def __init__(self):
+        self._flights = dict[str, Future]()
+        self._lock = threading.Lock()
+
+    def do(self, key: str, call: Callable[[], T]) -> tuple[T, bool]:
+        """
+        Run a call, or wait for the identical call in flight.
+
+        Args:
+            key (str): The key identifying identical calls.
+            call (Callable[[], T]): The call.
+
+        Returns:
+            tuple[T, bool]: The result, and whether it was shared from another call.
+
+        Raises:
+            Exception: The error of the call, also raised to the calls that waited for it.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Future()
+        if not leader:
+            llm_stats().add(coalesced=1)
+            return flight.result(), True
+        try:
+            result = call()
+            flight.set_result(result)
+            return result, False
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+@cache
+def single_flight() -> SingleFlight:
+    """
+    Get the single-flight group of the LLM calls of the process.
+
+    Returns:
+        SingleFlight: The shared group.
+    """
+    return SingleFlight()
+
+_TRANSIENT_ERRORS = frozenset((
+    'RateLimitError', 'APITimeoutError', 'Timeout', 'TimeoutError', 'TimeoutException',
+    'ReadTimeout', 'ConnectTimeout', 'PoolTimeout', 'InternalServerError', 'ServiceUnavailableError',
+))
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Whether an LLM call failed on a transient error: a timeout, a rate limit or an overload.
+
+    crewai and langchain may wrap the provider error, so the causes of the error are checked too.
+
+    Args:
+        error (BaseException): The error raised by the call.
+
+    Returns:
+        bool: True if the error is transient.
+    """
+    seen = set[int]()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if type(error).__name__ in _TRANSIENT_ERRORS or getattr(error, 'status_code', None) in (429, 502, 503, 504, 529):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+def retry_after(error: BaseException) -> float | None:
+    """
+    Get the delay requested by the provider in the Retry-After header of a failed call.
+
+    Args:
+        error (BaseException): The error raised by the call.
+
+    Returns:
+        float | None: The delay in seconds, or None if the provider did not request one.
+    """
+    seen = set[int]()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+        try:
+            return float(headers.get('retry-after'))
+        except (TypeError, ValueError):
+            error = error.__cause__ or error.__context__
+    return None
+
+def with_retries(
+        call: Callable[[], T],
+        name: str,
+        attempts: int | None = None,
+        delay: float = 1.0,
+        retry: Callable[[Exception], bool] | None = None) -> T:
+    """
+    Call a function, retrying it with a jittered exponential backoff when it fails on a transient error.
+
+    Each retry waits a random time between half and one and a half times the backoff
+    (1, 2, 4... times the delay), so the calls failed together do not retry together,
+    or the time requested by the provider (Retry-After) if it is longer. The other errors
+    (e.g. a programming or validation error) are raised at once.
+
+    Args:
+        call (Callable[[], T]): The function to call.
+        name (str): The name of the item, for the logs.
+        attempts (int | None): The maximum number of attempts. Defaults to the LLM_RETRIES
+            environment variable (default 3).
+        delay (float): The backoff before the first retry in seconds, doubled at each retry.
+        retry (Callable[[Exception], bool] | None): Whether an error can be retried. Defaults to `is_transient`.
+
+    Returns:
+        T: The result of the call.
+    """
+    attempts = attempts or int(os.environ.get('LLM_RETRIES') or 3)
+    retry = retry or is_transient
+    attempt = 1
+    while True:
+        try:
+            return call()
+        except Exception as e:  # pylint: disable=broad-except
+            if attempt >= attempts or not retry(e):
+                raise
+            wait = max(delay * 2 ** (attempt - 1) * random.uniform(0.5, 1.5), retry_after(e) or 0.0)
+            logger.warning("%s failed (attempt %d of %d), retrying in %.1fs: %s", name, attempt, attempts, wait, e)
+            time.sleep(wait)
+            attempt += 1
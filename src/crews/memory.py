@@ -0,0 +1,256 @@
+"""Memory of the agents, kept by the process."""
+
+import importlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import cache
+
+from common import words
+from crews.context import estimate_tokens
+
+class MemoryStore():
+    """
+    The interface of the memory backends of the agents, and the backend that remembers nothing.
+
+    The notes of each session are kept in their own namespace (the session id) and tagged with
+    the task that produced them, so a task recalls only the kinds of notes relevant to it.
+    """
+
+    def remember(self, namespace: str, kind: str, text: str, key: str | None = None):
+        """
+        Keep a note.
+
+        Args:
+            namespace (str): The namespace of the note, e.g. the session id.
+            kind (str): The kind of note, e.g. the name of the task that produced it.
+            text (str): The note.
+            key (str | None): The key of the note, which replaces the note of the kind with the same key.
+        """
+
+    def recall(self, namespace: str, query: str, kinds: tuple[str, ...], budget: int) -> list[str]:
+        """
+        Get the notes most relevant to a query.
+
+        Args:
+            namespace (str): The namespace of the notes.
+            query (str): The text the notes are relevant to, e.g. the prompt of a task.
+            kinds (tuple[str, ...]): The kinds of notes to recall.
+            budget (int): The maximum number of tokens of the notes.
+
+        Returns:
+            list[str]: The notes, in the order they were kept.
+        """
+        return []
+
+    def forget(self, namespace: str):
+        """
+        Forget the notes of a namespace.
+
+        Args:
+            namespace (str): The namespace.
+        """
+
+    def stats(self) -> dict:
+        """
+        Get the counters of the memory.
+
+        Returns:
+            dict: The counters.
+        """
+        return {}
+
+class _Note():
+    """A note of the local memory, with its words for the lookups."""
+
+    __slots__ = ('kind', 'key', 'text', 'terms', 'created', 'summary')
+
+    def __init__(self, kind: str, text: str, created: float, summary: bool = False, key: str | None = None):
+        self.kind = kind
+        self.key = key
+        self.text = text
+        self.terms = frozenset(words(text))
+        self.created = created
+        self.summary = summary
+
+class LocalMemory(MemoryStore):
+    """
+    A bounded in-process memory of the agents.
+
+    The memory keeps at most max_entries notes across all the namespaces: when it is full,
+    the notes of the least recently used namespace are evicted first, and the notes older
+    than max_age are dropped. When a kind of note of a namespace grows beyond compact_after
+    notes, its oldest half is compacted into a single summary note, so long sessions keep a
+    steady size and a lookup only scans a bounded number of notes.
+
+    Attributes:
+        max_entries (int): The maximum number of notes kept (0 disables the limit).
+        max_age (float): The maximum age of a note in seconds (0 disables expiration).
+        compact_after (int): The number of notes of a kind that triggers a compaction.
+        summary_chars (int): The maximum size of a summary note in characters.
+    """
+
+    def __init__(self, max_entries: int = 2000, max_age: float = 0, compact_after: int = 16, summary_chars: int = 1200):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.compact_after = max(compact_after, 2)
+        self.summary_chars = summary_chars
+        self._namespaces = OrderedDict[str, list[_Note]]()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._counters = {'notes': 0, 'recalls': 0, 'recall_time': 0.0, 'max_recall_time': 0.0, 'compactions': 0, 'evictions': 0}
+
+    @classmethod
+    def from_env(cls) -> 'LocalMemory':
+        """
+        Create a memory configured from the MEMORY_* environment variables.
+
+        Returns:
+            LocalMemory: The configured memory.
+        """
+        return cls(
+            max_entries=int(os.environ.get('MEMORY_MAX_ENTRIES') or 2000),
+            max_age=float(os.environ.get('MEMORY_MAX_AGE') or 0),
+            compact_after=int(os.environ.get('MEMORY_COMPACT_AFTER') or 16),
+            summary_chars=int(os.environ.get('MEMORY_SUMMARY_CHARS') or 1200),
+        )
+
+    def remember(self, namespace: str, kind: str, text: str, key: str | None = None):
+        text = text.strip()
+        if not text:
+            return
+        with self._lock:
+            notes = self._namespaces.pop(namespace, [])
+            self._namespaces[namespace] = notes
+            if key is not None:
+                replaced = len(notes)
+                notes[:] = [note for note in notes if note.kind != kind or note.key != key]
+                self._size -= replaced - len(notes)
+            notes.append(_Note(kind, text, time.time(), key=key))
+            self._size += 1
+            self._counters['notes'] += 1
+            if sum(1 for note in notes if note.kind == kind) > self.compact_after:
+                self._compact(notes, kind)
+            self._evict()
+
+    def _compact(self, notes: list[_Note], kind: str):
+        """Merge the oldest half of the notes of a kind into a summary note."""
+        of_kind = [note for note in notes if note.kind == kind]
+        old = of_kind[:len(of_kind) // 2 + 1]
+        share = max(self.summary_chars // len(old), 40)
+        lines = list[str]()
+        for note in old:
+            if note.summary:
+                lines.extend(note.text.splitlines())
+                continue
+            line = next((line.strip() for line in note.text.splitlines() if line.strip()), '')
+            lines.append(line if len(line) <= share else line[:share - 3].rstrip() + "...")
+        while len(lines) > 1 and sum(len(line) + 1 for line in lines) > self.summary_chars:
+            lines.pop(0)
+        summary = _Note(kind, "\n".join(lines), old[-1].created, summary=True)
+        position = notes.index(old[0])
+        merged = set(map(id, old))
+        notes[:] = [note for note in notes if id(note) not in merged]
+        notes.insert(position, summary)
+        self._size -= len(old) - 1
+        self._counters['compactions'] += 1
+
+    def _evict(self):
+        """Drop the expired notes and the notes of the least recently used namespaces beyond the limit."""
+        if self.max_age:
+            oldest = time.time() - self.max_age
+            for namespace in list(self._namespaces):
+                notes = self._namespaces[namespace]
+                kept = [note for note in notes if note.created >= oldest]
+                if len(kept) < len(notes):
+                    self._counters['evictions'] += len(notes) - len(kept)
+                    self._size -= len(notes) - len(kept)
+                    if kept:
+                        self._namespaces[namespace] = kept
+                    else:
+                        del self._namespaces[namespace]
+        while self.max_entries and self._size > self.max_entries:
+            namespace, notes = next(iter(self._namespaces.items()))
+            notes.pop(0)
+            self._size -= 1
+            self._counters['evictions'] += 1
+            if not notes:
+                del self._namespaces[namespace]
+
+    def recall(self, namespace: str, query: str, kinds: tuple[str, ...], budget: int) -> list[str]:
+        start = time.perf_counter()
+        with self._lock:
+            notes = self._namespaces.get(namespace)
+            if notes is not None:
+                self._namespaces.move_to_end(namespace)
+                notes = [note for note in notes if note.kind in kinds]
+        recalled = list[str]()
+        if notes and budget > 0:
+            terms = frozenset(words(query))
+            scored = sorted(
+                range(len(notes)),
+                key=lambda i: (len(terms & notes[i].terms) / math.sqrt(max(len(terms) * len(notes[i].terms), 1)), i),
+                reverse=True)
+            chosen = list[int]()
+            for i in scored:
+                size = estimate_tokens(notes[i].text)
+                if size <= budget:
+                    chosen.append(i)
+                    budget -= size
+            recalled = [notes[i].text for i in sorted(chosen)]
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._counters['recalls'] += 1
+            self._counters['recall_time'] += elapsed
+            self._counters['max_recall_time'] = max(self._counters['max_recall_time'], elapsed)
+        return recalled
+
+    def forget(self, namespace: str):
+        with self._lock:
+            notes = self._namespaces.pop(namespace, [])
+            self._size -= len(notes)
+
+    def stats(self) -> dict:
+        """
+        Get the counters of the memory.
+
+        Returns:
+            dict: The notes kept, the namespaces, the notes remembered, compactions and evictions,
+                the lookups and their average and maximum latency in milliseconds.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            entries, namespaces = self._size, len(self._namespaces)
+        return {
+            'entries': entries,
+            'namespaces': namespaces,
+            'notes': counters['notes'],
+            'compactions': counters['compactions'],
+            'evictions': counters['evictions'],
+            'recalls': counters['recalls'],
+            'recall_ms': 1000 * counters['recall_time'] / max(counters['recalls'], 1),
+            'max_recall_ms': 1000 * counters['max_recall_time'],
+        }
+
+@cache
+def memory_store() -> MemoryStore:
+    """
+    Get the memory of the agents of the process.
+
+    The backend is chosen by the MEMORY_BACKEND environment variable: "local" (the default)
+    for LocalMemory, "off" to remember nothing, or "package.module:Class" for a custom
+    MemoryStore, created with its from_env classmethod if it has one.
+
+    Returns:
+        MemoryStore: The shared memory.
+    """
+    backend = (os.environ.get('MEMORY_BACKEND') or 'local').strip()
+    if backend.lower() == 'local':
+        return LocalMemory.from_env()
+    if backend.lower() in ('off', 'none', '0', 'false', 'no'):
+        return MemoryStore()
+    module, _, name = backend.partition(':')
+    store = getattr(importlib.import_module(module), name)
+    return store.from_env() if hasattr(store, 'from_env') else store()
@@ -1,8 +1,8 @@
 """Models for the planning crew."""
 
-import ast
 from pydantic import BaseModel
-from common import Query, Question
+from common import DescriptionEdit, Query, Question, Requirement, WorkItem
+from crews.parsing import parse_crew_output, parse_description_edits, parse_requirements, parse_work_items
 
 class CrewInput(BaseModel):
     """
@@ -20,21 +20,73 @@ class CrewInput(BaseModel):
     finish: bool
 
 class CrewOutput(BaseModel):
-    """Represents the output of a crew."""
+    """Represents the output of a crew, without a description if none could be recovered."""
 
-    description: str
+    description: str | None = None
     questions: list[Question]
 
     @classmethod
     def from_json(cls, json_data: dict | str) -> 'CrewOutput':
         """Create a CrewOutput object from JSON data.
 
+        Partial or slightly malformed payloads are salvaged instead of failing the round.
+
         Args:
             json_data (dict | str): The JSON data representing the crew output.
 
         Returns:
             CrewOutput: The created CrewOutput object.
         """
-        if isinstance(json_data, str):
-            json_data = ast.literal_eval(json_data)
-        return cls(**json_data)
+        return cls(**parse_crew_output(json_data))
+
+class EditsOutput(BaseModel):
+    """Represents the output of an analysis crew that edits the sections of the description."""
+
+    edits: list[DescriptionEdit]
+    questions: list[Question]
+
+    @classmethod
+    def from_json(cls, json_data: dict | str) -> 'EditsOutput':
+        """Create an EditsOutput object from JSON data.
+
+        Args:
+            json_data (dict | str): The JSON data representing the crew output.
+
+        Returns:
+            EditsOutput: The created EditsOutput object.
+        """
+        return cls(**parse_description_edits(json_data))
+
+class RequirementsOutput(BaseModel):
+    """Represents the output of a requirements crew."""
+
+    requirements: list[Requirement]
+
+    @classmethod
+    def from_json(cls, json_data: dict | str) -> 'RequirementsOutput':
+        """Create a RequirementsOutput object from JSON data.
+
+        Args:
+            json_data (dict | str): The JSON data representing the crew output.
+
+        Returns:
+            RequirementsOutput: The created RequirementsOutput object.
+        """
+        return cls(requirements=parse_requirements(json_data))
+
+class WorkOutput(BaseModel):
+    """Represents the output of a work breakdown crew."""
+
+    items: list[WorkItem]
+
+    @classmethod
+    def from_json(cls, json_data: dict | str) -> 'WorkOutput':
+        """Create a WorkOutput object from JSON data.
+
+        Args:
+            json_data (dict | str): The JSON data representing the crew output.
+
+        Returns:
+            WorkOutput: The created WorkOutput object.
+        """
+        return cls(items=parse_work_items(json_data))
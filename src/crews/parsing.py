@@ -0,0 +1,282 @@
+"""Tolerant and incremental parsing of the analyst output."""
+
+import ast
+import json
+import logging
+import re
+from typing import Callable
+
+from common import DescriptionEdit, Question, Requirement, WorkItem
+
+logger = logging.getLogger(__name__)
+
+class _Frame():
+    def __init__(self, kind: str, key: str | None):
+        self.kind = kind
+        self.key = key
+        self.pending_key = None
+
+class CrewOutputParser():
+    """
+    Incrementally parses the JSON of a CrewOutput as it is generated.
+
+    Every complete object of the "questions" array is handed to `on_question` as soon as
+    its closing brace is received, and the "description" is captured once its string ends.
+    Anything before the first "{" (code fences, reasoning text) is ignored, and whatever
+    was complete is kept when the payload is truncated or malformed.
+
+    Attributes:
+        on_question (Callable[[Question], None] | None): Receives each question as soon as it is complete.
+        description (str | None): The project description, once complete.
+        questions (list[Question]): The complete questions received so far.
+    """
+
+    def __init__(self, on_question: Callable[[Question], None] | None = None):
+        self.on_question = on_question
+        self.description = None
+        self.questions = list[Question]()
+        self._text = ''
+        self._position = 0
+        self._started = False
+        self._stack = list[_Frame]()
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = None
+        self._item_start = None
+
+    def feed(self, chunk: str):
+        """
+        Parse a new chunk of the output.
+
+        Args:
+            chunk (str): The next characters of the output.
+        """
+        self._text += chunk
+        text = self._text
+        while self._position < len(text):
+            index = self._position
+            char = text[index]
+            self._position += 1
+            if not self._started:
+                if char == '{':
+                    self._started = True
+                    self._stack.append(_Frame('{', None))
+                continue
+            if not self._stack:
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._end_string(text[self._string_start:index + 1])
+                continue
+            frame = self._stack[-1]
+            if char == '"':
+                self._in_string = True
+                self._string_start = index
+            elif char == ':' and frame.kind == '{':
+                frame.pending_key = self._last_string
+            elif char == ',' and frame.kind == '{':
+                frame.pending_key = None
+            elif char in '{[':
+                key = frame.pending_key if frame.kind == '{' else frame.key
+                if char == '{' and self._in_questions():
+                    self._item_start = index
+                self._stack.append(_Frame(char, key))
+            elif char in '}]':
+                self._stack.pop()
+                if char == '}' and self._item_start is not None and self._in_questions():
+                    self._end_question(text[self._item_start:index + 1])
+                    self._item_start = None
+
+    def _in_questions(self) -> bool:
+        return len(self._stack) == 2 and self._stack[-1].kind == '[' and self._stack[-1].key == 'questions'
+
+    def _end_string(self, raw: str):
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = raw[1:-1]
+        self._last_string = value
+        frame = self._stack[-1]
+        if len(self._stack) == 1 and frame.pending_key == 'description':
+            self.description = value
+
+    def _end_question(self, raw: str):
+        try:
+            item = json.loads(raw)
+        except ValueError:
+            try:
+                item = ast.literal_eval(raw)
+            except (ValueError, SyntaxError):
+                logger.warning("Skipping malformed question: %s", raw[:80])
+                return
+        question = to_question(item)
+        if question is None:
+            return
+        self.questions.append(question)
+        if self.on_question is not None:
+            self.on_question(question)
+
+    def partial_description(self) -> str | None:
+        """
+        Get the description, salvaging it when its string was cut off.
+
+        Returns:
+            str | None: The complete or partial description, or None if it was never started.
+        """
+        if self.description is not None:
+            return self.description
+        match = re.search(r'"description"\s*:\s*"((?:[^"\\]|\\.)*)', self._text)
+        if match is None:
+            return None
+        try:
+            return json.loads(f'"{match.group(1)}"')
+        except ValueError:
+            return match.group(1)
+
+def to_question(item) -> Question | None:
+    """
+    Normalize a parsed question.
+
+    Args:
+        item: The parsed question, usually a dict with "text" and "proposal".
+
+    Returns:
+        Question | None: The question or None if it has no text.
+    """
+    if isinstance(item, str):
+        item = {'text': item}
+    if not isinstance(item, dict) or not item.get('text'):
+        return None
+    return Question(text=str(item['text']), proposal=str(item.get('proposal') or ''))
+
+def _strip(text: str) -> str:
+    text = text.strip()
+    fence = re.match(r'^```[a-zA-Z]*\s*(.*?)\s*```$', text, re.DOTALL)
+    if fence:
+        text = fence.group(1)
+    start, end = text.find('{'), text.rfind('}')
+    return text[start:end + 1] if start >= 0 and end > start else text
+
+def load_json(text: str) -> dict | None:
+    """
+    Load the JSON object of a crew output, tolerating code fences, trailing commas and Python literals.
+
+    Args:
+        text (str): The output of the crew.
+
+    Returns:
+        dict | None: The parsed object or None if the output is not a complete object.
+    """
+    text = _strip(text)
+    for attempt in (json.loads, lambda t: json.loads(re.sub(r',\s*([}\]])', r'\1', t)), ast.literal_eval):
+        try:
+            parsed = attempt(text)
+            return parsed if isinstance(parsed, dict) else None
+        except (ValueError, SyntaxError):
+            continue
+    return None
+
+def parse_crew_output(data: dict | str) -> dict:
+    """
+    Parse the analyst output, salvaging partial or slightly malformed payloads.
+
+    Tries strict JSON, JSON without trailing commas and Python literals before falling back
+    to the incremental parser, which keeps the description and every complete question.
+
+    Args:
+        data (dict | str): The output of the analysis crew.
+
+    Returns:
+        dict: The "description" and normalized "questions" of the output. The description is None
+            when none could be recovered, so the caller keeps the previous one.
+    """
+    if isinstance(data, str):
+        parsed = load_json(data)
+        if parsed is None:
+            parser = CrewOutputParser()
+            parser.feed(data)
+            logger.warning("Salvaged a malformed analyst output with %d questions.", len(parser.questions))
+            return {'description': parser.partial_description() or None, 'questions': parser.questions}
+        data = parsed
+    questions = [to_question(item) for item in data.get('questions') or []]
+    return {
+        'description': str(data['description']) if data.get('description') else None,
+        'questions': [question for question in questions if question is not None],
+    }
+
+def parse_description_edits(data: dict | str) -> dict:
+    """
+    Parse the analyst output in the description edits mode, salvaging the questions of malformed payloads.
+
+    Args:
+        data (dict | str): The output of the analysis crew.
+
+    Returns:
+        dict: The normalized "edits" and "questions" of the output.
+    """
+    if isinstance(data, str):
+        parsed = load_json(data)
+        if parsed is None:
+            parser = CrewOutputParser()
+            parser.feed(data)
+            logger.warning("Salvaged a malformed analyst output with %d questions and no edits.", len(parser.questions))
+            return {'edits': [], 'questions': parser.questions}
+        data = parsed
+    edits = list[DescriptionEdit]()
+    for item in data.get('edits') or []:
+        if isinstance(item, dict) and item.get('section'):
+            action = str(item.get('action') or 'add').lower()
+            edits.append(DescriptionEdit(
+                section=str(item['section']),
+                action='replace' if action == 'replace' else 'add',
+                text=str(item.get('text') or '')))
+    questions = [to_question(item) for item in data.get('questions') or []]
+    return {
+        'edits': edits,
+        'questions': [question for question in questions if question is not None],
+    }
+
+def _named_items(data: dict | str, key: str) -> list[dict]:
+    if isinstance(data, str):
+        parsed = load_json(data)
+        if parsed is None:
+            logger.warning("Ignored a malformed %s output.", key)
+            return []
+        data = parsed
+    items = list[dict]()
+    for item in data.get(key) or []:
+        if isinstance(item, str):
+            item = {'description': item}
+        if isinstance(item, dict) and (item.get('name') or item.get('description')):
+            items.append({'name': str(item.get('name') or ''), 'description': str(item.get('description') or '')})
+    return items
+
+def parse_requirements(data: dict | str) -> list[Requirement]:
+    """
+    Parse the requirements listed by a requirements crew.
+
+    Args:
+        data (dict | str): The output of the crew.
+
+    Returns:
+        list[Requirement]: The requirements with a name or a description.
+    """
+    return [Requirement(**item) for item in _named_items(data, 'requirements')]
+
+def parse_work_items(data: dict | str) -> list[WorkItem]:
+    """
+    Parse the features, activities or tasks listed by the work crew.
+
+    Args:
+        data (dict | str): The output of the crew.
+
+    Returns:
+        list[WorkItem]: The items with a name or a description.
+    """
+    return [WorkItem(**item) for item in _named_items(data, 'items')]
@@ -0,0 +1,89 @@
+"""Routing of the crew tasks to models."""
+
+import os
+from functools import cache
+from typing import NamedTuple
+
+class Route(NamedTuple):
+    """
+    A model that can serve a task.
+
+    Attributes:
+        model (str | None): The name of the model, or None for the default model of the crew (see default_model).
+        timeout (float | None): The request timeout in seconds, or None for the timeout of the HTTP clients.
+    """
+    model: str | None
+    timeout: float | None
+
+class ModelRouter():
+    """
+    Chooses the models that serve each task, in order of preference.
+
+    The routes are read from the LLM_ROUTE_<TASK> environment variables, one per task name
+    (e.g. LLM_ROUTE_INITIAL_ANALYSIS=gpt-4o-mini,gpt-4o), as a comma separated list of
+    models: the first one serves the task and the others are its fallbacks, used in order when
+    the previous one times out or is rate limited. Every model of a route but the last uses
+    the LLM_FALLBACK_TIMEOUT timeout (default: the timeout of the HTTP clients), so a slow
+    model falls back before the session stalls. The tasks without a route use the default model.
+
+    Attributes:
+        routes (dict[str, list[str]]): The models of the routed tasks, by task name.
+        fallback_timeout (float | None): The request timeout of the models that have a fallback.
+    """
+
+    def __init__(self, routes: dict[str, list[str]] | None = None, fallback_timeout: float | None = None):
+        self.routes = routes or {}
+        self.fallback_timeout = fallback_timeout
+
+    @classmethod
+    def from_env(cls) -> 'ModelRouter':
+        """
+        Create a router configured by the environment variables.
+
+        Returns:
+            ModelRouter: The router.
+        """
+        prefix = 'LLM_ROUTE_'
+        routes = {
+            name[len(prefix):].lower(): [model.strip() for model in value.split(',') if model.strip()]
+            for name, value in os.environ.items()
+            if name.startswith(prefix) and value.strip()
+        }
+        return cls(routes, float(os.environ.get('LLM_FALLBACK_TIMEOUT') or 0) or None)
+
+    def routes_of(self, name: str) -> list[Route]:
+        """
+        Get the models that can serve a task, in order of preference.
+
+        Args:
+            name (str): The name of the task.
+
+        Returns:
+            list[Route]: The routes of the task, or the default model if the task is not routed.
+        """
+        models = self.routes.get(name)
+        if not models:
+            return [Route(None, None)]
+        return [Route(model, self.fallback_timeout if i < len(models) - 1 else None) for i, model in enumerate(models)]
+
+    def primary(self, name: str) -> Route:
+        """
+        Get the model that serves a task first.
+
+        Args:
+            name (str): The name of the task.
+
+        Returns:
+            Route: The first route of the task.
+        """
+        return self.routes_of(name)[0]
+
+@cache
+def model_router() -> ModelRouter:
+    """
+    Get the router of the process, configured by the environment variables.
+
+    Returns:
+        ModelRouter: The shared router.
+    """
+    return ModelRouter.from_env()
@@ -0,0 +1,150 @@
+"""Speculative analysis rounds."""
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from workflows.states import AnalysisState
+from tracing import Span, collect_spans
+
+logger = logging.getLogger(__name__)
+
+class SpeculativeAnalysis():
+    """
+    Starts the next analysis round in the background while the user is still answering.
+
+    Every new answer submits a round on the answers so far, replacing the previous one if it
+    has not started yet. A round that already started cannot be stopped, and it still takes
+    rate limiter tokens and LLM slots, so a session has at most one round in flight: the
+    answers given while it runs do not start another one. When the questionnaire ends, the
+    speculative result is used if it was computed from exactly the same inputs; otherwise it
+    is discarded and the round is run again. The crew spans of a discarded round are marked
+    as discarded in the trace, so their cost shows up.
+
+    Attributes:
+        crew (AnalysisCrew): The crew that analyzes the project.
+        started (int): The number of speculative rounds submitted.
+        used (int): The number of speculative rounds used.
+        discarded (int): The number of speculative rounds cancelled or discarded.
+        skipped (int): The number of answers that did not start a round because one was in flight.
+    """
+
+    FIELDS = ('project_name', 'project_description', 'description_sections', 'queries', 'queries_analyzed', 'finish')
+
+    def __init__(self, crew, workers: int = 2):
+        self.crew = crew
+        self.started = 0
+        self.used = 0
+        self.discarded = 0
+        self.skipped = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='speculative-analysis')
+        self._pending = dict[str, tuple[str, Future, list[Span]]]()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def enabled() -> bool:
+        """
+        Check whether speculative analysis is enabled by the SPECULATIVE_ANALYSIS environment variable.
+
+        Returns:
+            bool: True if speculative analysis is enabled.
+        """
+        return (os.environ.get('SPECULATIVE_ANALYSIS') or '').lower() in ('1', 'true', 'yes')
+
+    @classmethod
+    def fingerprint(cls, state: AnalysisState) -> str:
+        """
+        Compute the fingerprint of the inputs of an analysis round.
+
+        Args:
+            state (AnalysisState): The state given to the analysis crew.
+
+        Returns:
+            str: The SHA-256 digest of the fields read by the analysis.
+        """
+        data = json.dumps({field: state.get(field) for field in cls.FIELDS}, sort_keys=True, default=str)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def submit(self, state: AnalysisState):
+        """
+        Start a speculative analysis round, replacing the pending one of the session unless it is running.
+
+        Args:
+            state (AnalysisState): The state the round would receive if the questionnaire ended now.
+        """
+        key = state.get('session_id') or ''
+        fingerprint = self.fingerprint(state)
+        context = contextvars.copy_context()
+        with self._lock:
+            previous = self._pending.get(key)
+            if previous is not None:
+                if previous[0] == fingerprint:
+                    return
+                if previous[1].running():
+                    self.skipped += 1
+                    logger.debug("Speculative analysis of session %s still running, not starting another one.", key)
+                    return
+                self._discard(previous)
+            spans = list[Span]()
+            self._pending[key] = (fingerprint, self._executor.submit(context.run, self._speculate, state, spans), spans)
+            self.started += 1
+
+    def _speculate(self, state: AnalysisState, spans: list[Span]) -> dict:
+        with collect_spans(spans):
+            return self.crew.kickoff(state)
+
+    def _discard(self, pending: tuple[str, Future, list[Span]]):
+        """Cancel a speculative round, or mark its crew spans as discarded once it ends."""
+        _, future, spans = pending
+        self.discarded += 1
+        if future.cancel():
+            return
+
+        def mark(_):
+            for span in spans:
+                span['discarded'] = True
+
+        future.add_done_callback(mark)
+
+    def kickoff(self, state: AnalysisState) -> dict:
+        """
+        Get the analysis of a state, from the speculative round when its inputs match.
+
+        Args:
+            state (AnalysisState): The state of the analysis.
+
+        Returns:
+            dict: The updates of the state after the analysis.
+        """
+        with self._lock:
+            pending = self._pending.pop(state.get('session_id') or '', None)
+        if pending is not None:
+            fingerprint, future, _ = pending
+            if fingerprint == self.fingerprint(state):
+                try:
+                    result = future.result()
+                    self.used += 1
+                    logger.info("Using the speculative analysis (%d used, %d discarded).", self.used, self.discarded)
+                    return result
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.warning("Speculative analysis failed, running it again: %s", e)
+            with self._lock:
+                self._discard(pending)
+        return self.crew.kickoff(state)
+
+    async def akickoff(self, state: AnalysisState) -> dict:
+        """
+        Get the analysis of a state without blocking the event loop.
+
+        Args:
+            state (AnalysisState): The state of the analysis.
+
+        Returns:
+            dict: The updates of the state after the analysis.
+        """
+        return await asyncio.to_thread(self.kickoff, state)
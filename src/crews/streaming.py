@@ -0,0 +1,152 @@
+"""Streaming of the agents' final answers."""
+
+import logging
+import sys
+import time
+from typing import Callable
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+class FinalAnswerStream(BaseCallbackHandler):
+    """
+    Forwards the tokens of an agent's final answer to a sink as they are generated.
+
+    The agents reason before answering, so the tokens are buffered until the
+    "Final Answer:" marker is generated and only what follows it is forwarded.
+    Only one attempt of a call is streamed: once it is interrupted (e.g. the call failed
+    and falls back to another model), nothing more is forwarded to the sink.
+
+    Attributes:
+        sink (Callable[[str], None]): The function that receives the chunks of the final answer.
+        started_at (float | None): The time the first LLM call started.
+        first_token_at (float | None): The time the first chunk was forwarded.
+        interrupted (bool): Whether the streamed attempt failed.
+    """
+
+    MARKER = "Final Answer:"
+
+    def __init__(self, sink: Callable[[str], None]):
+        self.sink = sink
+        self.started_at = None
+        self.first_token_at = None
+        self.interrupted = False
+        self._buffer = ''
+        self._answering = False
+
+    @property
+    def time_to_first_token(self) -> float | None:
+        """
+        Get the time between the start of the first LLM call and the first forwarded chunk.
+
+        Returns:
+            float | None: The time to first token in seconds or None if nothing was forwarded.
+        """
+        if self.started_at is None or self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        """Reset the buffer when the agent starts a new LLM call."""
+        self._start()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        """Reset the buffer when the agent starts a new chat model call."""
+        self._start()
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        """
+        Forward a new token if it belongs to the final answer.
+
+        Args:
+            token (str): The token generated by the LLM.
+        """
+        if self.interrupted:
+            return
+        if self._answering:
+            self._forward(token)
+            return
+        self._buffer += token
+        index = self._buffer.find(self.MARKER)
+        if index >= 0:
+            self._answering = True
+            chunk = self._buffer[index + len(self.MARKER):].lstrip()
+            self._buffer = ''
+            if chunk:
+                self._forward(chunk)
+
+    def interrupt(self):
+        """Stop forwarding the tokens, because the streamed attempt failed."""
+        self.interrupted = True
+        self._buffer = ''
+        self._answering = False
+
+    def _start(self):
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+        self._buffer = ''
+        self._answering = False
+
+    def _forward(self, chunk: str):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.sink(chunk)
+
+class ReportWriter():
+    """
+    Writes the chunks of a streamed report to the console and appends them to a file.
+
+    Attributes:
+        path (str): The path of the report file.
+        echo (bool): Whether the chunks are also written to the console.
+        written (str): The text written so far.
+    """
+
+    def __init__(self, path: str, echo: bool = True):
+        self.path = path
+        self.echo = echo
+        self.written = ''
+        self._file = open(path, "w", encoding="utf-8")
+
+    def __call__(self, chunk: str):
+        self._file.write(chunk)
+        self._file.flush()
+        self.written += chunk
+        if self.echo:
+            sys.stdout.write(chunk)
+            sys.stdout.flush()
+
+    def close(self):
+        """Close the report file."""
+        self._file.close()
+
+    def finalize(self, response: str):
+        """
+        Make sure the file contains exactly the final response.
+
+        The streamed tokens can differ from the final answer (e.g. trailing whitespace
+        or a retried call), in which case the file is rewritten with the response.
+
+        Args:
+            response (str): The final response of the crew.
+        """
+        self.close()
+        if self.echo:
+            sys.stdout.write("\n")
+        if self.written != response:
+            with open(self.path, "w", encoding="utf-8") as file:
+                file.write(response)
+            self.written = response
+
+def log_stream(name: str, stream: FinalAnswerStream, elapsed: float):
+    """
+    Log the latency of a streamed answer.
+
+    Args:
+        name (str): The name of the streamed answer.
+        stream (FinalAnswerStream): The stream of the answer.
+        elapsed (float): The total generation time in seconds.
+    """
+    ttft = stream.time_to_first_token
+    logger.info("%s: time to first token %s, total %.1fs.", name, f"{ttft:.1f}s" if ttft is not None else "n/a", elapsed)
@@ -1,137 +1,577 @@
-"""Tasks for the planning crew."""
+"""Tasks for the planning crew.
 
+The instructions of every task are dedented once, when the module is loaded, into the
+static prefix of its description, and the project data is only appended after them.
+Consecutive prompts of a task therefore share a byte-identical prefix that the model
+provider can cache, and building a prompt is a plain concatenation.
+"""
+
+import logging
+import os
+from functools import cache
 from textwrap import dedent
 from crewai import Task
 
-from crews.models import CrewInput, CrewOutput
+from crews.context import ContextBuilder, estimate_tokens, log_usage
+from crews.memory import MemoryStore, memory_store
+from common import project_description
+from crews.models import CrewInput, CrewOutput, EditsOutput, RequirementsOutput, WorkOutput
+from crews.library import ProjectLibrary, project_library
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_INSTRUCTIONS = dedent("""\
+    The objective is to gather all the information required to build a detailed project charter.
+    Analyze the current information about the project including the description and the answers provided by the user.
+    Use your expertise in system analysis to identify patterns, trends, and gaps in the information provided.
+    Assess the validity and reliability of the information.
+    Be attentive to details and identify inconsistencies in the information provided.
+    IMPORTANT! Ask the user questions to refine the project description.
+    Keep asking until you have all the information you need to properly define the project charter or until the user asks you to finish.
+    Make sure to cover all the most important aspects of the project, including but not limited to:
+     - the major components, like a console application, API, library, web application, mobile application, desktop application, or background service;
+     - the os and platform of the project, like Windows, Linux, macOS, Android, iOS, or web;
+     - the programming languages, frameworks, and tools;
+     - the professional resources, like developers, designers, testers, and project managers;
+     - the project's goals and objectives;
+     - major features;
+     - constraints, assumptions, and risks;
+     - target audience;
+     - security requirements, like authentication, authorization, and data protection;
+     - data and services requirements, like data storage, external sources, services or APIs;
+     - design preferences, like colors, fonts, themes, layouts, navigation;
+    The ADDITIONAL QUESTIONS should be clear, concise, and relevant to the project.
+    You can ask as many ADDITIONAL QUESTIONS as you need to properly define the project.
+    When you ask a question, explain what information you expect to get from that question, and how it will help you to refine the project description. For example:
+     - What is the Project Objective?\nDescribe the specific objectives of the project. What value does this project add to the organization? What results are expected?  What are the deliverables?  What benefits will be realized?  What problems will be resolved? 
+     - What is the Project Scope?\nDescribe the scope of the project. The project scope establishes the boundaries of the project. It identifies the limits of the project and defines the deliverables.  
+     - What are the Major Features?\nDescribe the key functionalities of the project. What are the main components of the project? What are the main use cases of the project?
+     - What is the major components of the project?\nIs it a console application, API, library, web application, mobile application, desktop application, or background service? Are there multiple components? How are they connected?
+     - Does the project requires a frontend?\nDescribe if the project requires a frontend. That is, if the project requires a user interface that interacts with the user.
+     - What is the os and platform of the components?\nIs it Windows, Linux, macOS, Android, iOS, web, or a combination of these?
+     - What are the programming languages, frameworks, and tools used by the project's components?\nIs it Python, Java, C#, RUST, .NET, Flutter, Node.js, React, Angular, or some other technology?
+     - What are the Professional Resources?\nDescribe the professional resources required by the project. What roles are needed? What skills are required? Like developers, designers, testers, project managers, etc.
+     - What are the Assumptions?\nDescribe the assumptions that have been made in the project. Assumptions are factors that are considered to be true, real, or certain without proof or demonstration.
+     - What are the Constraints?\nDescribe the constraints that have been identified in the project. Constraints are factors that limit the project team's options.
+     - What are the Risk?\nDescribe the risks that have been identified in the project. Risks are potential events or conditions that can have a negative impact on the project.
+     - Who is the Target Audience?\nDescribe the target audience of the project. Who are the end users of the project? What are their needs, preferences, and expectations?
+     - What are the Authentication Requirements?\nDescribe the authentication requirements of the project. How will users be authenticated? What security measures are in place to protect user data?
+     - What are the Authorization Requirements?\nDescribe the authorization requirements of the project. What permissions and roles are assigned to users? What actions can users perform?
+     - What are the Data Storage Requirements?\nDescribe the data storage requirements of the project. What data needs to be stored? How will the data be stored? Where will the data be stored?
+     - What are the External Connections?\nDescribe the external connections required by the project. What external sources, services, or APIs are needed? How will the project interact with these external entities?
+    If the project requires a frontend, you can ask additional questions about the design preferences and navigation. For example:
+     - what is the UI fremework used?\nDescribe the UI framework used by the project. Bootstrap, Materialize, Tailwind, or custom?
+     - What are the Design Preferences?\nDescribe the design preferences of the project. What theme, style, color palette, font, or layout are preferred? What design principles should be followed?
+     - What are the views or pages and how to navigate between them?\nDescribe the main views/pages of the project. How are they connected? How can users navigate between them?
+    If the user introduces specifc components like a database, api, or external service, you can ask additional questions about each these components. For example:
+     - For the datanase "XYZ", how is the data stored and accessed?\nDescribe how the data is stored and accessed in the database XYZ. What tables, fields, and relationships are used? What queries are performed? What data is returned?
+     - For the API "XYZ", what are the endpoints and data formats?\nDescribe the endpoints and data formats used by the API XYZ. What data can be retrieved or sent? What methods are available? What data formats are used?
+     - For the service "XYZ", how is the service accessed and what data is returned?\nDescribe how the service XYZ is accessed. What data is returned? What methods are available? What data formats are used?
+    If the user introduces specifc terms or concepts that you are not familiar with, do not hesitate to ask for clarification. For example:
+    Do NOT limit yourself to these questions. Feel free to ask any question that you think will help you to refine the project description.
+    IMPORTANT! For each question, if you have a proposed solution for the question, you should also add your proposal to it.
+    Your proposal should be clear, concise, relevant to the project, and be a solution to the question.
+    IMPORTANT! Do not add a proposal if the answer is to be left completly to the user to answer or you do not have a good proposal to it.
+    IMPORTANT! Ask first the questions that do not require information previously provided by the user. To give a proper proposal about the required professional resources, you need to know the project's goals and objectives, and the project components. So do not ask about the professional resources before havind all the required information to make a proposal.
+    For example:
+     - Question: What is the Project Objective?\nDescribe the specific objectives of the project. What value does this project add to the organization? What results are expected?  What are the deliverables?  What benefits will be realized?  What problems will be resolved?
+     - Proposal: None (The user should provide the answer to this question.)
+     - Question: Does the project requires a frontend?\nDescribe if the project requires a frontend. That is, if the project requires a user interface that interacts with the user.
+     - Proposal: The user responded previously that the project is a web application, because of that, the project requires a frontend. 
+     - Question: What are the Professional Resources?\nDescribe the professional resources required by the project. What roles are needed? What skills are required? Like developers, designers, testers, project managers, etc.
+     - Proposal: The project requires a team of developers, designers, testers, and a project managers. The developers should have experience with Python, Django, and React. The designers should have experience with UI/UX design. The testers should have experience with automated testing. The project managers should have experience with Agile methodologies.
+    Is it ok not having any more relevant additional questions.
+    IMPORTANT! DO NET REPEAT A QUESTION. if an information was already answered by a previous question do not request again the same information.
+    """)
+
+ANALYSIS_OUTPUT = dedent("""\
+    Your final answer MUST be a json containing:
+     - a string parameter named "description" containing an UPDATED DESCRIPTION of the project based on the PROJECT DESCRIPTION and answers to the PENDING QUESTION.
+     - an object array parameter named "questions" containing the ADDITIONAL QUESTIONS you want to ask the user to improva and refine the project description.
+     - each object in the array must have:
+       - a string parameter named "text" containing the question to ask the user; and
+       - a optional string parameter named "proposal" containing the analyst proposal to that question. If no proposal is given send an empty string.
+    Here is an example of the expected output:
+    {
+        "description": "The project is a simple calculator that performs basic arithmetic operations like addition, subtraction, multiplication, and division.",
+        "questions": [
+            {
+                "text": "What is the Project Objective?",
+                "proposal": "The project objective is to create a simple calculator that performs basic arithmetic operations like addition, subtraction, multiplication, and division."
+            },
+            {
+                "text": "What are the Major Features?",
+                "proposal": ""
+            }
+        }
+    }
+    IMPORTANT! If the user asks you to finish, you should return only the updated project description and an empty array of ADDITIONAL QUESTIONS.
+    IMPORTANT! If you DO NOT HAVE any ADDITIONAL QUESTIONS to ask, you should return only the updated project description and an empty array of questions.
+    """)
+
+EDITS_OUTPUT = dedent("""\
+    Your final answer MUST be a json containing:
+     - an object array parameter named "edits" containing ONLY the changes to the PROJECT DESCRIPTION based on the answers to the PENDING QUESTION. Do NOT repeat the parts of the description that did not change.
+     - each object in the array must have:
+       - a string parameter named "section" containing the topic of the section of the description to change, like "Goals and Objectives", "Major Features", "Components", "Platforms", "Technologies", "Professional Resources", "Target Audience", "Security", "Data and Services", "Design Preferences", or "Constraints, Assumptions, and Risks". Use the topic of an existing section (the "### " headings of the description) to change it;
+       - a string parameter named "action" containing "add" to add the text to the end of the section (or create the section), or "replace" to replace the whole section with the text (an empty text removes the section); and
+       - a string parameter named "text" containing the text to add or the new text of the section.
+     - an object array parameter named "questions" containing the ADDITIONAL QUESTIONS you want to ask the user to improva and refine the project description.
+     - each object in the array must have:
+       - a string parameter named "text" containing the question to ask the user; and
+       - a optional string parameter named "proposal" containing the analyst proposal to that question. If no proposal is given send an empty string.
+    Here is an example of the expected output:
+    {
+        "edits": [
+            {
+                "section": "Security",
+                "action": "add",
+                "text": "The users authenticate with their Google accounts."
+            }
+        ],
+        "questions": [
+            {
+                "text": "What are the Major Features?",
+                "proposal": ""
+            }
+        ]
+    }
+    IMPORTANT! If the user asks you to finish, you should return only the edits and an empty array of ADDITIONAL QUESTIONS.
+    IMPORTANT! If you DO NOT HAVE any ADDITIONAL QUESTIONS to ask, you should return only the edits and an empty array of questions.
+    """)
+
+REQUIREMENTS_RULES = dedent("""\
+    Each requirement should be clear, concise, verifiable, and relevant to the project.
+    IMPORTANT! Base the requirements only on the information about the project. Do not invent features the user did not describe.
+    IMPORTANT! DO NOT REPEAT A REQUIREMENT.
+    """)
+
+BUSINESS_REQUIREMENTS_INSTRUCTIONS = dedent("""\
+    Identify the BUSINESS REQUIREMENTS of the project.
+    Business requirements describe what the project must achieve for the organization and its users, independently of the technology.
+    Make sure to cover all the most important aspects of the business, including but not limited to:
+     - the business goals, the expected benefits, and the success criteria;
+     - the users, their roles, and what each of them must be able to do;
+     - the business processes, rules, and policies;
+     - the legal, regulatory, and compliance constraints;
+    """) + REQUIREMENTS_RULES
+
+SYSTEM_REQUIREMENTS_INSTRUCTIONS = dedent("""\
+    Identify the SYSTEM REQUIREMENTS of the project.
+    System requirements describe the technical capabilities and qualities the project components must have.
+    Make sure to cover all the most important aspects of the system, including but not limited to:
+     - the major components, the platforms, and the programming languages, frameworks, and tools;
+     - the security requirements, like authentication, authorization, and data protection;
+     - the data storage and the external connections, like services or APIs;
+     - the performance, availability, scalability, and maintainability requirements;
+    """) + REQUIREMENTS_RULES
+
+REQUIREMENTS_OUTPUT = dedent("""\
+    Your final answer MUST be a json containing:
+     - an object array parameter named "requirements" containing the requirements of the project.
+     - each object in the array must have:
+       - a string parameter named "name" containing a short name of the requirement; and
+       - a string parameter named "description" containing the detailed description of the requirement.
+    Here is an example of the expected output:
+    {
+        "requirements": [
+            {
+                "name": "User Registration",
+                "description": "The users must be able to create an account with their email address and a password."
+            }
+        ]
+    }
+    """)
+
+FEATURES_INSTRUCTIONS = dedent("""\
+    Identify the FEATURES of the project.
+    A feature is a distinct functionality that delivers value to the users and can be developed and delivered on its own.
+    Cover all the requirements of the project, and include the features required by the system requirements, like authentication or data storage.
+    """)
+
+ACTIVITIES_INSTRUCTIONS = dedent("""\
+    Break the FEATURE below into ACTIVITIES.
+    An activity is a cohesive part of the work on the feature, like the design, the implementation of a component, or the testing of the feature.
+    Include only the activities required to deliver this feature.
+    """)
+
+TASKS_INSTRUCTIONS = dedent("""\
+    Break the ACTIVITY below into TASKS.
+    A task is a small piece of work that can be assigned to one professional and completed in at most a few days.
+    Include only the tasks required to complete this activity.
+    """)
+
+def _work_items_output(kind: str) -> str:
+    return dedent(f"""\
+        Your final answer MUST be a json containing:
+         - an object array parameter named "items" containing the {kind}.
+         - each object in the array must have:
+           - a string parameter named "name" containing a short name of the item; and
+           - a string parameter named "description" containing the detailed description of the item.
+        Here is an example of the expected output:
+        {{
+            "items": [
+                {{
+                    "name": "User Registration",
+                    "description": "Allow the users to create an account with their email address and a password."
+                }}
+            ]
+        }}
+        """)
+
+WORK_OUTPUTS = {kind: _work_items_output(kind) for kind in ('features', 'activities', 'tasks')}
+
+REPORT_TEMPLATE = dedent("""\
+    # [[Add here the Project Name]]
+    #### Projecj Summary Report
+
+    ## Project Brief Summary
+    [[add here a brief summary of the project]]
+
+    ## Project Goals and Objectives
+    [[add here the project goals and objectives]]
+
+    ## Project Scope
+    [[add here the project scope]]
+
+    ## Major Features
+        - **[[feature name]]**: [[detailed feature description]]
+        - **[[feature name]]**: [[detailed feature description]]
+        [[add the other features here as a bullet list like above]]
+
+    ## Major Components
+        - **[[component name]]**: [[detailed component description including the programming languages, frameworks, and tools used]]
+        - **[[component name]]**: [[detailed component description including the programming languages, frameworks, and tools used]]
+        [[add the other components here as a bullet list like above]]
+
+    ## Professional Resources
+        - **[Professional Type]] ([[number of professionals]])**: [[decribe the required professional skils and type of activities they will execute in the project]]
+        - **[Professional Type]] ([[number of professionals]])**: [[decribe the required professional skils and type of activities they will execute in the project]]
+        [[add the other professional resources here as a bullet list like above]]
+
+    ## Assumptions, Constraints, and Risks
+    ### Assumptions
+        - **[[assumption name]]**: [[detailed assumption description]]
+        - **[[assumption name]]**: [[detailed assumption description]]
+        [[add the other assumptions here as a bullet list like above]]
+
+    ### Constraints
+        - **[[constraint name]]**: [[detailed constraint description]]
+        - **[[constraint name]]**: [[detailed constraint description]]
+        [[add the other constraints here as a bullet list like above]]
+
+    ### Risks
+        - **[[risk name]]**: [[detailed risk description]]
+        - **[[risk name]]**: [[detailed risk description]]
+        [[add the other risks here as a bullet list like above]]
+
+    ## Target Audience
+    [[add here the target audience of the project]]
+
+    ## Backend Requirements
+    ### Security
+    #### Authentication
+    [[add here the authentication requirements of the project]]
+
+    #### Authorization
+    [[add here the authorization requirements of the project]]
+
+    ### Data, External Connections (API, Services, etc)
+    #### Data Storage
+    [[add here the data storage requirements of the project]]
+
+    #### External Connections
+    [[add here the external connections required by the project]]
+
+    ## Frontend Requirements
+    ### UI Framework
+    [[add here the UI framework used by the project]]
+
+    ### Design Preferences
+    [[add here the design preferences of the project]]
+
+    ### Views/Pages and Navigation
+        - **[[view or page name]]**: [[detailed view or page description and how to navigate to and from it]]
+        - **[[view or page name]]**: [[detailed view or page description and how to navigate to and from it]]
+        [[add the other views or pages here as a bullet list like above]]
+
+    ## Additional Information
+    [[add here any additional or specific information that is relevant to the project]]
+    """)
+
+REPORT_INSTRUCTIONS = dedent("""\
+    The objective is analyze the current information about the project including the queries submited to the user to generate a Project Summary Report.
+    The report in markdown format should contain all the information required to properly define the project.
+    You will base your analysis on the project information given after the template.
+
+    The final report should be very detailed and use the following template:
+    -----------------------
+    """) + REPORT_TEMPLATE + "-----------------------\n"
+
+# The sections of the template ("## " headings), generated separately in the parallel report mode.
+REPORT_SECTIONS = tuple("## " + part.strip() + "\n" for part in REPORT_TEMPLATE.split("\n## ")[1:])
+
+REPORT_SECTION_INSTRUCTIONS = dedent("""\
+    The objective is analyze the current information about the project including the queries submited to the user to write one section of a Project Summary Report.
+    The other sections of the report are written separately, so write only the section of the template given after the project information.
+    The section in markdown format should be very detailed and contain all the information about its subject required to properly define the project.
+    """)
+
+REPORT_OUTPUT = dedent("""\
+    Your final answer MUST be a markdown document containing the Project Summary Report.
+    """)
+
+REPORT_SECTION_OUTPUT = dedent("""\
+    Your final answer MUST be the markdown of the requested section of the Project Summary Report, starting with its heading.
+    """)
+
+PREFIXES = {
+    'initial_analysis': ANALYSIS_INSTRUCTIONS,
+    'business_requirements': BUSINESS_REQUIREMENTS_INSTRUCTIONS,
+    'system_requirements': SYSTEM_REQUIREMENTS_INSTRUCTIONS,
+    'identify_features': FEATURES_INSTRUCTIONS,
+    'identify_activities': ACTIVITIES_INSTRUCTIONS,
+    'identify_tasks': TASKS_INSTRUCTIONS,
+    'final_report': REPORT_INSTRUCTIONS,
+    'report_section': REPORT_SECTION_INSTRUCTIONS,
+}
+
+MEMORY_RECALLS = {
+    'initial_analysis': ('initial_analysis',),
+    'business_requirements': ('initial_analysis',),
+    'system_requirements': ('initial_analysis',),
+}
+
+@cache
+def prefix_tokens(name: str) -> int:
+    """
+    Get the number of tokens of the static prefix of a task description.
+
+    Args:
+        name (str): The name of the task.
+
+    Returns:
+        int: The estimated number of tokens of the prefix.
+    """
+    return estimate_tokens(PREFIXES[name])
+
+def project_information(data: CrewInput, sections: str = '', separator: str = '-------') -> str:
+    """
+    Format the project data that follows the static prefix of a task description.
+
+    Args:
+        data (CrewInput): The current state of the planning workflow.
+        sections (str): The sections added after the description (e.g. the requirements).
+        separator (str): The line around the project information.
+
+    Returns:
+        str: The project information, with a "{queries}" placeholder for the queries section.
+    """
+    return (
+        f"\nProject Information\n{separator}\n"
+        f"Project Name: {data['project_name']}\n\n"
+        f"Project Description:\n{project_description(data)}\n"
+        f"{sections}{{queries}}\n{separator}\n"
+    )
 
 class PlanningTasks:
     """
     A class that defines tasks related to project planning and analysis.
+
+    When the PROMPT_METRICS environment variable is set, the size of the static prefix of
+    every prompt and the tokens it saves per round with provider-side prompt caching
+    (priced at PROMPT_CACHE_DISCOUNT, default 0.5, of the regular prompt price) are logged.
+
+    The tasks listed in MEMORY_RECALLS end their description with the notes of the session
+    most relevant to them, up to MEMORY_CONTEXT_TOKENS tokens (default 300, 0 disables).
+    The analysis prompts also end with the answers of similar past projects from the project
+    library (see ProjectLibrary). Both come after the project data, so they do not break the
+    shared prefix.
+
+    Attributes:
+        context (ContextBuilder): The builder of the queries section of the prompts.
+        context_usage (ContextUsage | None): The budget usage of the last prompt built.
+        metrics (bool): Whether the prefix metrics of the prompts are logged.
+        memory (MemoryStore): The memory the notes are recalled from.
+        memory_budget (int): The maximum number of tokens of the recalled notes.
+        library (ProjectLibrary | None): The index of the past projects, or None to start every project cold.
     """
 
-    def initial_analysis(self, agent, data: CrewInput) -> Task:
+    def __init__(
+            self,
+            context: ContextBuilder | None = None,
+            metrics: bool | None = None,
+            memory: MemoryStore | None = None,
+            memory_budget: int | None = None,
+            library: ProjectLibrary | None = None):
+        self.context = context or ContextBuilder.from_env()
+        self.context_usage = None
+        if metrics is None:
+            metrics = (os.environ.get('PROMPT_METRICS') or '').lower() in ('1', 'true', 'yes')
+        self.metrics = metrics
+        self.memory = memory or memory_store()
+        if memory_budget is None:
+            memory_budget = int(os.environ.get('MEMORY_CONTEXT_TOKENS') or 300)
+        self.memory_budget = memory_budget
+        self.library = library or project_library()
+
+    def _describe(
+            self,
+            name: str,
+            suffix: str,
+            expected_output: str,
+            data: CrewInput,
+            analyzed: int | None = None) -> str:
+        description = PREFIXES[name] + suffix
+        notes = self._notes(name, suffix, data) + self._examples(name, data)
+        if analyzed is not None:
+            reserved = estimate_tokens(description) + estimate_tokens(notes) + estimate_tokens(expected_output)
+            queries, self.context_usage = self.context.build(data.get('queries'), analyzed, reserved)
+            log_usage(name, self.context_usage)
+            head, _, tail = description.rpartition("{queries}")
+            description = head + queries + tail
+        description += notes
+        if self.metrics:
+            log_prefix(name, description)
+        return description
+
+    def _notes(self, name: str, suffix: str, data: CrewInput) -> str:
+        kinds = MEMORY_RECALLS.get(name)
+        session_id = data.get('session_id')
+        if not kinds or not session_id or self.memory_budget <= 0:
+            return ''
+        notes = self.memory.recall(session_id, suffix, kinds, self.memory_budget)
+        if not notes:
+            return ''
+        return "\nNotes from earlier in the session:\n" + "".join(f"- {note}\n" for note in notes)
+
+    def _examples(self, name: str, data: CrewInput) -> str:
+        if name != 'initial_analysis' or self.library is None:
+            return ''
+        return self.library.context(f"{data['project_name']}\n{project_description(data)}", data.get('session_id'))
+
+    def initial_analysis(self, agent, data: CrewInput, edits: bool = False) -> Task:
         """
         Task to analyze the initial information about the project and ask the user for more details to refine the project description if necessary.
 
         Parameters:
         - agent (str): The name of the agent responsible for the task.
         - state (CrewInput): The current state of the planning workflow.
+        - edits (bool): Whether the analyst returns edits of the sections of the description instead of the whole description.
 
         Returns:
         - Task: A Task object representing the initial analisys task.
         """
-        queries_output = ''
-        if data['queries'] is not None:
-            queries_output = "\n\nQueries:\n"
-            for i, query in enumerate(data['queries']):
-                question = query['question']
-                answer = query['answer']
-                queries_output += f"{i+1}. {question}\n{answer}\n\n"
-
-        description = dedent(f"""\
-                The objective is to gather all the information required to build a detailed project charter.
-                Analyze the current information about the project including the description and the answers provided by the user.
-                Use your expertise in system analysis to identify patterns, trends, and gaps in the information provided.
-                Assess the validity and reliability of the information.
-                Be attentive to details and identify inconsistencies in the information provided.
-                IMPORTANT! Ask the user questions to refine the project description.
-                Keep asking until you have all the information you need to properly define the project charter or until the user asks you to finish.
-                Make sure to cover all the most important aspects of the project, including but not limited to:
-                 - the major components, like a console application, API, library, web application, mobile application, desktop application, or background service;
-                 - the os and platform of the project, like Windows, Linux, macOS, Android, iOS, or web;
-                 - the programming languages, frameworks, and tools;
-                 - the professional resources, like developers, designers, testers, and project managers;
-                 - the project's goals and objectives;
-                 - major features;
-                 - constraints, assumptions, and risks;
-                 - target audience;
-                 - security requirements, like authentication, authorization, and data protection;
-                 - data and services requirements, like data storage, external sources, services or APIs;
-                 - design preferences, like colors, fonts, themes, layouts, navigation;
-                The ADDITIONAL QUESTIONS should be clear, concise, and relevant to the project.
-                You can ask as many ADDITIONAL QUESTIONS as you need to properly define the project.
-                When you ask a question, explain what information you expect to get from that question, and how it will help you to refine the project description. For example:
-                 - What is the Project Objective?\nDescribe the specific objectives of the project. What value does this project add to the organization? What results are expected?  What are the deliverables?  What benefits will be realized?  What problems will be resolved? 
-                 - What is the Project Scope?\nDescribe the scope of the project. The project scope establishes the boundaries of the project. It identifies the limits of the project and defines the deliverables.  
-                 - What are the Major Features?\nDescribe the key functionalities of the project. What are the main components of the project? What are the main use cases of the project?
-                 - What is the major components of the project?\nIs it a console application, API, library, web application, mobile application, desktop application, or background service? Are there multiple components? How are they connected?
-                 - Does the project requires a frontend?\nDescribe if the project requires a frontend. That is, if the project requires a user interface that interacts with the user.
-                 - What is the os and platform of the components?\nIs it Windows, Linux, macOS, Android, iOS, web, or a combination of these?
-                 - What are the programming languages, frameworks, and tools used by the project's components?\nIs it Python, Java, C#, RUST, .NET, Flutter, Node.js, React, Angular, or some other technology?
-                 - What are the Professional Resources?\nDescribe the professional resources required by the project. What roles are needed? What skills are required? Like developers, designers, testers, project managers, etc.
-                 - What are the Assumptions?\nDescribe the assumptions that have been made in the project. Assumptions are factors that are considered to be true, real, or certain without proof or demonstration.
-                 - What are the Constraints?\nDescribe the constraints that have been identified in the project. Constraints are factors that limit the project team's options.
-                 - What are the Risk?\nDescribe the risks that have been identified in the project. Risks are potential events or conditions that can have a negative impact on the project.
-                 - Who is the Target Audience?\nDescribe the target audience of the project. Who are the end users of the project? What are their needs, preferences, and expectations?
-                 - What are the Authentication Requirements?\nDescribe the authentication requirements of the project. How will users be authenticated? What security measures are in place to protect user data?
-                 - What are the Authorization Requirements?\nDescribe the authorization requirements of the project. What permissions and roles are assigned to users? What actions can users perform?
-                 - What are the Data Storage Requirements?\nDescribe the data storage requirements of the project. What data needs to be stored? How will the data be stored? Where will the data be stored?
-                 - What are the External Connections?\nDescribe the external connections required by the project. What external sources, services, or APIs are needed? How will the project interact with these external entities?
-                If the project requires a frontend, you can ask additional questions about the design preferences and navigation. For example:
-                 - what is the UI fremework used?\nDescribe the UI framework used by the project. Bootstrap, Materialize, Tailwind, or custom?
-                 - What are the Design Preferences?\nDescribe the design preferences of the project. What theme, style, color palette, font, or layout are preferred? What design principles should be followed?
-                 - What are the views or pages and how to navigate between them?\nDescribe the main views/pages of the project. How are they connected? How can users navigate between them?
-                If the user introduces specifc components like a database, api, or external service, you can ask additional questions about each these components. For example:
-                 - For the datanase "XYZ", how is the data stored and accessed?\nDescribe how the data is stored and accessed in the database XYZ. What tables, fields, and relationships are used? What queries are performed? What data is returned?
-                 - For the API "XYZ", what are the endpoints and data formats?\nDescribe the endpoints and data formats used by the API XYZ. What data can be retrieved or sent? What methods are available? What data formats are used?
-                 - For the service "XYZ", how is the service accessed and what data is returned?\nDescribe how the service XYZ is accessed. What data is returned? What methods are available? What data formats are used?
-                If the user introduces specifc terms or concepts that you are not familiar with, do not hesitate to ask for clarification. For example:
-                Do NOT limit yourself to these questions. Feel free to ask any question that you think will help you to refine the project description.
-                IMPORTANT! For each question, if you have a proposed solution for the question, you should also add your proposal to it.
-                Your proposal should be clear, concise, relevant to the project, and be a solution to the question.
-                IMPORTANT! Do not add a proposal if the answer is to be left completly to the user to answer or you do not have a good proposal to it.
-                IMPORTANT! Ask first the questions that do not require information previously provided by the user. To give a proper proposal about the required professional resources, you need to know the project's goals and objectives, and the project components. So do not ask about the professional resources before havind all the required information to make a proposal.
-                For example:
-                 - Question: What is the Project Objective?\nDescribe the specific objectives of the project. What value does this project add to the organization? What results are expected?  What are the deliverables?  What benefits will be realized?  What problems will be resolved?
-                 - Proposal: None (The user should provide the answer to this question.)
-                 - Question: Does the project requires a frontend?\nDescribe if the project requires a frontend. That is, if the project requires a user interface that interacts with the user.
-                 - Proposal: The user responded previously that the project is a web application, because of that, the project requires a frontend. 
-                 - Question: What are the Professional Resources?\nDescribe the professional resources required by the project. What roles are needed? What skills are required? Like developers, designers, testers, project managers, etc.
-                 - Proposal: The project requires a team of developers, designers, testers, and a project managers. The developers should have experience with Python, Django, and React. The designers should have experience with UI/UX design. The testers should have experience with automated testing. The project managers should have experience with Agile methodologies.
-                Is it ok not having any more relevant additional questions.
-                IMPORTANT! DO NET REPEAT A QUESTION. if an information was already answered by a previous question do not request again the same information.
-
-                Project Information
-                -------
-                Project Name: {data['project_name']}
-                
-                Project Description:
-                {data['project_description']}
-                {queries_output}
-                -------
-                
-                Finish: {data['finish']}
-                """)
-        expected_output = dedent("""\
-                Your final answer MUST be a json containing:
-                 - a string parameter named "description" containing an UPDATED DESCRIPTION of the project based on the PROJECT DESCRIPTION and answers to the PENDING QUESTION.
-                 - an object array parameter named "questions" containing the ADDITIONAL QUESTIONS you want to ask the user to improva and refine the project description.
-                 - each object in the array must have:
-                   - a string parameter named "text" containing the question to ask the user; and
-                   - a optional string parameter named "proposal" containing the analyst proposal to that question. If no proposal is given send an empty string.
-                Here is an example of the expected output:
-                {
-                    "description": "The project is a simple calculator that performs basic arithmetic operations like addition, subtraction, multiplication, and division.",
-                    "questions": [
-                        {
-                            "text": "What is the Project Objective?",
-                            "proposal": "The project objective is to create a simple calculator that performs basic arithmetic operations like addition, subtraction, multiplication, and division."
-                        },
-                        {
-                            "text": "What are the Major Features?",
-                            "proposal": ""
-                        }
-                    }
-                }
-                IMPORTANT! If the user asks you to finish, you should return only the updated project description and an empty array of ADDITIONAL QUESTIONS.
-                IMPORTANT! If you DO NOT HAVE any ADDITIONAL QUESTIONS to ask, you should return only the updated project description and an empty array of questions.
-                """)
+        suffix = project_information(data) + f"\nFinish: {data['finish']}\n"
+        expected_output = EDITS_OUTPUT if edits else ANALYSIS_OUTPUT
         return Task(
-            description=description,
+            description=self._describe(
+                "initial_analysis", suffix, expected_output, data, data.get('queries_analyzed') or 0),
             expected_output=expected_output,
             agent=agent,
-            output_json=CrewOutput,
+            output_json=EditsOutput if edits else CrewOutput,
+        )
+
+    def business_requirements(self, agent, data: CrewInput) -> Task:
+        """
+        Task to identify the business requirements of the project.
+
+        Parameters:
+        - agent (str): The name of the agent responsible for the task.
+        - state (CrewInput): The current state of the planning workflow.
+
+        Returns:
+        - Task: A Task object representing the business requirements task.
+        """
+        return self._requirements("business_requirements", agent, data)
+
+    def system_requirements(self, agent, data: CrewInput) -> Task:
+        """
+        Task to identify the system requirements of the project.
+
+        Parameters:
+        - agent (str): The name of the agent responsible for the task.
+        - state (CrewInput): The current state of the planning workflow.
+
+        Returns:
+        - Task: A Task object representing the system requirements task.
+        """
+        return self._requirements("system_requirements", agent, data)
+
+    def _requirements(self, name: str, agent, data: CrewInput) -> Task:
+        return Task(
+            description=self._describe(
+                name, project_information(data), REQUIREMENTS_OUTPUT, data, data.get('queries_analyzed') or 0),
+            expected_output=REQUIREMENTS_OUTPUT,
+            agent=agent,
+            output_json=RequirementsOutput,
+        )
+
+    def identify_features(self, agent, data: CrewInput) -> Task:
+        """
+        Task to identify the features of the project from its description and requirements.
+
+        Parameters:
+        - agent (str): The name of the agent responsible for the task.
+        - state (CrewInput): The current state of the planning workflow.
+
+        Returns:
+        - Task: A Task object representing the features identification task.
+        """
+        suffix = project_information(data, format_requirements(data.get('requirements')))
+        return Task(
+            description=self._describe(
+                "identify_features", suffix, WORK_OUTPUTS['features'], data, data.get('queries_analyzed') or 0),
+            expected_output=WORK_OUTPUTS['features'],
+            agent=agent,
+            output_json=WorkOutput,
+        )
+
+    def identify_activities(self, agent, data: CrewInput) -> Task:
+        """
+        Task to break a feature of the project into activities.
+
+        Parameters:
+        - agent (str): The name of the agent responsible for the task.
+        - state (CrewInput): The state of the feature branch, with the "feature" to break down.
+
+        Returns:
+        - Task: A Task object representing the activities identification task.
+        """
+        suffix = (
+            f"\nProject Name: {data['project_name']}\n\n"
+            f"Project Description:\n{project_description(data)}\n\n"
+            f"Feature: {data['feature']['name']}\n{data['feature']['description']}\n"
+        )
+        return Task(
+            description=self._describe("identify_activities", suffix, WORK_OUTPUTS['activities'], data),
+            expected_output=WORK_OUTPUTS['activities'],
+            agent=agent,
+            output_json=WorkOutput,
+        )
+
+    def identify_tasks(self, agent, data: CrewInput, activity) -> Task:
+        """
+        Task to break an activity of a feature into tasks.
+
+        Parameters:
+        - agent (str): The name of the agent responsible for the task.
+        - state (CrewInput): The state of the feature branch, with the "feature" being broken down.
+        - activity (WorkItem): The activity to break down.
+
+        Returns:
+        - Task: A Task object representing the tasks identification task.
+        """
+        suffix = (
+            f"\nProject Name: {data['project_name']}\n\n"
+            f"Feature: {data['feature']['name']}\n{data['feature']['description']}\n\n"
+            f"Activity: {activity['name']}\n{activity['description']}\n"
+        )
+        return Task(
+            description=self._describe("identify_tasks", suffix, WORK_OUTPUTS['tasks'], data),
+            expected_output=WORK_OUTPUTS['tasks'],
+            agent=agent,
+            output_json=WorkOutput,
         )
 
     def final_report(self, agent, data: CrewInput) -> Task:
@@ -145,110 +585,82 @@ class PlanningTasks:
         Returns:
         - Task: A Task object representing the final analysis task.
         """
-        queries_output = ''
-        if data['queries'] is not None:
-            queries_output = "\n\nQueries:\n"
-            for i, query in enumerate(data['queries']):
-                question = query['question']
-                answer = query['answer']
-                queries_output += f"{i+1}. {question}\n{answer}\n\n"
-
-        description = dedent(f"""\
-                The objective is analyze the current information about the project including the queries submited to the user to generate a Project Summary Report.
-                The report in markdown format should contain all the information required to properly define the project.
-                You will base your analysis on the following information:
-                -----------------------
-                Project Name: {data['project_name']}
-                
-                Project Description:
-                {data['project_description']}
-                {queries_output}
-                -----------------------
-
-                The final report should be very detailed and use the following template:
-                -----------------------
-                # [[Add here the Project Name]]
-                #### Projecj Summary Report
-                
-                ## Project Brief Summary
-                [[add here a brief summary of the project]]
-
-                ## Project Goals and Objectives
-                [[add here the project goals and objectives]]
-
-                ## Project Scope
-                [[add here the project scope]]
-
-                ## Major Features
-                    - **[[feature name]]**: [[detailed feature description]]
-                    - **[[feature name]]**: [[detailed feature description]]
-                    [[add the other features here as a bullet list like above]]
-
-                ## Major Components
-                    - **[[component name]]**: [[detailed component description including the programming languages, frameworks, and tools used]]
-                    - **[[component name]]**: [[detailed component description including the programming languages, frameworks, and tools used]]
-                    [[add the other components here as a bullet list like above]]
-
-                ## Professional Resources
-                    - **[Professional Type]] ([[number of professionals]])**: [[decribe the required professional skils and type of activities they will execute in the project]]
-                    - **[Professional Type]] ([[number of professionals]])**: [[decribe the required professional skils and type of activities they will execute in the project]]
-                    [[add the other professional resources here as a bullet list like above]]
-
-                ## Assumptions, Constraints, and Risks
-                ### Assumptions
-                    - **[[assumption name]]**: [[detailed assumption description]]
-                    - **[[assumption name]]**: [[detailed assumption description]]
-                    [[add the other assumptions here as a bullet list like above]]
-
-                ### Constraints
-                    - **[[constraint name]]**: [[detailed constraint description]]
-                    - **[[constraint name]]**: [[detailed constraint description]]
-                    [[add the other constraints here as a bullet list like above]]
-                
-                ### Risks
-                    - **[[risk name]]**: [[detailed risk description]]
-                    - **[[risk name]]**: [[detailed risk description]]
-                    [[add the other risks here as a bullet list like above]]
-
-                ## Target Audience
-                [[add here the target audience of the project]]
-
-                ## Backend Requirements
-                ### Security
-                #### Authentication
-                [[add here the authentication requirements of the project]]
-
-                #### Authorization
-                [[add here the authorization requirements of the project]]
-
-                ### Data, External Connections (API, Services, etc)
-                #### Data Storage
-                [[add here the data storage requirements of the project]]
-
-                #### External Connections
-                [[add here the external connections required by the project]]
-
-                ## Frontend Requirements
-                ### UI Framework
-                [[add here the UI framework used by the project]]
-
-                ### Design Preferences
-                [[add here the design preferences of the project]]
-
-                ### Views/Pages and Navigation
-                    - **[[view or page name]]**: [[detailed view or page description and how to navigate to and from it]]
-                    - **[[view or page name]]**: [[detailed view or page description and how to navigate to and from it]]
-                    [[add the other views or pages here as a bullet list like above]]
-
-                ## Additional Information
-                [[add here any additional or specific information that is relevant to the project]]
-                -----------------------
-                """)
-        expected_output = dedent("""\
-                Your final answer MUST be a markdown document containing the Project Summary Report.
-                """)
+        sections = format_requirements(data.get('requirements')) + format_work(data.get('work'))
+        suffix = project_information(data, sections, separator='-----------------------')
         return Task(
-            description=description,
-            expected_output=expected_output,
+            description=self._describe("final_report", suffix, REPORT_OUTPUT, data, data.get('queries_analyzed') or 0),
+            expected_output=REPORT_OUTPUT,
+            agent=agent,
+        )
+
+    def report_section(self, agent, data: CrewInput, section: str) -> Task:
+        """
+        Task to write one section of the Project Summary Report.
+
+        Parameters:
+        - agent (str): The name of the agent responsible for the task.
+        - state (CrewInput): The current state of the planning workflow.
+        - section (str): The template of the section (one of REPORT_SECTIONS).
+
+        Returns:
+        - Task: A Task object representing the section task.
+        """
+        sections = format_requirements(data.get('requirements')) + format_work(data.get('work'))
+        suffix = (
+            project_information(data, sections, separator='-----------------------')
+            + f"\nSection Template:\n-----------------------\n{section}-----------------------\n"
+        )
+        return Task(
+            description=self._describe(
+                "report_section", suffix, REPORT_SECTION_OUTPUT, data, data.get('queries_analyzed') or 0),
+            expected_output=REPORT_SECTION_OUTPUT,
             agent=agent,
         )
+
+def log_prefix(name: str, description: str):
+    """
+    Log the share of a prompt covered by its static prefix and the tokens it saves per round.
+
+    Args:
+        name (str): The name of the task.
+        description (str): The description of the task.
+    """
+    prefix = prefix_tokens(name)
+    total = estimate_tokens(description)
+    discount = float(os.environ.get('PROMPT_CACHE_DISCOUNT') or 0.5)
+    logger.info(
+        "%s: %d prompt tokens, %d in the static prefix (%.0f%%), ~%.0f tokens saved per round when cached.",
+        name, total, prefix, 100 * prefix / max(total, 1), prefix * discount)
+
+def format_requirements(requirements: dict | None) -> str:
+    """
+    Format the requirements of the project for a prompt.
+
+    Args:
+        requirements (dict[str, list[Requirement]] | None): The requirements by type.
+
+    Returns:
+        str: One section per type of requirement, or an empty string.
+    """
+    return ''.join(
+        f"\n{kind.capitalize()} Requirements:\n" + ''.join(f" - {item['name']}: {item['description']}\n" for item in items)
+        for kind, items in (requirements or {}).items() if items)
+
+def format_work(work: dict | None) -> str:
+    """
+    Format the work breakdown of the project for a prompt, down to the activities.
+
+    Args:
+        work (dict[str, Feature] | None): The features broken into activities and tasks.
+
+    Returns:
+        str: The features and their activities, or an empty string.
+    """
+    if not work:
+        return ''
+    lines = ["\nWork Breakdown:\n"]
+    for feature in work.values():
+        lines.append(f" - {feature['name']}: {feature['description']}\n")
+        for activity in feature.get('activities') or []:
+            lines.append(f"    - {activity['name']} ({len(activity.get('tasks') or [])} tasks)\n")
+    return ''.join(lines)
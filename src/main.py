@@ -1,17 +1,136 @@
 """Entry point."""
 
+import asyncio
+import logging
+import os
 import sys
-from workflows.workflow import PlaningWorkflow
+import time
+import uuid
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+def option(*flags: str) -> str | None:
+    """Get the value following the first of the flags present in the command line."""
+    for flag in flags:
+        if flag in sys.argv and sys.argv.index(flag) + 1 < len(sys.argv):
+            return sys.argv[sys.argv.index(flag) + 1]
+    return None
+
+logging.basicConfig(format='%(message)s')
+logging.getLogger('crews').setLevel(logging.INFO)
+logging.getLogger('workflows').setLevel(logging.INFO)
+
+if '--no-cache' in sys.argv:
+    os.environ['CREW_CACHE_BYPASS'] = '1'
+
+if '--stream' in sys.argv or '-s' in sys.argv:
+    os.environ['REPORT_STREAMING'] = '1'
+
+if '--parallel-report' in sys.argv:
+    os.environ['REPORT_PARALLEL'] = '1'
+
+if '--pipelined' in sys.argv or '-p' in sys.argv:
+    os.environ['PIPELINED_ANALYSIS'] = '1'
+
+if '--profile' in sys.argv:
+    os.environ['PROFILE_NODES'] = '1'
+
+if '--edits' in sys.argv:
+    os.environ['DESCRIPTION_EDITS'] = '1'
+
+if '--speculative' in sys.argv:
+    os.environ['SPECULATIVE_ANALYSIS'] = '1'
 
-app = PlaningWorkflow().app
+if option('--max-rounds') is not None:
+    os.environ['ANALYSIS_MAX_ROUNDS'] = option('--max-rounds')
+
+load_dotenv()
 
 if '--graph' in sys.argv or '-g' in sys.argv:
-    with open("../docs/graph.png","wb") as f:
-        f.write(app.get_graph().draw_mermaid_png())
-        sys.exit()
+    from workflows.rendering import render_graph
+    from workflows.workflow import PlaningWorkflow
+    app = PlaningWorkflow().app
+    path = option('--graph', '-g')
+    path = path if path is not None and not path.startswith('-') else "../docs/graph.png"
+    print(f"Graph saved to {render_graph(app.get_graph(), path)}.")
+    sys.exit()
+
+from workflows.checkpoints import SqliteCheckpointer
+checkpointer = SqliteCheckpointer.from_env()
 
-if '--debug' in sys.argv or '-d' in sys.argv:
-    app.invoke({}, debug=True)
+if '--sessions' in sys.argv or '-l' in sys.argv:
+    for session in checkpointer.sessions():
+        status = "finished" if session['finished'] else "in progress"
+        updated = datetime.fromtimestamp(session['updated']).strftime('%Y-%m-%d %H:%M')
+        print(f"{session['session_id']}  {updated}  {status:<11}  {session['project_name'] or ''}")
     sys.exit()
 
-app.invoke({})
+if '--index' in sys.argv:
+    from crews.library import project_library
+    library = project_library()
+    if library is None:
+        print("The project library is disabled. Set LIBRARY_DB to the path of its database.")
+        sys.exit(1)
+    start = time.perf_counter()
+    count = library.rebuild(checkpointer)
+    print(f"Indexed {count} finished sessions in {time.perf_counter() - start:.2f}s.")
+    sys.exit()
+
+if '--batch' in sys.argv or '-b' in sys.argv:
+    from batch import BatchRunner
+    runner = BatchRunner(
+        workers=int(option('--workers', '-w') or 4),
+        output_dir=option('--output', '-o') or 'reports',
+        checkpointer=checkpointer)
+    runner.run(runner.load(option('--batch', '-b')))
+    sys.exit()
+
+from workflows.workflow import PlaningWorkflow
+from crews.cache import ResponseCache
+from crews.limits import llm_stats
+from crews.memory import memory_store
+from crews.library import project_library
+from tracing import close_trace
+asynchronous = '--async' in sys.argv or '-a' in sys.argv
+workflow = PlaningWorkflow(checkpointer=checkpointer, asynchronous=asynchronous)
+app = workflow.app
+
+session_id = option('--resume', '-r')
+if session_id is not None:
+    state = None
+    print(f"Resuming session {session_id}.")
+else:
+    session_id = uuid.uuid4().hex
+    state = {'session_id': session_id}
+    print(f"Starting session {session_id}.")
+
+config = {'configurable': {'thread_id': session_id}}
+try:
+    debug = '--debug' in sys.argv or '-d' in sys.argv
+    if asynchronous:
+        asyncio.run(app.ainvoke(state, config, debug=debug))
+    else:
+        app.invoke(state, config, debug=debug)
+finally:
+    trace = close_trace(session_id)
+    print(trace.summary())
+    print(f"Trace saved to {trace.export()}.")
+
+stats = ResponseCache.shared().stats()
+print(f"Response cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions.")
+if workflow.speculation is not None:
+    speculation = workflow.speculation
+    print(f"Speculative analysis: {speculation.used} used, {speculation.discarded} discarded of {speculation.started}, "
+          f"{speculation.skipped} answers while a round was running.")
+print(f"LLM calls: {llm_stats().summary()}.")
+memory = memory_store().stats()
+if memory:
+    print(f"Agent memory: {memory['entries']} notes in {memory['namespaces']} sessions, {memory['compactions']} compactions, "
+          f"{memory['evictions']} evictions, {memory['recalls']} lookups ({memory['recall_ms']:.2f}ms average, {memory['max_recall_ms']:.2f}ms max).")
+library = project_library()
+if library is not None:
+    indexed = library.stats()
+    print(f"Project library: {indexed['projects']} projects, {indexed['indexed']} indexed ({indexed['index_ms']:.1f}ms average), "
+          f"{indexed['queries']} lookups ({indexed['query_ms']:.2f}ms average, {indexed['max_query_ms']:.2f}ms max), "
+          f"{indexed['proposals']} proposals.")
@@ -0,0 +1,197 @@
+"""Opt-in CPU and memory profiling of the workflow nodes."""
+
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from functools import cache
+
+logger = logging.getLogger(__name__)
+
+class _Run():
+    """A run of a node being profiled."""
+
+    def __init__(self, name: str, session_id: str, number: int):
+        self.name = name
+        self.session_id = session_id
+        self.number = number
+        self.samples = Counter[str]()
+
+def _label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _fold(thread: str, frame) -> str:
+    """Fold the stack of a frame into a "thread;root;...;leaf" line."""
+    labels = list[str]()
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    labels.append(thread)
+    return ';'.join(reversed(labels))
+
+class NodeProfiler():
+    """
+    Profiles the CPU and the memory of the workflow nodes.
+
+    While a node runs, a sampling thread records the stacks of all the threads of the process
+    every `interval` seconds (so the crews running on the worker pools are included, and so are
+    the other nodes running at the same time), and writes them to
+    <folder>/<session_id>/<node>-<run>.folded, in the folded format of the flame graph tools
+    (e.g. flamegraph.pl or speedscope). The allocations are traced with tracemalloc, and the
+    allocations that grew the most since the previous run of the same node (or since the start
+    of the node, on its first run) are written to <node>-<run>.alloc.txt.
+
+    Profiling slows the nodes down, so it is only enabled by PROFILE_NODES (main.py --profile).
+
+    Attributes:
+        folder (str): The folder of the profiles.
+        interval (float): The sampling interval in seconds.
+        top (int): The number of allocation sites written per node run.
+        frames (int): The number of frames stored by tracemalloc per allocation.
+    """
+
+    def __init__(self, folder: str, interval: float = 0.005, top: int = 25, frames: int = 8):
+        self.folder = folder
+        self.interval = interval
+        self.top = top
+        self.frames = frames
+        self._active = list[_Run]()
+        self._runs = Counter[tuple[str, str]]()
+        self._snapshots = dict[tuple[str, str], tracemalloc.Snapshot]()
+        self._condition = threading.Condition()
+        self._sampler = None
+
+    @classmethod
+    def from_env(cls) -> 'NodeProfiler':
+        """
+        Create a profiler configured from the PROFILE_* environment variables.
+
+        Returns:
+            NodeProfiler: The configured profiler.
+        """
+        return cls(
+            folder=os.environ.get('PROFILE_DIR') or 'profiles',
+            interval=float(os.environ.get('PROFILE_INTERVAL') or 0.005),
+            top=int(os.environ.get('PROFILE_TOP') or 25),
+            frames=int(os.environ.get('PROFILE_FRAMES') or 8),
+        )
+
+    @contextmanager
+    def profile(self, name: str, session_id: str | None):
+        """
+        Profile the run of a node.
+
+        Args:
+            name (str): The name of the node.
+            session_id (str | None): The id of the session.
+        """
+        session_id = session_id or 'default'
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        start = self._snapshot()
+        with self._condition:
+            self._runs[(session_id, name)] += 1
+            run = _Run(name, session_id, self._runs[(session_id, name)])
+            self._active.append(run)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, name='profiler', daemon=True)
+                self._sampler.start()
+            self._condition.notify()
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - began
+            with self._condition:
+                self._active.remove(run)
+            end = self._snapshot()
+            with self._condition:
+                previous = self._snapshots.get((session_id, name), start)
+                self._snapshots[(session_id, name)] = end
+            self._write(run, duration, end, previous)
+
+    def forget(self, session_id: str):
+        """
+        Release the run counters and the memory snapshots of a session that ended.
+
+        Args:
+            session_id (str): The id of the session.
+        """
+        with self._condition:
+            for key in [key for key in self._runs if key[0] == session_id]:
+                del self._runs[key]
+                self._snapshots.pop(key, None)
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+
+    def _sample(self):
+        me = threading.get_ident()
+        while True:
+            with self._condition:
+                while not self._active:
+                    self._condition.wait()
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stacks = [
+                    _fold(names.get(ident, str(ident)), frame)
+                    for ident, frame in sys._current_frames().items()  # pylint: disable=protected-access
+                    if ident != me
+                ]
+                for run in self._active:
+                    run.samples.update(stacks)
+            time.sleep(self.interval)
+
+    def _write(self, run: _Run, duration: float, end: tracemalloc.Snapshot, previous: tracemalloc.Snapshot):
+        folder = os.path.join(self.folder, run.session_id)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{run.name}-{run.number:03d}")
+        with open(f"{path}.folded", "w", encoding="utf-8") as file:
+            for stack, count in sorted(run.samples.items()):
+                file.write(f"{stack} {count}\n")
+        differences = end.compare_to(previous, 'lineno')
+        growth = sum(difference.size_diff for difference in differences)
+        baseline = "the start of the node" if run.number == 1 else f"the end of run {run.number - 1}"
+        with open(f"{path}.alloc.txt", "w", encoding="utf-8") as file:
+            file.write(f"{run.name} run {run.number}: {duration:.3f}s, {sum(run.samples.values())} stack samples\n")
+            file.write(f"Traced memory {growth / 1024:+.1f} KiB since {baseline}, "
+                       f"{sum(stat.size for stat in end.statistics('filename')) / 1024:.1f} KiB in total\n\n")
+            for difference in differences[:self.top]:
+                file.write(f"{difference}\n")
+        logger.info(
+            "Profiled %s run %d: %.2fs, %d samples, %+.1f KiB (%s.*).",
+            run.name, run.number, duration, sum(run.samples.values()), growth / 1024, path)
+
+@cache
+def node_profiler() -> NodeProfiler | None:
+    """
+    Get the node profiler of the process, or None if PROFILE_NODES is not set.
+
+    Returns:
+        NodeProfiler | None: The shared profiler.
+    """
+    if (os.environ.get('PROFILE_NODES') or '').lower() not in ('1', 'true', 'yes'):
+        return None
+    return NodeProfiler.from_env()
+
+def profiled(name: str, session_id: str | None):
+    """
+    Profile the run of a node when profiling is enabled.
+
+    Args:
+        name (str): The name of the node.
+        session_id (str | None): The id of the session.
+
+    Returns:
+        ContextManager: The profile of the run, or a context that does nothing.
+    """
+    profiler = node_profiler()
+    return profiler.profile(name, session_id) if profiler is not None else nullcontext()
@@ -0,0 +1,6 @@
+"""Makes the modules of src importable by the tests, as when running from src."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,92 @@
+"""Tests of the disk-backed cache of the crew responses."""
+
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from crews import cache as cache_module
+from crews.cache import ResponseCache
+
+def agent(model: str = 'gpt-4o', role: str = 'Analyst') -> SimpleNamespace:
+    return SimpleNamespace(llm=SimpleNamespace(model_name=model, temperature=0.7), role=role, goal='Goal.', backstory='Story.')
+
+def task(description: str = 'Analyze the project.') -> SimpleNamespace:
+    return SimpleNamespace(description=description, expected_output='JSON', output_json=None)
+
+def entries(cache: ResponseCache) -> int:
+    return sum(len(files) for _, _, files in os.walk(cache.directory))
+
+def test_key_changes_with_the_model_the_agent_and_the_prompt():
+    key = ResponseCache.key_for(agent(), task())
+    assert key == ResponseCache.key_for(agent(), task())
+    assert key != ResponseCache.key_for(agent(model='gpt-4o-mini'), task())
+    assert key != ResponseCache.key_for(agent(role='Manager'), task())
+    assert key != ResponseCache.key_for(agent(), task('Analyze the other project.'))
+
+def test_get_returns_what_was_set_and_counts_hits(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    assert cache.get('ab01') is None
+    cache.set('ab01', {'description': 'A calculator.'})
+    cache.set('ab02', 'Plain text')
+    assert cache.get('ab01') == {'description': 'A calculator.'}
+    assert cache.get('ab02') == 'Plain text'
+    assert cache.stats() == {'hits': 2, 'misses': 1, 'hit_rate': 2 / 3, 'evictions': 0}
+
+def test_bypass_misses_but_still_stores(tmp_path):
+    ResponseCache(str(tmp_path), bypass=True).set('ab01', 'Stored')
+    bypassed = ResponseCache(str(tmp_path), bypass=True)
+    assert bypassed.get('ab01') is None
+    assert ResponseCache(str(tmp_path)).get('ab01') == 'Stored'
+
+def test_entries_expire_a_ttl_after_they_were_created(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    cache.set('ab01', 'Old')
+    cache.set('ab02', 'Also old')
+    now = time.time()
+    monkeypatch.setattr(cache_module.time, 'time', lambda: now + 61)
+    assert cache.get('ab01') is None
+    assert cache.stats()['evictions'] == 1
+    monkeypatch.setattr(cache_module.time, 'time', lambda: now + 61 + cache_module.SWEEP_INTERVAL)
+    cache.set('ab03', 'New')
+    assert entries(cache) == 1
+    assert cache.get('ab03') == 'New'
+
+def test_reading_an_entry_does_not_extend_its_ttl(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    cache.set('ab01', 'Response')
+    now = time.time()
+    monkeypatch.setattr(cache_module.time, 'time', lambda: now + 50)
+    assert cache.get('ab01') == 'Response'
+    monkeypatch.setattr(cache_module.time, 'time', lambda: now + 70)
+    assert cache.get('ab01') is None
+
+def test_least_recently_used_entries_are_evicted_down_to_the_low_water_mark(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_entries=10)
+    for i in range(10):
+        cache.set(f"ab{i:02d}", f"Response {i}")
+        path = cache._path(f"ab{i:02d}")  # pylint: disable=protected-access
+        os.utime(path, (1000 + i, os.stat(path).st_mtime))
+    path = cache._path('ab00')  # pylint: disable=protected-access
+    os.utime(path, (5000, os.stat(path).st_mtime))
+    cache.set('ab10', 'Response 10')
+    assert entries(cache) == int(10 * cache_module.LOW_WATER)
+    assert cache.stats()['evictions'] == 11 - int(10 * cache_module.LOW_WATER)
+    assert cache.get('ab00') == 'Response 0'
+    assert cache.get('ab10') == 'Response 10'
+    assert cache.get('ab01') is None
+
+def test_size_limit_in_bytes(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=1000)
+    for i in range(20):
+        cache.set(f"ab{i:02d}", 'x' * 100)
+    assert sum(os.path.getsize(os.path.join(folder, name))
+               for folder, _, files in os.walk(cache.directory) for name in files) <= 1000
+
+@pytest.mark.parametrize('replace', [True, False])
+def test_tracked_size_is_kept_in_step_with_the_disk(tmp_path, replace):
+    cache = ResponseCache(str(tmp_path), max_entries=100)
+    cache.set('ab01', 'First')
+    cache.set('ab01' if replace else 'ab02', 'Second')
+    assert cache._entries == entries(cache)  # pylint: disable=protected-access
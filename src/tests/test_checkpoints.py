@@ -0,0 +1,115 @@
+"""Tests of the SQLite checkpointer."""
+
+import json
+
+import pytest
+
+pytest.importorskip('langgraph')
+
+from langgraph.checkpoint.base import empty_checkpoint  # pylint: disable=wrong-import-position
+
+from workflows.checkpoints import SqliteCheckpointer  # pylint: disable=wrong-import-position
+
+def states(count: int) -> list[dict]:
+    """Channel values of consecutive checkpoints: a growing list, a changing text, a channel that comes and goes."""
+    values = []
+    for step in range(count):
+        state = {
+            'project_name': 'Calculator',
+            'queries': [{'question': f"Q{i}?", 'answer': f"A{i}"} for i in range(step)],
+            'project_description': f"Revision {step // 2}",
+        }
+        if step % 3 == 1:
+            state['questions'] = [{'text': f"Next {step}?", 'proposal': ''}]
+        values.append(state)
+    return values
+
+def store(checkpointer: SqliteCheckpointer, thread_id: str, values: list[dict]) -> list[str]:
+    config = {'configurable': {'thread_id': thread_id}}
+    stamps = []
+    for step, channel_values in enumerate(values):
+        checkpoint = {**empty_checkpoint(), 'id': f"{step:04d}", 'channel_values': channel_values}
+        config = checkpointer.put(config, checkpoint, {'step': step})
+        stamps.append(config['configurable']['thread_ts'])
+    return stamps
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'sessions.db')
+
+def test_checkpoints_are_rebuilt_across_snapshots(path):
+    checkpointer = SqliteCheckpointer(path, snapshot_interval=3)
+    values = states(8)
+    stamps = store(checkpointer, 's1', values)
+    snapshots = [row[0] for row in checkpointer._conn.execute(  # pylint: disable=protected-access
+        "SELECT snapshot FROM checkpoints WHERE thread_id = 's1' ORDER BY thread_ts")]
+    assert snapshots == [1, 0, 0, 1, 0, 0, 1, 0]
+    reopened = SqliteCheckpointer(path, snapshot_interval=3)
+    for stamp, expected in zip(stamps, values):
+        for saver in (checkpointer, reopened):
+            item = saver.get_tuple({'configurable': {'thread_id': 's1', 'thread_ts': stamp}})
+            assert item.checkpoint['channel_values'] == expected
+    latest = reopened.get_tuple({'configurable': {'thread_id': 's1'}})
+    assert latest.config['configurable']['thread_ts'] == stamps[-1]
+    assert latest.parent_config['configurable']['thread_ts'] == stamps[-2]
+    assert latest.metadata == {'step': 7}
+
+def test_grown_lists_are_stored_as_their_new_items(path):
+    checkpointer = SqliteCheckpointer(path, snapshot_interval=10)
+    store(checkpointer, 's1', states(3))
+    rows = checkpointer._conn.execute(  # pylint: disable=protected-access
+        "SELECT channel_values, appended FROM checkpoints WHERE thread_id = 's1' ORDER BY thread_ts").fetchall()
+    changed, appended = json.loads(rows[2][0]), json.loads(rows[2][1])
+    assert 'queries' not in changed
+    assert len(appended['queries']) == 1
+
+def test_resumed_session_continues_the_delta_chain(path):
+    values = states(5)
+    stamps = store(SqliteCheckpointer(path, snapshot_interval=3), 's1', values[:2])
+    checkpointer = SqliteCheckpointer(path, snapshot_interval=3)
+    config = {'configurable': {'thread_id': 's1', 'thread_ts': stamps[-1]}}
+    for step in range(2, 5):
+        config = checkpointer.put(config, {**empty_checkpoint(), 'id': f"{step:04d}", 'channel_values': values[step]}, {})
+    snapshots = [row[0] for row in checkpointer._conn.execute(  # pylint: disable=protected-access
+        "SELECT snapshot FROM checkpoints WHERE thread_id = 's1' ORDER BY thread_ts")]
+    assert snapshots == [1, 0, 0, 1, 0]
+    for step in range(5):
+        item = SqliteCheckpointer(path).get_tuple({'configurable': {'thread_id': 's1', 'thread_ts': f"{step:04d}"}})
+        assert item.checkpoint['channel_values'] == values[step]
+
+def test_list_is_most_recent_first(path):
+    checkpointer = SqliteCheckpointer(path, snapshot_interval=3)
+    stamps = store(checkpointer, 's1', states(6))
+    store(checkpointer, 's2', states(2))
+    config = {'configurable': {'thread_id': 's1'}}
+    assert [item.config['configurable']['thread_ts'] for item in checkpointer.list(config)] == stamps[::-1]
+    assert [item.config['configurable']['thread_ts'] for item in checkpointer.list(config, limit=2)] == stamps[:-3:-1]
+    before = {'configurable': {'thread_id': 's1', 'thread_ts': stamps[3]}}
+    assert [item.config['configurable']['thread_ts'] for item in checkpointer.list(config, before=before)] == stamps[2::-1]
+    assert [item.metadata['step'] for item in checkpointer.list(config, filter={'step': 4})] == [4]
+
+def test_pending_writes_are_loaded_with_their_checkpoint(path):
+    checkpointer = SqliteCheckpointer(path)
+    stamps = store(checkpointer, 's1', states(2))
+    config = {'configurable': {'thread_id': 's1', 'thread_ts': stamps[-1]}}
+    checkpointer.put_writes(config, [('work', {'Login': 1}), ('branch_usage', {'feature:Login': 2})], 'task-b')
+    checkpointer.put_writes(config, [('work', {'Search': 3})], 'task-a')
+    item = SqliteCheckpointer(path).get_tuple({'configurable': {'thread_id': 's1'}})
+    assert item.pending_writes == [
+        ('task-a', 'work', {'Search': 3}),
+        ('task-b', 'work', {'Login': 1}),
+        ('task-b', 'branch_usage', {'feature:Login': 2}),
+    ]
+    previous = checkpointer.get_tuple({'configurable': {'thread_id': 's1', 'thread_ts': stamps[0]}})
+    assert previous.pending_writes == []
+
+def test_sessions_are_released_when_finished_and_bounded(path):
+    checkpointer = SqliteCheckpointer(path, max_sessions=2)
+    for thread_id in ('s1', 's2', 's3'):
+        store(checkpointer, thread_id, states(2))
+    assert list(checkpointer._heads) == ['s2', 's3']  # pylint: disable=protected-access
+    store(checkpointer, 's3', [{**states(3)[2], 'final_report': '# Report'}])
+    assert list(checkpointer._heads) == ['s2']  # pylint: disable=protected-access
+    sessions = {session['session_id']: session for session in checkpointer.sessions()}
+    assert sessions['s3']['finished'] and not sessions['s1']['finished']
+    assert sessions['s1']['project_name'] == 'Calculator'
@@ -0,0 +1,34 @@
+"""Tests of the models sharing the HTTP clients of the process."""
+
+import pytest
+
+pytest.importorskip('crewai')
+pytest.importorskip('langchain_openai')
+
+from crews.clients import default_model, pooled_llm  # pylint: disable=wrong-import-position
+
+@pytest.fixture(autouse=True)
+def environment(monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'sk-test')
+    default_model.cache_clear()
+    yield
+    default_model.cache_clear()
+
+def test_default_model_is_the_crewai_default(monkeypatch):
+    from crewai import Agent  # pylint: disable=import-outside-toplevel
+    monkeypatch.delenv('OPENAI_MODEL_NAME', raising=False)
+    agent = Agent(role='Analyst', goal='Analyze.', backstory='An analyst.')
+    assert default_model() == agent.llm.model_name
+    assert pooled_llm().model_name == agent.llm.model_name
+
+def test_default_model_follows_openai_model_name(monkeypatch):
+    monkeypatch.setenv('OPENAI_MODEL_NAME', 'gpt-3.5-turbo')
+    assert pooled_llm().model_name == 'gpt-3.5-turbo'
+    assert pooled_llm('gpt-4o-mini', 5).model_name == 'gpt-4o-mini'
+
+def test_pooled_models_share_the_http_clients_but_not_the_callbacks():
+    first, second = pooled_llm(), pooled_llm()
+    assert first is not second
+    assert first.http_client is second.http_client
+    first.callbacks = ['handler']
+    assert not second.callbacks
@@ -0,0 +1,51 @@
+"""Tests of the helpers shared by the crews and the workflow."""
+
+from common import add_usage, apply_edits, change, project_description, render_description
+
+def test_edits_add_to_or_replace_their_section():
+    sections = {'Overview': 'A calculator.', 'Security': 'No login.'}
+    edits = [
+        {'section': 'overview', 'action': 'add', 'text': 'It has a history.'},
+        {'section': 'Security ', 'action': 'replace', 'text': 'Login with a password.'},
+        {'section': 'Platforms', 'action': 'add', 'text': 'Windows.'},
+    ]
+    assert apply_edits(sections, edits) == {
+        'Overview': 'A calculator.\nIt has a history.',
+        'Security': 'Login with a password.',
+        'Platforms': 'Windows.',
+    }
+    assert sections == {'Overview': 'A calculator.', 'Security': 'No login.'}
+
+def test_edits_of_the_same_section_are_applied_in_order():
+    edits = [
+        {'section': 'Platforms', 'action': 'add', 'text': 'Windows.'},
+        {'section': 'platforms', 'action': 'add', 'text': ' Linux. '},
+        {'section': 'Platforms', 'action': 'add', 'text': ''},
+    ]
+    assert apply_edits(None, edits) == {'Platforms': 'Windows.\nLinux.'}
+    replaced = apply_edits({'Platforms': 'Windows.'}, [*edits[1:], {'section': 'PLATFORMS', 'action': 'replace', 'text': 'Web.'}])
+    assert replaced == {'Platforms': 'Web.'}
+
+def test_an_empty_replacement_removes_the_section_from_the_description():
+    sections = {'Overview': 'A calculator.', 'Security': 'No login.'}
+    edited = apply_edits(sections, [{'section': 'Security', 'action': 'replace', 'text': ''}])
+    assert edited == {'Security': ''}
+    assert render_description({**sections, **edited}) == "### Overview\nA calculator."
+
+def test_the_description_is_rendered_from_its_sections_when_there_are_any():
+    sections = {'Overview': 'A calculator.', 'Platforms': 'Windows.'}
+    assert project_description({'project_description': 'Old.', 'description_sections': sections}) == (
+        "### Overview\nA calculator.\n\n### Platforms\nWindows.")
+    assert project_description({'project_description': 'Old.', 'description_sections': {}}) == 'Old.'
+    assert project_description({}) == ''
+
+def test_add_usage_sums_the_known_counters():
+    usage = add_usage(None, {'prompt_tokens': 10, 'completion_tokens': 5, 'total_tokens': 15, 'successful_requests': 1})
+    usage = add_usage(usage, {'total_tokens': 1, 'cached': 3})
+    assert usage == {'prompt_tokens': 10, 'completion_tokens': 5, 'total_tokens': 16, 'successful_requests': 1}
+
+def test_change_measures_the_words_gained_or_lost():
+    assert change('A simple calculator.', 'A simple calculator.') == 0
+    assert change(None, 'A simple calculator.') > 0
+    assert change('A simple calculator.', 'A scientific calculator with graphs.') > change(
+        'A simple calculator.', 'A simple calculator with graphs.')
@@ -0,0 +1,62 @@
+"""Tests of the token budget of the queries section of the prompts."""
+
+from crews.context import ContextBuilder, as_text, estimate_tokens
+
+def queries(count: int, answer: str = 'An answer.') -> list[dict]:
+    return [{'question': f"Question {i}?\nWith more details.", 'answer': f"{answer} {i}"} for i in range(count)]
+
+def test_estimate_tokens():
+    assert estimate_tokens('') == 0
+    assert estimate_tokens(None) == 0
+    assert 0 < estimate_tokens('A short text.') < estimate_tokens('A short text. ' * 10)
+
+def test_as_text():
+    assert as_text(None) == ''
+    assert as_text(('The answer.',)) == 'The answer.'
+    assert as_text(['A', ('B', 'C')]) == 'A B C'
+    assert as_text(42) == '42'
+
+def test_no_queries_make_an_empty_section():
+    output, usage = ContextBuilder().build(None, 0, 100)
+    assert output == ''
+    assert usage == {'prompt_tokens': 100, 'budget': 8000, 'summary_queries': 0, 'delta_queries': 0, 'omitted_queries': 0}
+
+def test_analyzed_queries_are_summarized_and_new_ones_sent_in_full():
+    output, usage = ContextBuilder(answer_width=20).build(queries(3, 'A long answer ' * 10), 2, 100)
+    assert usage['summary_queries'] == 2
+    assert usage['delta_queries'] == 1
+    assert usage['omitted_queries'] == 0
+    summary, new = output.split("New Queries:")
+    assert "1. Question 0? => A long answer A l..." in summary
+    assert "With more details." not in summary
+    assert "3. Question 2?\nWith more details.\n" + 'A long answer ' * 10 + " 2\n" in new
+    assert usage['prompt_tokens'] == 100 + estimate_tokens(output)
+
+def test_analyzed_count_is_capped_to_the_queries():
+    _, usage = ContextBuilder().build(queries(2), 5, 0)
+    assert usage['summary_queries'] == 2
+    assert usage['delta_queries'] == 0
+
+def test_the_oldest_summary_lines_are_dropped_to_respect_the_budget():
+    builder = ContextBuilder(budget=400)
+    output, usage = builder.build(queries(60) + queries(1), 60, 200)
+    assert usage['omitted_queries'] > 0
+    assert usage['summary_queries'] + usage['omitted_queries'] == 60
+    assert usage['delta_queries'] == 1
+    assert f"[{usage['omitted_queries']} earlier queries omitted]" in output
+    assert "\n1. Question 0? =>" not in output
+    assert "60. Question 59? =>" in output
+    assert usage['prompt_tokens'] <= builder.budget
+
+def test_new_queries_are_never_dropped():
+    output, usage = ContextBuilder(budget=10).build(queries(3), 1, 5)
+    assert usage['omitted_queries'] == 1
+    assert usage['delta_queries'] == 2
+    assert "2. Question 1?" in output and "3. Question 2?" in output
+    assert usage['prompt_tokens'] > usage['budget']
+
+def test_budget_is_read_from_the_environment(monkeypatch):
+    monkeypatch.setenv('CONTEXT_TOKEN_BUDGET', '1000')
+    monkeypatch.setenv('CONTEXT_ANSWER_WIDTH', '40')
+    builder = ContextBuilder.from_env()
+    assert (builder.budget, builder.answer_width) == (1000, 40)
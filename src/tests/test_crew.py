@@ -0,0 +1,101 @@
+"""Tests of the planning crews, run against the scripted stub model."""
+
+import pytest
+
+pytest.importorskip('crewai')
+
+# pylint: disable=wrong-import-position
+from benchmarks.stub import StubChatModel
+from crews.cache import ResponseCache
+from crews.crew import AnalysisCrew, ReportingCrew, WorkCrew
+from crews.tasks import REPORT_SECTIONS
+
+@pytest.fixture(name='offline')
+def offline_fixture(monkeypatch, tmp_path):
+    monkeypatch.setattr(ResponseCache, 'shared', staticmethod(lambda: ResponseCache(str(tmp_path / 'cache'), bypass=True)))
+    monkeypatch.setenv('LIBRARY_DB', 'off')
+    return tmp_path
+
+def feature_state() -> dict:
+    return {
+        'session_id': None,
+        'project_name': 'Shop',
+        'project_description': 'An online shop.',
+        'feature': {'name': 'Login', 'description': 'The users log in.'},
+    }
+
+def test_a_feature_is_broken_into_activities_and_tasks(offline):
+    stub = StubChatModel(work={'activities': 2, 'tasks': 3}, stats={}, rounds={})
+    update = WorkCrew(llm=stub).decompose_feature(feature_state())
+    feature = update['work']['Login']
+    assert [activity['name'] for activity in feature['activities']] == ['Login / activities 0', 'Login / activities 1']
+    assert [len(activity['tasks']) for activity in feature['activities']] == [3, 3]
+    assert feature['errors'] == []
+    assert update['branch_usage']['feature:Login']['successful_requests'] == 3
+
+def test_an_activity_that_fails_is_recorded_without_failing_the_feature(offline, monkeypatch):
+    crew = WorkCrew(llm=StubChatModel(work={'activities': 2, 'tasks': 1}, stats={}, rounds={}))
+    run = crew._run  # pylint: disable=protected-access
+
+    def failing(name, task, usage):
+        if name == 'identify_tasks' and 'Login / activities 0' in task.description:
+            raise ValueError('Malformed answer')
+        return run(name, task, usage)
+
+    monkeypatch.setattr(crew, '_run', failing)
+    feature = crew.decompose_feature(feature_state())['work']['Login']
+    assert [len(activity['tasks']) for activity in feature['activities']] == [0, 1]
+    assert feature['errors'] == ['Tasks of Login / activities 0: ValueError: Malformed answer']
+
+def test_a_feature_without_activities_records_the_error(offline, monkeypatch):
+    crew = WorkCrew(llm=StubChatModel(stats={}, rounds={}))
+
+    def failing(name, task, usage):
+        raise TimeoutError('No answer')
+
+    monkeypatch.setattr(crew, '_run', failing)
+    update = crew.decompose_feature(feature_state())
+    assert update['work']['Login']['activities'] == []
+    assert update['work']['Login']['errors'] == ['Activities: TimeoutError: No answer']
+
+def report_state(path: str) -> dict:
+    return {
+        'session_id': None,
+        'project_name': 'Shop',
+        'project_description': 'An online shop.',
+        'queries': [],
+        'report_path': path,
+        'usage': None,
+    }
+
+def test_report_sections_are_assembled_in_the_order_of_the_template(offline):
+    first = REPORT_SECTIONS[0].splitlines()[0]
+    stub = StubChatModel(delays={first: 0.3}, stats={}, rounds={})
+    path = str(offline / 'report.md')
+    update = ReportingCrew(llm=stub, parallel=True).kickoff(report_state(path))
+    report = update['final_report']
+    headings = [line for line in report.splitlines() if line.startswith('## ')]
+    assert report.startswith('# Shop\n#### Project Summary Report\n\n' + first + '\n')
+    assert headings == [section.splitlines()[0] for section in REPORT_SECTIONS]
+    assert update['usage']['successful_requests'] == len(REPORT_SECTIONS)
+    with open(path, encoding='utf-8') as file:
+        assert file.read() == report
+
+def test_a_section_without_its_heading_gets_it(offline, monkeypatch):
+    crew = ReportingCrew(llm=StubChatModel(stats={}, rounds={}), parallel=True)
+    monkeypatch.setattr(crew, '_run', lambda name, task, usage: ('  Details of the section.\n', usage))
+    report = crew.kickoff(report_state(str(offline / 'report.md')))['final_report']
+    assert f"{REPORT_SECTIONS[1].splitlines()[0]}\nDetails of the section.\n\n" in report
+
+def test_the_analyst_edits_only_the_sections_that_change(offline):
+    stub = StubChatModel(questions=1, growth=42, stats={}, rounds={})
+    crew = AnalysisCrew(llm=stub, edits=True)
+    state = {'session_id': None, 'project_name': 'Shop', 'project_description': 'An online shop.', 'queries': [], 'finish': False}
+    first = crew.kickoff(state)
+    assert first['description_sections'] == {'Overview': 'An online shop.', 'Aspect 1': ('It has more details. ' * 2).strip()}
+    assert 'project_description' not in first
+    state = {**state, 'description_sections': first['description_sections'], 'revisions': first['revisions']}
+    second = crew.kickoff(state)
+    assert list(second['description_sections']) == ['Aspect 2']
+    assert second['revisions'][0]['round'] == 2
+    assert second['revisions'][0]['length'] > first['revisions'][0]['length']
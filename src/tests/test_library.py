@@ -0,0 +1,101 @@
+"""Tests of the library of the past projects."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from crews.library import ProjectLibrary, project_library
+
+def session(session_id: str, name: str, answers: dict[str, str], report: str = '') -> dict:
+    return {
+        'session_id': session_id,
+        'project_name': name,
+        'queries': [{'question': question, 'answer': answer} for question, answer in answers.items()],
+        'final_report': report,
+    }
+
+@pytest.fixture(name='library')
+def library_fixture(tmp_path):
+    library = ProjectLibrary(str(tmp_path / 'library' / 'library.db'))
+    library.add_session(session('calculator', 'Calculator', {
+        'What is the target audience of the project?': 'Students of the elementary school.',
+        'Which database stores the data?': '',
+    }, "# Calculator\n## Overview\nA calculator for students.\n## Risks\n\n"))
+    library.add_session(session('agenda', 'Agenda', {
+        'Which platforms are supported?': 'Android and iOS.',
+    }))
+    return library
+
+def test_the_context_has_the_past_answers_relevant_to_the_project(library):
+    context = library.context('Homework helper\nAn application for the students of a school.')
+    assert context.startswith("\nAnswers from similar past projects")
+    assert "- [Calculator] What is the target audience of the project? Students of the elementary school.\n" in context
+    assert "- [Calculator, report: Overview] A calculator for students." in context
+    assert 'Risks' not in context and 'database' not in context and 'Agenda' not in context
+
+def test_the_context_leaves_out_the_current_session_and_respects_the_budget(library):
+    assert library.context('An application for students.', exclude='calculator') == ''
+    assert library.context('The') == ''
+    small = ProjectLibrary(library.path, context_tokens=1)
+    assert small.context('An application for students.') == ''
+
+def test_a_session_added_again_replaces_its_entries(library):
+    library.add_session(session('calculator', 'Calculator', {'Which platforms are supported?': 'Windows.'}))
+    library.add_session({'project_name': 'Without session'})
+    assert 'students' not in library.context('An application for students.').lower()
+    assert library.stats()['projects'] == 2
+
+def test_a_question_without_proposal_gets_the_answer_of_a_similar_past_question(library):
+    question = library.propose({'text': 'Who is the target audience of this project?', 'proposal': ''})
+    assert question == {
+        'text': 'Who is the target audience of this project?',
+        'proposal': '',
+        'past_answer': 'Students of the elementary school. (as answered for Calculator)',
+    }
+    assert library.stats()['proposals'] == 1
+
+@pytest.mark.parametrize('question, exclude', [
+    ({'text': 'Who is the target audience of this project?', 'proposal': 'Teachers.'}, None),
+    ({'text': 'Who is the target audience of this project?', 'proposal': ''}, 'calculator'),
+    ({'text': 'What is the expected budget of the project?', 'proposal': ''}, None),
+])
+def test_a_question_keeps_its_proposal_or_has_no_past_answer(library, question, exclude):
+    assert library.propose(question, exclude) is question
+
+def test_the_finished_sessions_of_a_checkpointer_are_indexed(tmp_path):
+    state = session('shop', 'Shop', {'Which payment methods are accepted?': 'Credit cards.'})
+    checkpointer = SimpleNamespace(
+        sessions=lambda: [{'session_id': 'shop', 'finished': True}, {'session_id': 'draft', 'finished': False}],
+        get_tuple=lambda config: SimpleNamespace(checkpoint={'channel_values': state}))
+    library = ProjectLibrary(str(tmp_path / 'library.db'))
+    assert library.rebuild(checkpointer) == 1
+    assert 'Credit cards.' in library.context('An online shop accepting payment by credit cards.')
+
+def test_the_library_is_only_enabled_by_library_db(monkeypatch, tmp_path):
+    project_library.cache_clear()
+    try:
+        monkeypatch.delenv('LIBRARY_DB', raising=False)
+        assert project_library() is None
+        project_library.cache_clear()
+        monkeypatch.setenv('LIBRARY_DB', 'OFF')
+        assert project_library() is None
+        project_library.cache_clear()
+        monkeypatch.setenv('LIBRARY_DB', str(tmp_path / 'library.db'))
+        monkeypatch.setenv('LIBRARY_CONTEXT_TOKENS', '100')
+        library = project_library()
+        assert (library.path, library.context_tokens) == (str(tmp_path / 'library.db'), 100)
+    finally:
+        project_library.cache_clear()
+
+def test_a_past_answer_is_only_used_when_the_user_picks_it():
+    pytest.importorskip('langgraph')
+    # pylint: disable=import-outside-toplevel
+    from workflows.nodes import PlanningNodes
+    from workflows.users import ScriptedUser
+    questions = [
+        {'text': f"Who is the target audience of project {i}?", 'proposal': '', 'past_answer': 'Students.'}
+        for i in range(3)
+    ]
+    queries, _ = PlanningNodes(ScriptedUser(['', 'PAST', 'Teachers.'])).ask_questions(questions, 3)
+    assert [query['answer'] for query in queries] == [
+        'The analyst can propose the answer to this question.', 'Students.', 'Teachers.']
@@ -0,0 +1,177 @@
+"""Tests of the rate limiting, retries and coalescing of the LLM calls."""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from crews import limits
+from crews.limits import RateLimiter, SingleFlight, TokenBucket, is_transient, retry_after, with_retries
+
+class Clock():
+    """A clock that only moves when the code sleeps."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = list[float]()
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture(name='clock')
+def clock_fixture(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(limits, 'time', SimpleNamespace(monotonic=clock.monotonic, sleep=clock.sleep))
+    return clock
+
+class RateLimitError(Exception):
+    def __init__(self, message: str = 'Rate limited', headers: dict | None = None):
+        super().__init__(message)
+        self.response = SimpleNamespace(headers=headers or {})
+
+def test_bucket_refills_at_its_rate_up_to_its_capacity(clock):
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.take(60) == 0
+    assert bucket.take(2) == pytest.approx(2)
+    clock.now += 1
+    assert bucket.take(1) == 0
+    clock.now += 3600
+    assert bucket.take(100) == 0
+    assert bucket.take(1) == pytest.approx(1)
+
+def test_bucket_debt_delays_the_next_takes(clock):
+    bucket = TokenBucket(per_minute=60)
+    bucket.settle(70)
+    assert bucket.take(1) == pytest.approx(11)
+    bucket.settle(-20)
+    assert bucket.take(1) == 0
+
+def test_limiter_waits_for_the_requests_and_the_tokens(clock):
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=600)
+    assert limiter.acquire(600) == 0
+    assert limiter.acquire(100) == pytest.approx(10)
+    assert clock.sleeps == [pytest.approx(10)]
+    limiter.settle(100, 40)
+    assert limiter.tokens.take(60) == 0
+
+def test_unlimited_limiter_never_waits(clock):
+    limiter = RateLimiter()
+    assert [limiter.acquire(10 ** 6) for _ in range(100)] == [0] * 100
+    limiter.settle(100, 10 ** 6)
+    assert clock.sleeps == []
+
+def test_identical_calls_in_flight_are_sent_once():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'Response'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do('key', call)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flights.do('key', call)))
+    follower.start()
+    follower.join(0.1)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert sorted(results) == [('Response', False), ('Response', True)]
+    assert len(calls) == 1
+    assert flights.do('key', lambda: 'Again') == ('Again', False)
+
+def test_the_error_of_a_call_in_flight_is_raised_to_the_waiting_calls():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    errors = []
+
+    def call():
+        started.set()
+        release.wait(5)
+        raise TimeoutError('No answer')
+
+    def run():
+        try:
+            flights.do('key', call)
+        except TimeoutError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run)]
+    threads[0].start()
+    started.wait(5)
+    threads.append(threading.Thread(target=run))
+    threads[1].start()
+    threads[1].join(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(errors) == 2
+    assert errors[0] is errors[1]
+
+def test_transient_errors_are_recognized_through_their_causes():
+    assert is_transient(TimeoutError())
+    assert is_transient(RateLimitError())
+    assert is_transient(type('APIStatusError', (Exception,), {'status_code': 503})())
+    assert not is_transient(type('APIStatusError', (Exception,), {'status_code': 400})())
+    assert not is_transient(ValueError('Malformed'))
+    try:
+        try:
+            raise RateLimitError()
+        except RateLimitError as e:
+            raise ValueError('Wrapped') from e
+    except ValueError as e:
+        assert is_transient(e)
+
+def test_retry_after_is_read_from_the_response_headers():
+    assert retry_after(RateLimitError(headers={'retry-after': '7'})) == 7
+    assert retry_after(RateLimitError()) is None
+    assert retry_after(TimeoutError()) is None
+
+def test_transient_errors_are_retried_with_backoff(clock):
+    outcomes = [TimeoutError(), RateLimitError(headers={'retry-after': '30'}), 'Response']
+
+    def call():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert with_retries(call, 'analysis', attempts=3, delay=1.0) == 'Response'
+    assert 0.5 <= clock.sleeps[0] <= 1.5
+    assert clock.sleeps[1] == 30
+
+def test_retries_stop_after_the_attempts(clock):
+    calls = []
+
+    def call():
+        calls.append(1)
+        raise TimeoutError()
+
+    with pytest.raises(TimeoutError):
+        with_retries(call, 'analysis', attempts=3, delay=1.0)
+    assert len(calls) == 3
+    assert 1.0 <= clock.sleeps[1] <= 3.0
+
+def test_other_errors_are_raised_at_once(clock, monkeypatch):
+    monkeypatch.setenv('LLM_RETRIES', '5')
+    calls = []
+
+    def call():
+        calls.append(1)
+        raise ValueError('Malformed')
+
+    with pytest.raises(ValueError):
+        with_retries(call, 'analysis')
+    with pytest.raises(ValueError):
+        with_retries(call, 'analysis', retry=lambda e: len(calls) < 4)
+    assert len(calls) == 4
+    assert len(clock.sleeps) == 2
@@ -0,0 +1,99 @@
+"""Tests of the bounded memory of the agents."""
+
+import time
+
+import pytest
+
+from crews import memory
+from crews.context import estimate_tokens
+from crews.memory import LocalMemory, MemoryStore, memory_store
+
+def test_notes_are_recalled_by_kind_and_relevance_within_the_budget():
+    store = LocalMemory()
+    store.remember('session', 'initial_analysis', 'The calculator supports sums and products.')
+    store.remember('session', 'initial_analysis', 'The agenda sends email reminders.')
+    store.remember('session', 'final_report', 'The calculator report.')
+    assert store.recall('session', 'Which calculator operations?', ('initial_analysis',), 100) == [
+        'The calculator supports sums and products.', 'The agenda sends email reminders.']
+    budget = estimate_tokens('The calculator supports sums and products.')
+    assert store.recall('session', 'Which calculator operations?', ('initial_analysis',), budget) == [
+        'The calculator supports sums and products.']
+    assert store.recall('session', 'Calculator', ('initial_analysis',), 0) == []
+    assert store.recall('other', 'Calculator', ('initial_analysis',), 100) == []
+
+def test_a_note_with_a_key_replaces_the_previous_one():
+    store = LocalMemory()
+    store.remember('session', 'initial_analysis', 'First description.', key='description')
+    store.remember('session', 'initial_analysis', 'Second description.', key='description')
+    store.remember('session', 'initial_analysis', '   ')
+    assert store.recall('session', 'description', ('initial_analysis',), 100) == ['Second description.']
+    assert store.stats()['entries'] == 1
+
+def test_the_oldest_half_of_a_kind_is_compacted_into_a_summary():
+    store = LocalMemory(compact_after=4)
+    for i in range(5):
+        store.remember('session', 'initial_analysis', f"Note {i} about the project.\nMore details.")
+    store.remember('session', 'final_report', 'The report.')
+    notes = store.recall('session', 'project', ('initial_analysis',), 1000)
+    assert notes == [
+        "Note 0 about the project.\nNote 1 about the project.\nNote 2 about the project.",
+        "Note 3 about the project.\nMore details.",
+        "Note 4 about the project.\nMore details.",
+    ]
+    assert store.stats()['compactions'] == 1
+    assert store.stats()['entries'] == 4
+
+def test_a_long_session_keeps_a_steady_size():
+    store = LocalMemory(compact_after=8, summary_chars=200)
+    for i in range(500):
+        store.remember('session', 'initial_analysis', f"Note {i} " + 'about the project ' * 10)
+    notes = store.recall('session', 'project', ('initial_analysis',), 10 ** 6)
+    assert len(notes) <= 8
+    assert len(notes[0]) <= 200
+    assert notes[-1].startswith('Note 499 ')
+
+def test_the_least_recently_used_namespace_is_evicted_first():
+    store = LocalMemory(max_entries=4)
+    for namespace in ('first', 'second'):
+        for i in range(2):
+            store.remember(namespace, 'initial_analysis', f"Note {i} of {namespace}.")
+    store.recall('first', 'Note', ('initial_analysis',), 100)
+    store.remember('third', 'initial_analysis', 'Note of third.')
+    assert store.recall('second', 'Note', ('initial_analysis',), 100) == ['Note 1 of second.']
+    assert len(store.recall('first', 'Note', ('initial_analysis',), 100)) == 2
+    assert store.stats()['evictions'] == 1
+    assert store.stats()['entries'] == 4
+
+def test_old_notes_expire(monkeypatch):
+    store = LocalMemory(max_age=60)
+    store.remember('old', 'initial_analysis', 'Old note.')
+    now = time.time()
+    monkeypatch.setattr(memory.time, 'time', lambda: now + 61)
+    store.remember('new', 'initial_analysis', 'New note.')
+    assert store.recall('old', 'note', ('initial_analysis',), 100) == []
+    assert store.stats()['namespaces'] == 1
+
+def test_forget_releases_the_notes_of_a_session():
+    store = LocalMemory()
+    store.remember('session', 'initial_analysis', 'A note.')
+    store.forget('session')
+    store.forget('unknown')
+    stats = store.stats()
+    assert (stats['entries'], stats['namespaces'], stats['notes']) == (0, 0, 1)
+
+@pytest.mark.parametrize('backend, kind', [
+    ('', LocalMemory),
+    ('off', MemoryStore),
+    ('crews.memory:LocalMemory', LocalMemory),
+])
+def test_the_backend_is_chosen_by_the_environment(monkeypatch, backend, kind):
+    monkeypatch.setenv('MEMORY_BACKEND', backend)
+    monkeypatch.setenv('MEMORY_COMPACT_AFTER', '6')
+    memory_store.cache_clear()
+    try:
+        store = memory_store()
+    finally:
+        memory_store.cache_clear()
+    assert type(store) is kind  # pylint: disable=unidiomatic-typecheck
+    if kind is LocalMemory:
+        assert store.compact_after == 6
@@ -0,0 +1,72 @@
+"""Tests of the nodes of the planning workflow."""
+
+import pytest
+
+pytest.importorskip('langgraph')
+
+from workflows.nodes import PlanningNodes  # pylint: disable=wrong-import-position
+from workflows.states import merge  # pylint: disable=wrong-import-position
+
+def usage(tokens: int) -> dict:
+    return {'prompt_tokens': tokens, 'completion_tokens': 0, 'total_tokens': tokens, 'successful_requests': 1}
+
+def apply(state: dict, update: dict) -> dict:
+    return {**state, **update, 'branch_usage': merge(state.get('branch_usage'), update.get('branch_usage'))}
+
+def test_join_work_adds_each_branch_once_across_a_resume():
+    nodes = PlanningNodes(user=object())
+    features = [{'name': 'Login', 'description': ''}, {'name': 'Search', 'description': ''}]
+    state = {
+        'usage': usage(100),
+        'features': features,
+        'work': {feature['name']: {**feature, 'activities': [], 'errors': []} for feature in features},
+        'branch_usage': {'feature:Login': usage(10), 'feature:Search': usage(20)},
+    }
+    state = apply(state, nodes.join_work(state))
+    assert state['usage']['total_tokens'] == 130
+    assert nodes.plan_work(state) == 'join_work'
+    state = apply(state, nodes.join_work(state))
+    assert state['usage']['total_tokens'] == 130
+    assert state['usage']['successful_requests'] == 3
+
+def test_join_work_adds_the_features_sent_again():
+    nodes = PlanningNodes(user=object())
+    state = {
+        'usage': usage(100),
+        'features': [{'name': 'Login', 'description': ''}],
+        'branch_usage': {'feature:Login': None, 'system': None},
+    }
+    state = apply(state, {'branch_usage': {'feature:Login': usage(15)}})
+    update = nodes.join_work(state)
+    assert update['usage']['total_tokens'] == 115
+    assert update['branch_usage'] == {'feature:Login': None}
+
+def test_join_requirements_adds_only_the_requirements_branches_once():
+    nodes = PlanningNodes(user=object())
+    state = {
+        'usage': usage(100),
+        'branch_usage': {'business': usage(1), 'system': usage(2), 'feature:Login': usage(50)},
+    }
+    state = apply(state, nodes.join_requirements(state))
+    assert state['usage']['total_tokens'] == 103
+    assert state['branch_usage'] == {'business': None, 'system': None, 'feature:Login': usage(50)}
+    assert nodes.join_requirements(state)['usage']['total_tokens'] == 103
+
+def test_plan_work_sends_a_branch_per_feature_not_broken_down_yet():
+    nodes = PlanningNodes(user=object())
+    features = [{'name': name, 'description': ''} for name in ('Login', 'Search', 'Export')]
+    state = {
+        'session_id': 'plan',
+        'project_name': 'Shop',
+        'project_description': 'An online shop.',
+        'features': features,
+        'work': {
+            'Login': {**features[0], 'activities': [], 'errors': []},
+            'Search': {**features[1], 'activities': [], 'errors': ['Activities: TimeoutError: ']},
+        },
+    }
+    branches = nodes.plan_work(state)
+    assert [branch.node for branch in branches] == ['decompose_feature', 'decompose_feature']
+    assert [branch.arg['feature']['name'] for branch in branches] == ['Search', 'Export']
+    assert branches[0].arg['project_description'] == 'An online shop.'
+    assert nodes.plan_work({**state, 'features': []}) == 'join_work'
@@ -0,0 +1,98 @@
+"""Tests of the incremental parsing of the analyst output."""
+
+import json
+
+import pytest
+
+from crews.parsing import CrewOutputParser, parse_crew_output
+
+OUTPUT = json.dumps({
+    'description': 'A "simple" calculator\nwith a \\ key and braces {like} [these].',
+    'questions': [
+        {'text': 'Which operations?', 'proposal': 'Add, subtract, multiply and divide.'},
+        {'text': 'Is there a "memory" key? {M+}', 'proposal': ''},
+        {'text': 'Which platforms\\devices?', 'proposal': 'Web and mobile.'},
+    ],
+})
+
+def feed(text: str, size: int) -> tuple[CrewOutputParser, list]:
+    received = []
+    parser = CrewOutputParser(received.append)
+    for start in range(0, len(text), size):
+        parser.feed(text[start:start + size])
+    return parser, received
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64, len(OUTPUT)])
+def test_chunk_boundaries_do_not_change_the_result(size):
+    parser, received = feed(OUTPUT, size)
+    expected = json.loads(OUTPUT)
+    assert parser.description == expected['description']
+    assert parser.questions == expected['questions']
+    assert received == expected['questions']
+
+def test_questions_are_handed_over_as_soon_as_they_are_complete():
+    received = []
+    parser = CrewOutputParser(received.append)
+    first_end = OUTPUT.index('divide."}') + len('divide."}')
+    second_start = OUTPUT.index('{', first_end)
+    parser.feed(OUTPUT[:first_end - 1])
+    assert received == []
+    parser.feed(OUTPUT[first_end - 1:second_start + 5])
+    assert [question['text'] for question in received] == ['Which operations?']
+
+def test_escaped_quotes_and_backslashes_do_not_end_strings():
+    text = r'{"description": "Say \"hi\" \\", "questions": [{"text": "Quote \"}\"?", "proposal": "\\\""}]}'
+    parser, received = feed(text, 1)
+    assert parser.description == 'Say "hi" \\'
+    assert received == [{'text': 'Quote "}"?', 'proposal': '\\"'}]
+
+def test_text_before_the_object_is_ignored():
+    parser, received = feed('Thought: I know the answer.\n```json\n' + OUTPUT + '\n```', 5)
+    assert parser.description == json.loads(OUTPUT)['description']
+    assert len(received) == 3
+
+def test_truncated_output_keeps_the_complete_questions():
+    cut = OUTPUT.rindex('{"text"') + 20
+    parser, received = feed(OUTPUT[:cut], 4)
+    assert [question['text'] for question in received] == ['Which operations?', 'Is there a "memory" key? {M+}']
+    assert parser.description == json.loads(OUTPUT)['description']
+
+def test_partial_description_salvages_a_cut_off_description():
+    parser, _ = feed('{"description": "A calculator with \\"memory\\" and', 3)
+    assert parser.description is None
+    assert parser.partial_description() == 'A calculator with "memory" and'
+    assert CrewOutputParser().partial_description() is None
+
+def test_malformed_questions_are_skipped():
+    text = '{"description": "D", "questions": [{"text": "Good?", "proposal": ""}, {"text": oops}, {"proposal": "No text"}, {"text": "Also good?"}]}'
+    parser, received = feed(text, 6)
+    assert received == [{'text': 'Good?', 'proposal': ''}, {'text': 'Also good?', 'proposal': ''}]
+
+def test_parse_crew_output_salvages_a_truncated_payload():
+    cut = OUTPUT.rindex('{"text"') + 20
+    result = parse_crew_output(OUTPUT[:cut])
+    assert result['description'] == json.loads(OUTPUT)['description']
+    assert len(result['questions']) == 2
+
+def test_parse_crew_output_has_no_description_when_none_is_recovered():
+    assert parse_crew_output('{"questions": [{"text": "Which operations?", "proposal": ""}, {"text": "cut')['description'] is None
+    assert parse_crew_output({'description': '', 'questions': []})['description'] is None
+
+def test_a_malformed_answer_does_not_overwrite_the_description(monkeypatch, tmp_path):
+    pytest.importorskip('crewai')
+    monkeypatch.setenv('CREW_CACHE_DIR', str(tmp_path))
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel  # pylint: disable=import-outside-toplevel
+    from crews.crew import AnalysisCrew  # pylint: disable=import-outside-toplevel
+    crew = AnalysisCrew(llm=FakeListChatModel(responses=[]), edits=False)
+    monkeypatch.setattr(crew.cache, 'get', lambda key: 'Final Answer: {"questions": [{"text": "Which operations?", "proposal": ""}, {"te')
+    state = {
+        'session_id': None,
+        'project_name': 'Calculator',
+        'project_description': 'A calculator for the web, with a memory key.',
+        'queries': [{'question': 'Which platforms?', 'answer': 'Web.'}],
+        'finish': False,
+    }
+    update = crew.kickoff(state)
+    assert 'project_description' not in update
+    assert [question['text'] for question in update['questions']] == ['Which operations?']
+    assert update['revisions'][0]['change'] == 0.0
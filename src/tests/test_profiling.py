@@ -0,0 +1,89 @@
+"""Tests of the opt-in profiling of the workflow nodes."""
+
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import nullcontext
+
+import pytest
+
+from profiling import NodeProfiler, node_profiler, profiled
+
+@pytest.fixture(autouse=True)
+def stop_tracing():
+    tracing = tracemalloc.is_tracing()
+    yield
+    if not tracing:
+        tracemalloc.stop()
+
+def busy(seconds: float) -> list[bytes]:
+    kept = []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        kept.append(bytes(1024))
+    return kept
+
+def test_each_run_of_a_node_writes_its_stacks_and_allocations(tmp_path):
+    profiler = NodeProfiler(str(tmp_path), interval=0.001)
+    for _ in range(2):
+        with profiler.profile('analyze_description', 'session'):
+            busy(0.05)
+    folder = tmp_path / 'session'
+    assert sorted(os.listdir(folder)) == [
+        'analyze_description-001.alloc.txt', 'analyze_description-001.folded',
+        'analyze_description-002.alloc.txt', 'analyze_description-002.folded',
+    ]
+    stacks = (folder / 'analyze_description-001.folded').read_text(encoding='utf-8').splitlines()
+    assert any('busy (test_profiling.py:' in line for line in stacks)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in stacks)
+    first = (folder / 'analyze_description-001.alloc.txt').read_text(encoding='utf-8')
+    second = (folder / 'analyze_description-002.alloc.txt').read_text(encoding='utf-8')
+    assert first.startswith('analyze_description run 1: ')
+    assert 'since the start of the node' in first
+    assert 'since the end of run 1' in second
+
+def test_the_nodes_running_at_the_same_time_are_profiled_together(tmp_path):
+    profiler = NodeProfiler(str(tmp_path), interval=0.001)
+    barrier = threading.Barrier(2)
+
+    def branch(name: str):
+        with profiler.profile(name, None):
+            barrier.wait(5)
+            busy(0.1)
+            barrier.wait(5)
+
+    threads = [threading.Thread(target=branch, args=(name,), name=name) for name in ('business', 'system')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stacks = (tmp_path / 'default' / 'business-001.folded').read_text(encoding='utf-8')
+    assert any(line.startswith('system;') for line in stacks.splitlines())
+
+def test_forget_releases_the_runs_of_a_session(tmp_path):
+    profiler = NodeProfiler(str(tmp_path), interval=0.001)
+    for session_id in ('first', 'second'):
+        with profiler.profile('report', session_id):
+            pass
+    profiler.forget('first')
+    with profiler.profile('report', 'first'):
+        pass
+    assert sorted(os.listdir(tmp_path / 'first')) == ['report-001.alloc.txt', 'report-001.folded']
+    assert profiler._runs == {('second', 'report'): 1, ('first', 'report'): 1}  # pylint: disable=protected-access
+
+def test_profiling_is_only_enabled_by_profile_nodes(monkeypatch, tmp_path):
+    node_profiler.cache_clear()
+    try:
+        monkeypatch.delenv('PROFILE_NODES', raising=False)
+        assert node_profiler() is None
+        assert isinstance(profiled('report', None), nullcontext)
+        node_profiler.cache_clear()
+        monkeypatch.setenv('PROFILE_NODES', 'yes')
+        monkeypatch.setenv('PROFILE_DIR', str(tmp_path))
+        monkeypatch.setenv('PROFILE_TOP', '5')
+        profiler = node_profiler()
+        assert (profiler.folder, profiler.top) == (str(tmp_path), 5)
+        assert not isinstance(profiled('report', None), nullcontext)
+    finally:
+        node_profiler.cache_clear()
@@ -0,0 +1,80 @@
+"""Tests of the index of the answered questions, used to answer the repeated ones."""
+
+import pytest
+
+from common import words
+from workflows.questions import QuestionIndex
+
+def query(question: str, answer: str = 'An answer.') -> dict:
+    return {'question': question, 'answer': answer}
+
+def test_words_drop_the_short_and_question_words_and_the_plurals():
+    assert words('What are the Target Users of the API?') == ['target', 'user', 'api']
+    assert words('Which class does the business need?') == ['class', 'business', 'need']
+    assert words(None) == []
+
+def test_a_rephrased_question_matches_the_answered_one():
+    index = QuestionIndex()
+    index.add(query('What is the target audience of the project?', 'Students.'))
+    index.add(query('Which database stores the data?', 'PostgreSQL.'))
+    match = index.match('Who is the target audience of this project?')
+    assert match is not None
+    assert match[0]['answer'] == 'Students.'
+    assert match[1] >= index.threshold
+    assert index.match('Which programming languages are used?') is None
+
+def test_the_threshold_decides_what_repeats_a_question():
+    index = QuestionIndex(threshold=0.9)
+    index.add(query('What is the target audience of the mobile application?'))
+    assert index.match('What is the target audience of the web application?') is None
+    assert index.match('What is the target audience of the web application?', threshold=0.5) is not None
+    assert index.match('What is the target audience of the mobile application?', threshold=0) is None
+
+def test_questions_with_less_than_two_words_never_match():
+    index = QuestionIndex()
+    index.add(query('Budget?'))
+    assert index.match('Budget?') is None
+
+def test_the_latest_of_equally_similar_queries_wins_and_limit_ignores_the_newer_ones():
+    index = QuestionIndex()
+    index.add(query('What is the project budget?', 'First.'))
+    index.add(query('What is the project budget?', 'Second.'))
+    assert index.match('What is the project budget?')[0]['answer'] == 'Second.'
+    assert index.match('What is the project budget?', limit=1)[0]['answer'] == 'First.'
+    assert index.match('What is the project budget?', limit=0) is None
+
+def test_the_index_of_a_session_is_extended_with_its_new_queries(monkeypatch):
+    monkeypatch.delenv('QUESTION_DEDUP_THRESHOLD', raising=False)
+    queries = [query('What is the project budget?'), query('Which database stores the data?')]
+    index = QuestionIndex.of('questions-session', queries[:1])
+    assert QuestionIndex.of('questions-session', queries) is index
+    assert index.queries == queries
+    assert QuestionIndex.of('questions-session', [query('Who are the target users?')]) is not index
+    assert QuestionIndex.of(None, queries) is not QuestionIndex.of(None, queries)
+
+def test_the_process_keeps_the_indexes_of_the_latest_sessions(monkeypatch):
+    monkeypatch.setattr(QuestionIndex, 'MAX_SESSIONS', 2)
+    first = QuestionIndex.of('questions-first', [])
+    QuestionIndex.of('questions-second', [])
+    QuestionIndex.of('questions-third', [])
+    assert 'questions-first' not in QuestionIndex._sessions  # pylint: disable=protected-access
+    assert QuestionIndex.of('questions-first', []) is not first
+
+def test_the_threshold_is_read_from_the_environment(monkeypatch):
+    monkeypatch.setenv('QUESTION_DEDUP_THRESHOLD', '0.5')
+    assert QuestionIndex.of(None, None).threshold == 0.5
+
+def test_a_repeated_question_is_answered_without_asking_the_user():
+    pytest.importorskip('langgraph')
+    from workflows.nodes import PlanningNodes  # pylint: disable=import-outside-toplevel
+    from workflows.users import ScriptedUser  # pylint: disable=import-outside-toplevel
+    index = QuestionIndex()
+    index.add(query('What is the target audience of the project?', 'Students.'))
+    user = ScriptedUser(['Sums and products.'])
+    questions = [
+        {'text': 'Who is the target audience of this project?', 'proposal': ''},
+        {'text': 'Which operations are supported?', 'proposal': ''},
+    ]
+    queries, _ = PlanningNodes(user).ask_questions(questions, 2, index=index)
+    assert [item['answer'] for item in queries] == ['Students.', 'Sums and products.']
+    assert len(index.queries) == 3
@@ -0,0 +1,78 @@
+"""Tests of the offline rendering of the workflow graph."""
+
+import os
+import sys
+from types import SimpleNamespace
+from xml.etree import ElementTree
+
+import pytest
+
+from workflows import rendering
+from workflows.rendering import graph_hash, render_graph, render_svg
+
+SVG = '{http://www.w3.org/2000/svg}'
+
+def edge(source: str, target: str, data: str | None = None, conditional: bool = False) -> SimpleNamespace:
+    return SimpleNamespace(source=source, target=target, data=data, conditional=conditional)
+
+def graph(*extra) -> SimpleNamespace:
+    edges = [
+        edge('__start__', 'analyze'),
+        edge('analyze', 'query_user', 'CONTINUE', True),
+        edge('query_user', 'analyze', 'CONTINUE', True),
+        edge('analyze', 'report', 'FINISH', True),
+        edge('report', '__end__'),
+        *extra,
+    ]
+    nodes = {name: None for item in edges for name in (item.source, item.target)}
+    return SimpleNamespace(nodes=nodes, edges=edges)
+
+def test_nodes_are_placed_by_their_distance_from_the_start_and_the_end_last():
+    levels = rendering._levels(graph(edge('__start__', 'report')))  # pylint: disable=protected-access
+    assert levels == {'__start__': 0, 'analyze': 1, 'report': 1, 'query_user': 2, '__end__': 3}
+
+def test_svg_shows_every_node_and_edge():
+    root = ElementTree.fromstring(render_svg(graph(edge('report', 'notify <email>'))))
+    texts = [text.text for text in root.iter(f"{SVG}text")]
+    assert {'__start__', 'analyze', 'query_user', 'report', 'notify <email>', '__end__'} <= set(texts)
+    assert texts.count('CONTINUE') == 2 and texts.count('FINISH') == 1
+    paths = [path for path in root.iter(f"{SVG}path") if path.get('marker-end')]
+    assert len(paths) == 6
+    assert sum(1 for path in paths if path.get('stroke-dasharray')) == 3
+    assert sum(1 for path in paths if ' C ' in path.get('d')) == 1
+
+def test_the_hash_follows_the_structure_and_the_format():
+    assert graph_hash(graph(), 'svg') == graph_hash(graph(), 'svg')
+    assert graph_hash(graph(), 'svg') != graph_hash(graph(), 'png')
+    assert graph_hash(graph(), 'svg') != graph_hash(graph(edge('report', 'analyze')), 'svg')
+
+def test_an_unchanged_graph_is_copied_from_the_cache(tmp_path, monkeypatch):
+    cache = str(tmp_path / 'cache')
+    first = render_graph(graph(), str(tmp_path / 'first.svg'), cache)
+    monkeypatch.setattr(rendering, 'render_svg', lambda graph: pytest.fail('Rendered again.'))
+    second = render_graph(graph(), str(tmp_path / 'out' / 'second.svg'), cache)
+    with open(first, 'rb') as a, open(second, 'rb') as b:
+        assert a.read() == b.read()
+    assert os.listdir(cache) == [f"{graph_hash(graph(), 'svg')}.svg"]
+
+def test_png_falls_back_to_svg_without_pygraphviz(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'pygraphviz', None)
+    path = render_graph(graph(), str(tmp_path / 'graph.png'), str(tmp_path / 'cache'))
+    assert path == str(tmp_path / 'graph.svg')
+    assert os.path.exists(path)
+
+def test_unsupported_formats_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        render_graph(graph(), str(tmp_path / 'graph.jpg'), str(tmp_path / 'cache'))
+
+def test_the_workflow_graph_is_rendered(tmp_path):
+    pytest.importorskip('langgraph')
+    pytest.importorskip('dotenv')
+    pytest.importorskip('langchain_core')
+    # pylint: disable=import-outside-toplevel
+    from benchmarks.stub import StubChatModel
+    from workflows.workflow import PlaningWorkflow
+    app = PlaningWorkflow(llm=StubChatModel(), pipelined=False, speculative=False).app
+    path = render_graph(app.get_graph(), str(tmp_path / 'graph.svg'), str(tmp_path / 'cache'))
+    texts = {text.text for text in ElementTree.parse(path).getroot().iter(f"{SVG}text")}
+    assert {'define_requirements', 'join_requirements', 'decompose_feature', 'generate_report'} <= texts
@@ -0,0 +1,65 @@
+"""Tests of the routing of the crew tasks to models, and of their fallbacks."""
+
+import pytest
+
+from crews.routing import ModelRouter, Route
+
+def test_routes_are_read_from_the_environment(monkeypatch):
+    monkeypatch.setenv('LLM_ROUTE_INITIAL_ANALYSIS', 'gpt-4o-mini, gpt-4o')
+    monkeypatch.setenv('LLM_ROUTE_FINAL_REPORT', ' ')
+    monkeypatch.setenv('LLM_FALLBACK_TIMEOUT', '30')
+    router = ModelRouter.from_env()
+    assert router.routes == {'initial_analysis': ['gpt-4o-mini', 'gpt-4o']}
+    assert router.fallback_timeout == 30
+
+def test_every_model_with_a_fallback_gets_the_fallback_timeout():
+    router = ModelRouter({'report_section': ['a', 'b', 'c']}, fallback_timeout=20)
+    assert router.routes_of('report_section') == [Route('a', 20), Route('b', 20), Route('c', None)]
+    assert router.primary('report_section') == Route('a', 20)
+
+def test_tasks_without_a_route_use_the_default_model():
+    router = ModelRouter({'report_section': ['a']}, fallback_timeout=20)
+    assert router.routes_of('initial_analysis') == [Route(None, None)]
+    assert router.routes_of('report_section') == [Route('a', None)]
+
+def test_a_fallback_serves_the_task_and_is_told_apart_in_the_trace(monkeypatch, tmp_path):
+    pytest.importorskip('crewai')
+    # pylint: disable=import-outside-toplevel
+    from crewai import Task
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+    from crews.crew import PlanningCrew
+    from tracing import close_trace, traced
+
+    class ScriptedModel(BaseChatModel):
+        """Times out when it is the "slow" model, and answers otherwise."""
+        model_name: str = 'gpt-4o'
+
+        @property
+        def _llm_type(self) -> str:
+            return 'scripted'
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+            if self.model_name == 'slow':
+                raise TimeoutError("The model timed out.")
+            answer = f"Thought: I now can give a great answer\nFinal Answer: served by {self.model_name}"
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=answer))])
+
+    monkeypatch.setenv('CREW_CACHE_DIR', str(tmp_path))
+    monkeypatch.setenv('LLM_RETRIES', '1')
+    crew = PlanningCrew(llm=ScriptedModel())
+    crew.router = ModelRouter({'report_section': ['slow', 'fast']})
+
+    def node(state):
+        task = Task(description="Write the section.", expected_output="The section.",
+                    agent=crew._routed('system_analyst', 'report_section'))  # pylint: disable=protected-access
+        return crew._execute('report_section', task, None)  # pylint: disable=protected-access
+
+    response, _ = traced('generate_report', node)({'session_id': 'fallback-test'})
+    assert str(response) == 'served by fast'
+    trace = close_trace('fallback-test')
+    spans = [span for span in trace.spans if span['kind'] == 'crew']
+    assert [(span['model'], span.get('fallback'), 'error' in span) for span in spans] == [
+        ('slow', None, True), ('fast', 'slow', False)]
+    assert 'report_section (fast, fallback from slow)' in trace.summary()
@@ -0,0 +1,77 @@
+"""Tests of the scheduling of the analysis rounds."""
+
+import logging
+import time
+
+import pytest
+
+from workflows.scheduling import RoundScheduler
+
+QUERIES = [
+    {'question': 'Which operations should the calculator support?', 'answer': 'The basic ones.'},
+    {'question': 'Which platforms should the calculator run on?', 'answer': 'Web.'},
+]
+
+def state(rounds: int = 1, questions: list[str] | None = None, **values) -> dict:
+    questions = ['Should the results be stored?'] if questions is None else questions
+    return {
+        'questions': [{'text': text, 'proposal': ''} for text in questions],
+        'revisions': [{'round': number, 'change': 0.5} for number in range(1, rounds + 1)],
+        **values,
+    }
+
+def test_defaults_never_cut_a_round_short(monkeypatch):
+    for name in ('ANALYSIS_MAX_ROUNDS', 'ANALYSIS_MAX_TOKENS', 'ANALYSIS_MAX_SECONDS',
+                 'ANALYSIS_MIN_CHANGE', 'ANALYSIS_MAX_DUPLICATES'):
+        monkeypatch.delenv(name, raising=False)
+    scheduler = RoundScheduler.from_env()
+    long_session = state(
+        questions=['Which operations should the calculator support?'],
+        revisions=[{'round': number, 'change': 0.0} for number in range(1, 51)],
+        usage={'total_tokens': 10**9},
+        started_at=time.time() - 10**6,
+        queries=QUERIES,
+        queries_analyzed=2)
+    assert scheduler.decide(long_session) == "CONTINUE"
+
+def test_from_env_reads_the_limits(monkeypatch):
+    monkeypatch.setenv('ANALYSIS_MAX_ROUNDS', '4')
+    monkeypatch.setenv('ANALYSIS_MAX_TOKENS', '')
+    monkeypatch.setenv('ANALYSIS_MIN_CHANGE', '0.05')
+    scheduler = RoundScheduler.from_env()
+    assert (scheduler.max_rounds, scheduler.max_tokens, scheduler.min_change) == (4, 0, 0.05)
+
+def test_no_questions_finish_without_a_warning(caplog):
+    with caplog.at_level(logging.INFO, logger='workflows.scheduling'):
+        assert RoundScheduler(max_rounds=3).decide(state(questions=[])) == "FINISH"
+    assert [record.levelno for record in caplog.records] == [logging.INFO]
+
+@pytest.mark.parametrize('scheduler, values, reason', [
+    (RoundScheduler(max_rounds=3), {'rounds': 3}, "limit of 3 rounds"),
+    (RoundScheduler(max_tokens=1000), {'usage': {'total_tokens': 1000}}, "budget of 1,000"),
+    (RoundScheduler(max_seconds=60), {'started_at': time.time() - 61}, "budget of 60s"),
+    (RoundScheduler(min_change=0.1), {'rounds': 2, 'revisions': [{'round': 1, 'change': 1.0}, {'round': 2, 'change': 0.05}]}, "changed 5.0%"),
+    (RoundScheduler(max_duplicates=0.5), {
+        'questions': ['Which operations should the calculator support?', 'Should the results be stored?'],
+        'queries': QUERIES, 'queries_analyzed': 2}, "1 of 2 new questions"),
+])
+def test_a_limit_cuts_the_round_short_with_a_warning(scheduler, values, reason, caplog):
+    current = state(**values)
+    assert reason in scheduler.stop_reason(current)
+    with caplog.at_level(logging.INFO, logger='workflows.scheduling'):
+        assert scheduler.decide(current) == "FINISH"
+    assert caplog.records[-1].levelno == logging.WARNING
+    assert reason in caplog.records[-1].getMessage()
+
+@pytest.mark.parametrize('scheduler, values', [
+    (RoundScheduler(max_rounds=3), {'rounds': 2}),
+    (RoundScheduler(max_tokens=1000), {'usage': {'total_tokens': 999}}),
+    (RoundScheduler(max_seconds=60), {'started_at': time.time() - 30}),
+    (RoundScheduler(min_change=0.1), {'rounds': 1, 'revisions': [{'round': 1, 'change': 0.0}]}),
+    (RoundScheduler(max_duplicates=0.5), {
+        'questions': ['Which operations should the calculator support?'],
+        'queries': QUERIES, 'queries_analyzed': 0}),
+])
+def test_rounds_within_the_limits_continue(scheduler, values):
+    assert scheduler.stop_reason(state(**values)) is None
+    assert scheduler.decide(state(**values)) == "CONTINUE"
@@ -0,0 +1,74 @@
+"""Tests of the async planning service and of the users of its sessions."""
+
+import asyncio
+
+import pytest
+
+from workflows.users import SessionUser
+
+def test_session_user_prompts_and_waits_for_the_reply():
+    async def scenario():
+        user = SessionUser()
+        answer = asyncio.create_task(user.aanswer({'text': 'Which operations?'}, 'Question 1'))
+        prompt = await user.prompts.get()
+        assert (prompt['id'], prompt['kind'], prompt['question']) == (1, 'question', {'text': 'Which operations?'})
+        await user.reply('Sums.')
+        assert await answer == 'Sums.'
+        confirm = asyncio.create_task(user.aconfirm('Finish?'))
+        assert (await user.prompts.get())['id'] == 2
+        await user.reply('')
+        assert await confirm is False
+
+    asyncio.run(scenario())
+
+def test_session_user_is_answered_from_worker_threads():
+    async def scenario():
+        user = SessionUser()
+        ask = asyncio.create_task(asyncio.to_thread(user.ask, 'Project name: '))
+        assert (await user.prompts.get())['kind'] == 'text'
+        await user.reply('Calculator')
+        user.show('Done.')
+        return await ask, user.messages
+
+    assert asyncio.run(scenario()) == ('Calculator', ['Done.'])
+
+def test_sessions_run_concurrently_on_one_event_loop(monkeypatch, tmp_path):
+    pytest.importorskip('crewai')
+    pytest.importorskip('dotenv')
+    # pylint: disable=import-outside-toplevel
+    from benchmarks.stub import StubChatModel
+    from crews.cache import ResponseCache
+    from workflows.service import PlanningService
+    monkeypatch.setattr(ResponseCache, 'shared', staticmethod(lambda: ResponseCache(str(tmp_path / 'cache'), bypass=True)))
+    monkeypatch.setenv('LIBRARY_DB', 'off')
+    monkeypatch.setenv('REPORT_STREAMING', '0')
+    monkeypatch.setenv('SPECULATIVE_ANALYSIS', '0')
+    monkeypatch.setenv('PIPELINED_ANALYSIS', '0')
+    monkeypatch.setenv('QUESTION_DEDUP_THRESHOLD', '0')
+    stub = StubChatModel(questions=2, work={'features': 1, 'activities': 1, 'tasks': 1}, stats={}, rounds={})
+    service = PlanningService(llm=stub)
+
+    async def answer(session_id: str) -> int:
+        prompts = 0
+        while (prompt := await service.prompt(session_id, timeout=60)) is not None:
+            prompts += 1
+            await service.reply(session_id, 'yes' if prompt['kind'] == 'confirm' else '')
+        return prompts
+
+    async def scenario():
+        sessions = [
+            await service.start(name, f"A {name.lower()}.", str(tmp_path / f"{name}.md"))
+            for name in ('Calculator', 'Agenda')
+        ]
+        assert sorted(service.running()) == sorted(sessions)
+        prompts = await asyncio.gather(*(answer(session_id) for session_id in sessions))
+        states = [await service.result(session_id) for session_id in sessions]
+        return sessions, prompts, states
+
+    sessions, prompts, states = asyncio.run(scenario())
+    assert prompts == [3, 3]
+    assert [state['project_name'] for state in states] == ['Calculator', 'Agenda']
+    assert all(state['final_report'] for state in states)
+    assert service.running() == []
+    with pytest.raises(KeyError):
+        service.messages(sessions[0])
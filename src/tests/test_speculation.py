@@ -0,0 +1,63 @@
+"""Tests of the speculative analysis rounds."""
+
+import threading
+from types import SimpleNamespace
+
+from crews.speculation import SpeculativeAnalysis
+from tracing import close_trace, crew_span, traced
+
+class BlockingCrew():
+    """An analysis crew whose rounds wait to be released, recording a crew span each."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Semaphore(0)
+        self.rounds = list[int]()
+
+    def kickoff(self, state):
+        self.started.release()
+        self.release.wait(5)
+        answers = len(state['queries'])
+        self.rounds.append(answers)
+        with crew_span('initial_analysis', SimpleNamespace(description='Analyze.', expected_output='JSON')) as span:
+            span['model'] = 'gpt-4o'
+            span['prompt_tokens'] = 100
+            span['completion_tokens'] = 10
+        return {'project_description': f"After {answers} answers."}
+
+def state(answers: int) -> dict:
+    return {'session_id': 'spec-test', 'project_name': 'Calculator', 'project_description': 'A calculator.',
+            'queries': [{'question': f"Q{i}?", 'answer': f"A{i}"} for i in range(answers)], 'finish': False}
+
+def test_a_running_round_is_not_replaced_and_is_marked_discarded():
+    crew = BlockingCrew()
+    speculation = SpeculativeAnalysis(crew)
+
+    def questionnaire(_):
+        speculation.submit(state(1))
+        assert crew.started.acquire(timeout=5)
+        speculation.submit(state(2))
+        speculation.submit(state(3))
+        crew.release.set()
+        return speculation.kickoff(state(3))
+
+    assert traced('analyze_description', questionnaire)({'session_id': 'spec-test'}) == {
+        'project_description': 'After 3 answers.'}
+    speculation._executor.shutdown(wait=True)  # pylint: disable=protected-access
+    assert (speculation.started, speculation.skipped, speculation.discarded, speculation.used) == (1, 2, 1, 0)
+    assert sorted(crew.rounds) == [1, 3]
+    spans = [span for span in close_trace('spec-test').spans if span['kind'] == 'crew']
+    assert sorted((span.get('discarded', False), span['prompt_tokens']) for span in spans) == [(False, 100), (True, 100)]
+
+def test_a_round_that_has_not_started_is_replaced():
+    crew = BlockingCrew()
+    speculation = SpeculativeAnalysis(crew, workers=1)
+    blocker = speculation._executor.submit(crew.release.wait, 5)  # pylint: disable=protected-access
+    speculation.submit(state(1))
+    speculation.submit(state(2))
+    crew.release.set()
+    blocker.result()
+    assert speculation.kickoff(state(2)) == {'project_description': 'After 2 answers.'}
+    assert (speculation.started, speculation.skipped, speculation.discarded, speculation.used) == (2, 0, 1, 1)
+    assert crew.rounds == [2]
+    close_trace('spec-test')
@@ -0,0 +1,50 @@
+"""Tests of the scripted stub model of the offline benchmarks."""
+
+import json
+
+import pytest
+
+pytest.importorskip('langchain_core')
+
+# pylint: disable=wrong-import-position
+from langchain_core.messages import HumanMessage
+
+from benchmarks.stub import StubChatModel
+
+def answer(model: StubChatModel, prompt: str) -> str:
+    text = model.invoke([HumanMessage(content=prompt)]).content
+    assert text.startswith("Thought: I now can give a great answer\nFinal Answer: ")
+    return text.split("Final Answer: ", 1)[1]
+
+def test_analysis_rounds_grow_the_description_and_ask_questions():
+    model = StubChatModel(questions=3, growth=42, stats={}, rounds={})
+    first = json.loads(answer(model, 'Project Name: Calculator\nReturn "description" and "questions".'))
+    second = json.loads(answer(model, 'Project Name: Calculator\nReturn "description" and "questions".'))
+    assert len(first['questions']) == 3
+    assert first['questions'][0]['text'].startswith('Round 1 question 0')
+    assert second['questions'][0]['text'].startswith('Round 2 question 0')
+    assert len(second['description']) - len(first['description']) == 42
+    assert json.loads(answer(model, 'Project Name: Calculator\nFinish: True'))['questions'] == []
+    assert model.stats['calls'] == 3
+    assert model.stats['output_tokens'] > 0
+
+def test_edits_prompts_get_an_edit_of_one_section():
+    model = StubChatModel(questions=1, growth=42, stats={}, rounds={})
+    data = json.loads(answer(model, 'Project Name: Calculator\nReturn the "edits" and "questions".'))
+    assert data['edits'] == [{'section': 'Aspect 1', 'action': 'add', 'text': "It has more details. " * 2}]
+
+def test_requirements_and_work_breakdown_prompts():
+    model = StubChatModel(questions=2, work={'tasks': 4}, stats={}, rounds={})
+    requirements = json.loads(answer(model, 'Project Name: Calculator\nReturn the "requirements".'))['requirements']
+    assert [item['name'] for item in requirements] == ['Requirement 0', 'Requirement 1']
+    features = json.loads(answer(model, 'Project Name: Calculator\nList the FEATURES as "items".'))['items']
+    assert [item['name'] for item in features] == [f"Calculator / features {i}" for i in range(3)]
+    tasks = json.loads(answer(model, 'Feature: Sum\nActivity: Add\nList the TASKS as "items".'))['items']
+    assert [item['name'] for item in tasks] == [f"Add / tasks {i}" for i in range(4)]
+
+def test_report_prompts_get_their_sections():
+    model = StubChatModel(stats={}, rounds={})
+    report = answer(model, 'Project Name: Calculator\nProject Summary Report\n## Overview\n## Risks')
+    assert report.startswith('# Calculator\n#### Project Summary Report\n\n## Overview\n')
+    assert '\n## Risks\n' in report
+    assert answer(model, 'Section Template:\n## Overview\n## Risks').startswith('## Risks\n')
@@ -0,0 +1,66 @@
+"""Tests of the task prompts and of their static prefixes."""
+
+import logging
+
+import pytest
+
+pytest.importorskip('crewai')
+
+# pylint: disable=wrong-import-position
+from crews.context import ContextBuilder
+from crews.tasks import PREFIXES, REPORT_SECTIONS, PlanningTasks, format_requirements, prefix_tokens
+
+def state(name: str, description: str, queries: int = 0) -> dict:
+    return {
+        'session_id': None,
+        'project_name': name,
+        'project_description': description,
+        'queries': [{'question': f"Question {i}?", 'answer': f"Answer {i}."} for i in range(queries)],
+        'queries_analyzed': queries // 2,
+        'finish': False,
+        'requirements': {'business': [{'name': 'Sums', 'description': 'It adds numbers.'}], 'system': []},
+        'features': [{'name': 'Sum', 'description': 'Adds numbers.'}],
+    }
+
+@pytest.fixture(name='tasks')
+def tasks_fixture(monkeypatch):
+    monkeypatch.setenv('LIBRARY_DB', 'off')
+    return PlanningTasks(context=ContextBuilder(), metrics=False, memory_budget=0)
+
+@pytest.mark.parametrize('name, build', [
+    ('initial_analysis', lambda tasks, data: tasks.initial_analysis(None, data)),
+    ('business_requirements', lambda tasks, data: tasks.business_requirements(None, data)),
+    ('system_requirements', lambda tasks, data: tasks.system_requirements(None, data)),
+    ('identify_features', lambda tasks, data: tasks.identify_features(None, data)),
+    ('final_report', lambda tasks, data: tasks.final_report(None, data)),
+    ('report_section', lambda tasks, data: tasks.report_section(None, data, REPORT_SECTIONS[0])),
+])
+def test_prompts_of_a_task_start_with_the_same_static_prefix(tasks, name, build):
+    first = build(tasks, state('Calculator', 'A calculator.')).description
+    second = build(tasks, state('Agenda', 'An agenda with reminders.', queries=4)).description
+    assert first.startswith(PREFIXES[name])
+    assert second.startswith(PREFIXES[name])
+    assert '{queries}' not in first and '{queries}' not in second
+    assert 'Project Name: Agenda' in second[len(PREFIXES[name]):]
+
+def test_new_queries_are_added_after_the_prefix(tasks):
+    description = tasks.initial_analysis(None, state('Agenda', 'An agenda.', queries=4)).description
+    assert "New Queries:\n3. Question 2?\nAnswer 2.\n" in description
+    assert tasks.context_usage['delta_queries'] == 2
+    assert description.index('Project Name: Agenda') > len(PREFIXES['initial_analysis'])
+
+def test_report_sections_split_the_template():
+    assert len(REPORT_SECTIONS) > 1
+    assert all(section.startswith('## ') and section.endswith('\n') for section in REPORT_SECTIONS)
+    assert REPORT_SECTIONS[0] in PREFIXES['final_report']
+
+def test_format_requirements_skips_the_empty_kinds():
+    assert format_requirements(state('Calculator', '')['requirements']) == "\nBusiness Requirements:\n - Sums: It adds numbers.\n"
+    assert format_requirements(None) == ''
+
+def test_metrics_log_the_share_of_the_prefix(monkeypatch, caplog):
+    monkeypatch.setenv('LIBRARY_DB', 'off')
+    tasks = PlanningTasks(metrics=True, memory_budget=0)
+    with caplog.at_level(logging.INFO, logger='crews.tasks'):
+        tasks.business_requirements(None, state('Calculator', 'A calculator.'))
+    assert f"{prefix_tokens('business_requirements')} in the static prefix" in caplog.text
@@ -0,0 +1,86 @@
+"""Tests of the latency, token and cost instrumentation of the sessions."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from tracing import SessionTrace, close_trace, collect_spans, crew_span, estimate_cost, session_trace, traced
+
+def test_cost_uses_the_price_of_the_model(monkeypatch):
+    monkeypatch.delenv('LLM_PRICE_PROMPT', raising=False)
+    monkeypatch.delenv('LLM_PRICE_COMPLETION', raising=False)
+    assert estimate_cost('gpt-4o-mini-2024-07-18', 1000, 1000) == pytest.approx(0.00075)
+    assert estimate_cost('gpt-4o', 1000, 2000) == pytest.approx(0.035)
+    assert estimate_cost('unknown', 1000, 1000) == pytest.approx(0.09)
+    assert estimate_cost(None, 0, 0) == 0
+    monkeypatch.setenv('LLM_PRICE_PROMPT', '1')
+    monkeypatch.setenv('LLM_PRICE_COMPLETION', '2')
+    assert estimate_cost('gpt-4o', 1000, 1000) == pytest.approx(3)
+
+def test_nodes_and_their_crew_kickoffs_are_recorded_in_the_trace_of_the_session():
+    def node(state):
+        with crew_span('initial_analysis', SimpleNamespace(description='Analyze.', expected_output='JSON')) as span:
+            span.update(model='gpt-4o', prompt_tokens=1000, completion_tokens=100)
+        return {'finish': True}
+
+    assert traced('analyze', node)({'session_id': 'tracing-node'}) == {'finish': True}
+    spans = close_trace('tracing-node').spans
+    assert [(span['kind'], span['name']) for span in spans] == [('crew', 'initial_analysis'), ('node', 'analyze')]
+    assert spans[0]['prompt_chars'] == len('Analyze.\nJSON')
+    assert spans[0]['prompt_size'] > 0
+    assert spans[0]['cost'] == pytest.approx(estimate_cost('gpt-4o', 1000, 100))
+    assert spans[1]['duration'] >= spans[0]['duration']
+    assert 'error' not in spans[1]
+
+def test_async_nodes_and_errors_are_recorded():
+    async def node(state):
+        raise ValueError('Boom')
+
+    with pytest.raises(ValueError):
+        asyncio.run(traced('report', node)({'session_id': 'tracing-async'}))
+    spans = close_trace('tracing-async').spans
+    assert spans[0]['name'] == 'report'
+    assert spans[0]['error'] == 'ValueError: Boom'
+
+def test_kickoffs_outside_a_node_are_only_collected():
+    spans = []
+    with collect_spans(spans):
+        with crew_span('speculative_analysis', SimpleNamespace(description='Analyze.', expected_output='')):
+            pass
+    with crew_span('ignored', SimpleNamespace(description='Analyze.', expected_output='')):
+        pass
+    assert [span['name'] for span in spans] == ['speculative_analysis']
+
+def test_close_trace_releases_the_trace_of_the_session():
+    trace = session_trace('tracing-close')
+    assert session_trace('tracing-close') is trace
+    assert close_trace('tracing-close') is trace
+    assert session_trace('tracing-close') is not trace
+    close_trace('tracing-close')
+
+def test_export_appends_the_runs_of_a_session(tmp_path):
+    first = SessionTrace('resumed')
+    first.add({'kind': 'node', 'name': 'analyze', 'start': 0.0, 'duration': 1.0})
+    path = first.export(str(tmp_path))
+    second = SessionTrace('resumed')
+    second.add({'kind': 'node', 'name': 'report', 'start': 0.0, 'duration': 2.0})
+    assert second.export(str(tmp_path)) == path
+    with open(path, encoding='utf-8') as file:
+        data = json.load(file)
+    assert data['session_id'] == 'resumed'
+    assert [run['spans'][0]['name'] for run in data['runs']] == ['analyze', 'report']
+
+def test_summary_aggregates_the_spans_by_kind_name_and_model():
+    trace = SessionTrace('summary')
+    for _ in range(2):
+        trace.add({'kind': 'crew', 'name': 'analysis', 'model': 'gpt-4o', 'duration': 1.0,
+                   'prompt_tokens': 100, 'completion_tokens': 10, 'cost': 0.5})
+    trace.add({'kind': 'crew', 'name': 'analysis', 'model': 'gpt-4o', 'discarded': True, 'duration': 1.0})
+    trace.add({'kind': 'node', 'name': 'analyze', 'duration': 3.0})
+    lines = trace.summary().splitlines()
+    assert len(lines) == 4
+    assert lines[1].split() == ['crew:analysis', '(gpt-4o)', '2', '2.0', '200', '20', '1.0000']
+    assert lines[2].startswith('crew:analysis (gpt-4o, discarded) ')
+    assert lines[3].split() == ['node:analyze', '1', '3.0', '0', '0', '0.0000']
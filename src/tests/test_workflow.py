@@ -0,0 +1,57 @@
+"""Tests of the planning workflow graph, run end to end against the scripted stub model."""
+
+import contextlib
+import io
+import os
+
+import pytest
+
+pytest.importorskip('langgraph')
+pytest.importorskip('dotenv')
+
+# pylint: disable=wrong-import-position
+from crews.cache import ResponseCache
+from tracing import close_trace
+from workflows.users import ScriptedUser
+from workflows.workflow import PlaningWorkflow
+
+BRANCHES = ('identify_business_requirements', 'identify_system_requirements')
+
+@pytest.fixture(name='offline')
+def offline_fixture(monkeypatch, tmp_path):
+    monkeypatch.setattr(ResponseCache, 'shared', staticmethod(lambda: ResponseCache(str(tmp_path / 'cache'), bypass=True)))
+    monkeypatch.setenv('LIBRARY_DB', 'off')
+    monkeypatch.delenv('PROFILE_NODES', raising=False)
+    return tmp_path
+
+def test_requirements_fork_into_parallel_branches_and_join(offline):
+    pytest.importorskip('langchain_core')
+    from benchmarks.stub import StubChatModel  # pylint: disable=import-outside-toplevel
+    graph = PlaningWorkflow(user=ScriptedUser([]), llm=StubChatModel(), pipelined=False, speculative=False).app.get_graph()
+    edges = {(edge.source, edge.target) for edge in graph.edges}
+    for branch in BRANCHES:
+        assert ('define_requirements', branch) in edges
+        assert (branch, 'join_requirements') in edges
+    assert ('join_requirements', 'identify_features') in edges
+
+def test_a_session_joins_the_requirements_and_the_usage_of_both_branches(offline):
+    pytest.importorskip('crewai')
+    from benchmarks.stub import StubChatModel  # pylint: disable=import-outside-toplevel
+    stub = StubChatModel(questions=2, work={'features': 2, 'activities': 1, 'tasks': 1}, stats={}, rounds={})
+    app = PlaningWorkflow(user=ScriptedUser([], max_rounds=1), llm=stub, pipelined=False, speculative=False).app
+    state = {
+        'session_id': 'workflow-fork',
+        'project_name': 'Calculator',
+        'project_description': 'A calculator.',
+        'report_path': str(offline / 'report.md'),
+    }
+    with contextlib.redirect_stdout(io.StringIO()):
+        state = app.invoke(state, {'configurable': {'thread_id': 'workflow-fork'}})
+    spans = close_trace('workflow-fork').spans
+    assert {kind: len(items) for kind, items in state['requirements'].items()} == {'business': 2, 'system': 2}
+    assert set(state['branch_usage']) == {'business', 'system', 'feature:Calculator / features 0', 'feature:Calculator / features 1'}
+    assert all(usage is None for usage in state['branch_usage'].values())
+    assert state['usage']['successful_requests'] == stub.stats['calls']
+    assert sorted(state['work']) == ['Calculator / features 0', 'Calculator / features 1']
+    assert {span['name'] for span in spans if span['kind'] == 'node'} >= {*BRANCHES, 'join_requirements', 'join_work'}
+    assert os.path.exists(state['report_path'])
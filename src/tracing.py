@@ -0,0 +1,295 @@
+"""Latency, token and cost instrumentation of the planning sessions."""
+
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from typing_extensions import TypedDict
+
+from profiling import node_profiler, profiled
+
+# USD per 1K prompt and completion tokens.
+PRICES = {
+    'gpt-4o-mini': (0.00015, 0.0006),
+    'gpt-4o': (0.005, 0.015),
+    'gpt-4-turbo': (0.01, 0.03),
+    'gpt-4': (0.03, 0.06),
+    'gpt-3.5-turbo': (0.0005, 0.0015),
+}
+
+class Span(TypedDict, total=False):
+    """
+    Represents a timed step of a session.
+
+    Attributes:
+        kind (str): "node" for a workflow node or "crew" for a crew kickoff.
+        name (str): The name of the node or task.
+        start (float): The start of the step in seconds since the session started.
+        duration (float): The wall time of the step in seconds.
+        model (str): The model that served the crew kickoff.
+        fallback (str): The model that failed before this one served the crew kickoff, if any.
+        throttled (float): The time the crew kickoff waited for the rate limiter in seconds, if any.
+        cached (bool): Whether the crew response came from the cache.
+        discarded (bool): Whether the crew kickoff was a speculative round that was discarded.
+        prompt_chars (int): The size of the rendered prompt in characters.
+        prompt_size (int): The estimated number of tokens of the rendered prompt.
+        prompt_tokens (int): The prompt tokens reported by the provider.
+        completion_tokens (int): The completion tokens reported by the provider.
+        cost (float): The estimated cost in USD.
+        error (str): The error raised by the step, if any.
+    """
+    kind: str
+    name: str
+    start: float
+    duration: float
+    model: str
+    fallback: str
+    throttled: float
+    cached: bool
+    discarded: bool
+    prompt_chars: int
+    prompt_size: int
+    prompt_tokens: int
+    completion_tokens: int
+    cost: float
+    error: str
+
+def estimate_cost(model: str | None, prompt_tokens: int, completion_tokens: int) -> float:
+    """
+    Estimate the cost of an LLM call.
+
+    The prices of the known models can be overridden with LLM_PRICE_PROMPT and
+    LLM_PRICE_COMPLETION (USD per 1K tokens).
+
+    Args:
+        model (str | None): The name of the model.
+        prompt_tokens (int): The number of prompt tokens.
+        completion_tokens (int): The number of completion tokens.
+
+    Returns:
+        float: The estimated cost in USD.
+    """
+    prompt_price, completion_price = next(
+        (prices for name, prices in PRICES.items() if model and model.startswith(name)), PRICES['gpt-4'])
+    prompt_price = float(os.environ.get('LLM_PRICE_PROMPT') or prompt_price)
+    completion_price = float(os.environ.get('LLM_PRICE_COMPLETION') or completion_price)
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+class SessionTrace():
+    """
+    Collects the spans of a planning session.
+
+    Attributes:
+        session_id (str): The id of the session.
+        started (float): The time the trace started.
+        spans (list[Span]): The recorded spans.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.started = time.perf_counter()
+        self.spans = list[Span]()
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        """
+        Record a span.
+
+        Args:
+            span (Span): The span to record.
+        """
+        with self._lock:
+            self.spans.append(span)
+
+    def export(self, folder: str | None = None) -> str:
+        """
+        Write the trace to <folder>/<session_id>.json, appending to the trace of a previous run of the session.
+
+        Args:
+            folder (str | None): The trace folder. Defaults to the TRACE_DIR environment variable or "traces".
+
+        Returns:
+            str: The path of the trace file.
+        """
+        folder = folder or os.environ.get('TRACE_DIR') or 'traces'
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{self.session_id}.json")
+        runs = []
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                runs = json.load(file).get('runs', [])
+        runs.append({'exported': time.time(), 'spans': self.spans})
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({'session_id': self.session_id, 'runs': runs}, file, indent=2)
+        return path
+
+    def summary(self) -> str:
+        """
+        Build a summary table of the spans, aggregated by kind, name and model.
+
+        The kickoffs served by a fallback model have their own rows, with the model that failed,
+        and so do the discarded speculative rounds, whose tokens were paid for but not used.
+
+        Returns:
+            str: The summary table.
+        """
+        rows = dict[tuple[str, str], dict]()
+        for span in self.spans:
+            served = span.get('model')
+            if served and span.get('fallback'):
+                served = f"{served}, fallback from {span['fallback']}"
+            if span.get('discarded'):
+                served = f"{served}, discarded" if served else "discarded"
+            name = f"{span['name']} ({served})" if served else span['name']
+            row = rows.setdefault((span['kind'], name), {
+                'calls': 0, 'duration': 0.0, 'prompt_tokens': 0, 'completion_tokens': 0, 'cost': 0.0})
+            row['calls'] += 1
+            row['duration'] += span.get('duration', 0.0)
+            row['prompt_tokens'] += span.get('prompt_tokens', 0)
+            row['completion_tokens'] += span.get('completion_tokens', 0)
+            row['cost'] += span.get('cost', 0.0)
+        lines = [f"{'Step':<48} {'Calls':>5} {'Time (s)':>9} {'Prompt':>8} {'Compl.':>8} {'Cost ($)':>9}"]
+        for (kind, name), row in rows.items():
+            lines.append(
+                f"{kind + ':' + name:<48} {row['calls']:>5} {row['duration']:>9.1f} "
+                f"{row['prompt_tokens']:>8} {row['completion_tokens']:>8} {row['cost']:>9.4f}")
+        return '\n'.join(lines)
+
+_traces = dict[str, SessionTrace]()
+_traces_lock = threading.Lock()
+_current = ContextVar[SessionTrace | None]('current_trace', default=None)
+_collected = ContextVar[list | None]('collected_spans', default=None)
+
+def session_trace(session_id: str | None) -> SessionTrace:
+    """
+    Get the trace of a session, creating it on first use.
+
+    Args:
+        session_id (str | None): The id of the session.
+
+    Returns:
+        SessionTrace: The trace of the session.
+    """
+    session_id = session_id or 'default'
+    with _traces_lock:
+        if session_id not in _traces:
+            _traces[session_id] = SessionTrace(session_id)
+        return _traces[session_id]
+
+def close_trace(session_id: str | None) -> SessionTrace:
+    """
+    Close the trace of a session that ended, releasing it and the profiles of its nodes.
+
+    Args:
+        session_id (str | None): The id of the session.
+
+    Returns:
+        SessionTrace: The trace of the session, to summarize or export.
+    """
+    session_id = session_id or 'default'
+    with _traces_lock:
+        trace = _traces.pop(session_id, None) or SessionTrace(session_id)
+    profiler = node_profiler()
+    if profiler is not None:
+        profiler.forget(session_id)
+    return trace
+
+def traced(name: str, node):
+    """
+    Wrap a workflow node to record its wall time in the trace of the session, and to profile it
+    when profiling is enabled (see NodeProfiler).
+
+    Args:
+        name (str): The name of the node.
+        node (Callable[[dict], dict]): The node function, sync or async.
+
+    Returns:
+        Callable[[dict], dict]: The wrapped node.
+    """
+    @contextmanager
+    def span_of(state):
+        trace = session_trace(state.get('session_id'))
+        token = _current.set(trace)
+        span = Span(kind='node', name=name, start=time.perf_counter() - trace.started)
+        start = time.perf_counter()
+        try:
+            with profiled(name, state.get('session_id')):
+                yield
+        except Exception as e:
+            span['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span['duration'] = time.perf_counter() - start
+            trace.add(span)
+            _current.reset(token)
+
+    if inspect.iscoroutinefunction(node):
+        @wraps(node)
+        async def async_wrapper(state):
+            with span_of(state):
+                return await node(state)
+        return async_wrapper
+
+    @wraps(node)
+    def wrapper(state):
+        with span_of(state):
+            return node(state)
+    return wrapper
+
+@contextmanager
+def collect_spans(spans: list[Span]):
+    """
+    Also collect the crew spans recorded in the context in a list, e.g. to mark them once their outcome is known.
+
+    Args:
+        spans (list[Span]): The list receiving the spans.
+    """
+    token = _collected.set(spans)
+    try:
+        yield spans
+    finally:
+        _collected.reset(token)
+
+@contextmanager
+def crew_span(name: str, task):
+    """
+    Record a crew kickoff in the trace of the current session.
+
+    The caller sets "model", "cached" and the provider token counts on the yielded span.
+
+    Args:
+        name (str): The name of the task.
+        task (Task): The task with its rendered prompt.
+
+    Yields:
+        Span: The span of the kickoff.
+    """
+    from crews.context import estimate_tokens
+    trace = _current.get()
+    prompt = f"{task.description}\n{task.expected_output}"
+    span = Span(
+        kind='crew',
+        name=name,
+        start=time.perf_counter() - trace.started if trace is not None else 0.0,
+        prompt_chars=len(prompt),
+        prompt_size=estimate_tokens(prompt),
+    )
+    start = time.perf_counter()
+    try:
+        yield span
+    except Exception as e:
+        span['error'] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        span['duration'] = time.perf_counter() - start
+        span['cost'] = estimate_cost(span.get('model'), span.get('prompt_tokens', 0), span.get('completion_tokens', 0))
+        if trace is not None:
+            trace.add(span)
+        collected = _collected.get()
+        if collected is not None:
+            collected.append(span)
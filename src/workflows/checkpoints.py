@@ -0,0 +1,318 @@
+"""SQLite checkpointer for the planning workflow."""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterator, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver, Checkpoint, CheckpointTuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    thread_id TEXT PRIMARY KEY,
+    project_name TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    checkpoints INTEGER NOT NULL DEFAULT 0,
+    finished INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    thread_ts TEXT NOT NULL,
+    parent_ts TEXT,
+    snapshot INTEGER NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata BLOB,
+    channel_values TEXT NOT NULL,
+    removed TEXT NOT NULL,
+    appended TEXT NOT NULL DEFAULT '{}',
+    PRIMARY KEY (thread_id, thread_ts)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    thread_ts TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (thread_id, thread_ts, task_id, idx)
+);
+"""
+
+class SqliteCheckpointer(BaseCheckpointSaver):
+    """
+    Stores the checkpoints of the planning sessions in a local SQLite file.
+
+    Only the channels whose values changed since the parent checkpoint are written,
+    with a full snapshot every `snapshot_interval` checkpoints to bound the cost of
+    rebuilding a checkpoint. The list channels are stored item by item, so a list that
+    only grew (e.g. the append-only queries) is written as its new items. The last state
+    of the most recently used sessions is kept in memory, so a write of a running session
+    does not have to read the database; the state of a session is released when it finishes.
+
+    The writes of the tasks that finished in a step are stored as they complete and loaded
+    back as the pending writes of their checkpoint, so a session resumed after a crash in the
+    middle of a step (e.g. the fan-out of the features) only runs the tasks that had not finished.
+
+    Attributes:
+        path (str): The path of the SQLite file.
+        snapshot_interval (int): The number of checkpoints between full snapshots.
+        max_sessions (int): The number of sessions whose last state is kept in memory.
+    """
+
+    def __init__(self, path: str, snapshot_interval: int = 20, max_sessions: int = 64):
+        super().__init__()
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self.max_sessions = max_sessions
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(checkpoints)")}
+        if 'appended' not in columns:
+            self._conn.execute("ALTER TABLE checkpoints ADD COLUMN appended TEXT NOT NULL DEFAULT '{}'")
+        self._heads = OrderedDict[str, tuple[str, dict[str, str | list[str]], int]]()
+
+    @classmethod
+    def from_env(cls) -> 'SqliteCheckpointer':
+        """
+        Create a checkpointer configured from the CHECKPOINT_* environment variables.
+
+        Returns:
+            SqliteCheckpointer: The configured checkpointer.
+        """
+        return cls(
+            path=os.environ.get('CHECKPOINT_DB') or '.cache/sessions.db',
+            snapshot_interval=int(os.environ.get('CHECKPOINT_SNAPSHOT_INTERVAL') or 20),
+            max_sessions=int(os.environ.get('CHECKPOINT_MAX_SESSIONS') or 64),
+        )
+
+    def sessions(self) -> list[dict]:
+        """
+        List the sessions stored in the database, most recent first.
+
+        Returns:
+            list[dict]: The id, project name, timestamps, checkpoint count and status of each session.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT thread_id, project_name, created, updated, checkpoints, finished "
+                "FROM sessions ORDER BY updated DESC").fetchall()
+        return [
+            {
+                'session_id': row[0],
+                'project_name': row[1],
+                'created': row[2],
+                'updated': row[3],
+                'checkpoints': row[4],
+                'finished': bool(row[5]),
+            }
+            for row in rows
+        ]
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """
+        Get the checkpoint of a session.
+
+        Args:
+            config (RunnableConfig): The config with the thread id and, optionally, the checkpoint timestamp.
+
+        Returns:
+            Optional[CheckpointTuple]: The checkpoint or None if the session has no checkpoints.
+        """
+        thread_id = config['configurable']['thread_id']
+        thread_ts = config['configurable'].get('thread_ts')
+        with self._lock:
+            if thread_ts is None:
+                row = self._conn.execute(
+                    "SELECT thread_ts FROM checkpoints WHERE thread_id = ? ORDER BY thread_ts DESC LIMIT 1",
+                    (thread_id,)).fetchone()
+                if row is None:
+                    return None
+                thread_ts = row[0]
+            return self._load(thread_id, thread_ts)
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[dict] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        """
+        List the checkpoints of a session, most recent first.
+
+        Args:
+            config (Optional[RunnableConfig]): The config with the thread id.
+            filter (Optional[dict]): Metadata values the checkpoints must match.
+            before (Optional[RunnableConfig]): Only list checkpoints older than this one.
+            limit (Optional[int]): The maximum number of checkpoints to list.
+
+        Yields:
+            CheckpointTuple: The checkpoints of the session.
+        """
+        query = "SELECT thread_id, thread_ts FROM checkpoints"
+        where, params = [], []
+        if config is not None:
+            where.append("thread_id = ?")
+            params.append(config['configurable']['thread_id'])
+        if before is not None:
+            where.append("thread_ts < ?")
+            params.append(before['configurable']['thread_ts'])
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY thread_ts DESC"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        count = 0
+        for thread_id, thread_ts in rows:
+            with self._lock:
+                item = self._load(thread_id, thread_ts)
+            if filter and not all((item.metadata or {}).get(k) == v for k, v in filter.items()):
+                continue
+            yield item
+            count += 1
+            if limit is not None and count >= limit:
+                return
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: Optional[dict] = None) -> RunnableConfig:
+        """
+        Store a checkpoint of a session.
+
+        Args:
+            config (RunnableConfig): The config of the parent checkpoint.
+            checkpoint (Checkpoint): The checkpoint to store.
+            metadata (Optional[dict]): The metadata of the checkpoint.
+
+        Returns:
+            RunnableConfig: The config of the stored checkpoint.
+        """
+        thread_id = config['configurable']['thread_id']
+        parent_ts = config['configurable'].get('thread_ts')
+        thread_ts = checkpoint.get('id') or checkpoint['ts']
+        values = {channel: self._dumps(value) for channel, value in checkpoint['channel_values'].items()}
+        with self._lock:
+            head = self._heads.get(thread_id)
+            if head is None and parent_ts is not None:
+                item = self._load(thread_id, parent_ts)
+                if item is not None:
+                    head = self._heads.get(thread_id)
+            snapshot = head is None or head[0] != parent_ts or head[2] + 1 >= self.snapshot_interval
+            appended = {}
+            if snapshot:
+                changed, removed, depth = values, [], 0
+            else:
+                previous = head[1]
+                changed = {k: v for k, v in values.items() if previous.get(k) != v}
+                for k, v in list(changed.items()):
+                    old = previous.get(k)
+                    if isinstance(v, list) and isinstance(old, list) and len(old) < len(v) and v[:len(old)] == old:
+                        appended[k] = v[len(old):]
+                        del changed[k]
+                removed = [k for k in previous if k not in values]
+                depth = head[2] + 1
+            stored = {**checkpoint, 'channel_values': {}}
+            now = time.time()
+            project_name = checkpoint['channel_values'].get('project_name')
+            finished = checkpoint['channel_values'].get('final_report') is not None
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, thread_ts, parent_ts, snapshot, checkpoint, "
+                "metadata, channel_values, removed, appended) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, thread_ts, parent_ts, int(snapshot), self.serde.dumps(stored),
+                 self.serde.dumps(metadata) if metadata is not None else None,
+                 json.dumps(changed), json.dumps(removed), json.dumps(appended)))
+            self._conn.execute(
+                "INSERT INTO sessions VALUES (?, ?, ?, ?, 1, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET "
+                "project_name = COALESCE(excluded.project_name, project_name), "
+                "updated = excluded.updated, checkpoints = checkpoints + 1, finished = excluded.finished",
+                (thread_id, project_name if isinstance(project_name, str) else None, now, now, int(finished)))
+            self._conn.execute("COMMIT")
+            if finished:
+                self._heads.pop(thread_id, None)
+            else:
+                self._remember(thread_id, (thread_ts, values, depth))
+        return {'configurable': {'thread_id': thread_id, 'thread_ts': thread_ts}}
+
+    def put_writes(self, config: RunnableConfig, writes, task_id: str) -> None:
+        """
+        Store the pending writes of a task.
+
+        Args:
+            config (RunnableConfig): The config of the checkpoint the writes belong to.
+            writes (Sequence[tuple[str, Any]]): The channel writes of the task.
+            task_id (str): The id of the task.
+        """
+        thread_id = config['configurable']['thread_id']
+        thread_ts = config['configurable'].get('thread_ts') or ''
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (thread_id, thread_ts, task_id, idx, channel, self.serde.dumps(value).decode('utf-8'))
+                    for idx, (channel, value) in enumerate(writes)
+                ])
+
+    def _remember(self, thread_id: str, head: 'tuple[str, dict[str, str | list[str]], int]'):
+        """Keep the last state of a session, forgetting the least recently used sessions beyond the limit."""
+        self._heads[thread_id] = head
+        self._heads.move_to_end(thread_id)
+        while len(self._heads) > self.max_sessions:
+            self._heads.popitem(last=False)
+
+    def _dumps(self, value) -> 'str | list[str]':
+        """Serialize a channel value, item by item for a list."""
+        if isinstance(value, list):
+            return [self.serde.dumps(item).decode('utf-8') for item in value]
+        return self.serde.dumps(value).decode('utf-8')
+
+    def _loads(self, value: 'str | list[str]'):
+        """Deserialize a channel value serialized by `_dumps`."""
+        if isinstance(value, list):
+            return [self.serde.loads(item.encode('utf-8')) for item in value]
+        return self.serde.loads(value.encode('utf-8'))
+
+    def _load(self, thread_id: str, thread_ts: str) -> Optional[CheckpointTuple]:
+        chain = []
+        ts = thread_ts
+        while ts is not None:
+            row = self._conn.execute(
+                "SELECT parent_ts, snapshot, checkpoint, metadata, channel_values, removed, appended "
+                "FROM checkpoints WHERE thread_id = ? AND thread_ts = ?",
+                (thread_id, ts)).fetchone()
+            if row is None:
+                break
+            chain.append((ts, row))
+            if row[1]:
+                break
+            ts = row[0]
+        if not chain:
+            return None
+        values = dict[str, str | list[str]]()
+        for _, row in reversed(chain):
+            values.update(json.loads(row[4]))
+            for channel in json.loads(row[5]):
+                values.pop(channel, None)
+            for channel, items in json.loads(row[6]).items():
+                values[channel] = values.get(channel, []) + items
+        parent_ts, _, stored, metadata = chain[0][1][:4]
+        checkpoint = self.serde.loads(stored)
+        checkpoint['channel_values'] = {channel: self._loads(value) for channel, value in values.items()}
+        head = self._heads.get(thread_id)
+        if head is None or head[0] <= thread_ts:
+            self._remember(thread_id, (thread_ts, values, len(chain) - 1))
+        writes = self._conn.execute(
+            "SELECT task_id, channel, value FROM writes WHERE thread_id = ? AND thread_ts = ? ORDER BY task_id, idx",
+            (thread_id, thread_ts)).fetchall()
+        return CheckpointTuple(
+            {'configurable': {'thread_id': thread_id, 'thread_ts': thread_ts}},
+            checkpoint,
+            self.serde.loads(metadata) if metadata is not None else None,
+            {'configurable': {'thread_id': thread_id, 'thread_ts': parent_ts}} if parent_ts else None,
+            [(task_id, channel, self.serde.loads(value.encode('utf-8'))) for task_id, channel, value in writes],
+        )
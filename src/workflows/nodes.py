@@ -1,15 +1,30 @@
 """Nodes for the planing workflow."""
 
+import time
 from textwrap import dedent
+from typing import Callable, Iterable
 
-from workflows.states import AnalysisState
-from common import Query
+from langgraph.constants import Send
+
+from workflows.questions import QuestionIndex
+from workflows.states import AnalysisState, FeatureState
+from workflows.users import ConsoleUser
+from common import Query, Question, add_usage, project_description
 
 class PlanningNodes():
     """
     This class represents a set of planning nodes used in the workflow.
+
+    Attributes:
+        user: The user answering the workflow (ConsoleUser or ScriptedUser).
+        speculate (Callable[[AnalysisState], None] | None): Called with the state the next analysis
+            would receive after each answer, to start it in the background (e.g. SpeculativeAnalysis.submit).
     """
 
+    def __init__(self, user=None, speculate: Callable[[AnalysisState], None] | None = None):
+        self.user = user or ConsoleUser()
+        self.speculate = speculate
+
     def start_project(self, state: AnalysisState):
         """
         Prompts the user to enter the project name and description, and updates the state accordingly.
@@ -18,14 +33,32 @@ class PlanningNodes():
             state (AnalysisState): The current state of the analysis.
 
         Returns:
-            dict: The updated state with the project name and description added.
+            dict: The project name and description, and the start time of the session.
+        """
+        project_name = state.get('project_name') or self.user.ask("Enter the project name: ")
+        project_description = state.get('project_description') or self.user.ask("Enter the project description: ")
+        return {
+            'project_name': project_name,
+            'project_description': project_description,
+            'started_at': state.get('started_at') or time.time(),
+        }
+
+    async def astart_project(self, state: AnalysisState):
+        """
+        Prompts the user to enter the project name and description without blocking the event loop.
+
+        Args:
+            state (AnalysisState): The current state of the analysis.
+
+        Returns:
+            dict: The project name and description, and the start time of the session.
         """
-        project_name = input("Enter the project name: ")
-        project_description = input("Enter the project description: ")
+        project_name = state.get('project_name') or await self.user.aask("Enter the project name: ")
+        project_description = state.get('project_description') or await self.user.aask("Enter the project description: ")
         return {
-            **state,
             'project_name': project_name,
             'project_description': project_description,
+            'started_at': state.get('started_at') or time.time(),
         }
 
     def query_user(self, state: AnalysisState):
@@ -36,64 +69,267 @@ class PlanningNodes():
             state (AnalysisState): The current state of the analysis.
 
         Returns:
-            dict: The updated state after querying the user.
+            dict: The new queries answered by the user and whether the analysis should finish.
+
+        """
+        if state['questions'] is None or state['questions'] == []:
+            return self._no_questions()
+        queries, finish = self.ask_questions(
+            state['questions'], len(state['questions']), self._speculation(state), self.question_index(state))
+        return self._answered(queries, finish)
 
+    async def aquery_user(self, state: AnalysisState):
+        """
+        Queries the user for additional information without blocking the event loop.
+
+        Args:
+            state (AnalysisState): The current state of the analysis.
+
+        Returns:
+            dict: The new queries answered by the user and whether the analysis should finish.
         """
         if state['questions'] is None or state['questions'] == []:
-            return {
-                **state,
-                'questions': None,
-                'finish': True,
-            }
-        queries = state['queries'] or list[Query]()
-        total = len(state['questions'])
-        count = 0
+            return self._no_questions()
+        queries, finish = await self.aask_questions(
+            state['questions'], len(state['questions']), self._speculation(state), self.question_index(state))
+        return self._answered(queries, finish)
+
+    def _no_questions(self):
+        return {
+            'questions': None,
+            'finish': True,
+        }
+
+    def _answered(self, queries: list[Query], finish: bool):
+        return {
+            'queries': queries,
+            'finish': finish,
+        }
+
+    def question_index(self, state: AnalysisState) -> QuestionIndex | None:
+        """
+        Gets the index of the questions already answered in the session, to answer the repeated ones.
+
+        Args:
+            state (AnalysisState): The current state of the analysis.
+
+        Returns:
+            QuestionIndex | None: The index, or None if QUESTION_DEDUP_THRESHOLD disables it.
+        """
+        if QuestionIndex.threshold_from_env() <= 0:
+            return None
+        return QuestionIndex.of(state.get('session_id'), state.get('queries'))
+
+    def _speculation(self, state: AnalysisState) -> Callable[[list[Query]], None] | None:
+        if self.speculate is None:
+            return None
+        previous = list(state.get('queries') or list[Query]())
+
+        def on_answer(queries: list[Query]):
+            self.speculate({**state, 'queries': previous + queries, 'finish': False})
+
+        return on_answer
+
+    def ask_questions(
+            self,
+            questions: Iterable[Question],
+            total: int | None = None,
+            on_answer: Callable[[list[Query]], None] | None = None,
+            index: QuestionIndex | None = None) -> tuple[list[Query], bool]:
+        """
+        Asks the user to answer a sequence of questions.
+
+        The questions can be a generator that yields them while the analyst is still generating them.
+
+        Args:
+            questions (Iterable[Question]): The questions to ask.
+            total (int | None): The number of questions, if known in advance.
+            on_answer (Callable[[list[Query]], None] | None): Called with the queries answered so far after each answer.
+            index (QuestionIndex | None): The answered questions. A question repeating one of them gets its answer
+                instead of being asked again.
+
+        Returns:
+            tuple[list[Query], bool]: The answered queries and whether the user asked to finish the analysis.
+        """
+        steps = self._questionnaire(questions, total, on_answer, index)
+        reply = None
+        while True:
+            try:
+                method, *args = steps.send(reply)
+            except StopIteration as stop:
+                return stop.value
+            reply = getattr(self.user, method)(*args)
+
+    async def aask_questions(
+            self,
+            questions: Iterable[Question],
+            total: int | None = None,
+            on_answer: Callable[[list[Query]], None] | None = None,
+            index: QuestionIndex | None = None) -> tuple[list[Query], bool]:
+        """
+        Asks the user to answer a sequence of questions without blocking the event loop.
+
+        Args:
+            questions (Iterable[Question]): The questions to ask.
+            total (int | None): The number of questions, if known in advance.
+            on_answer (Callable[[list[Query]], None] | None): Called with the queries answered so far after each answer.
+            index (QuestionIndex | None): The answered questions. A question repeating one of them gets its answer
+                instead of being asked again.
+
+        Returns:
+            tuple[list[Query], bool]: The answered queries and whether the user asked to finish the analysis.
+        """
+        steps = self._questionnaire(questions, total, on_answer, index)
+        reply = None
+        while True:
+            try:
+                method, *args = steps.send(reply)
+            except StopIteration as stop:
+                return stop.value
+            reply = await getattr(self.user, f"a{method}")(*args)
+
+    def _questionnaire(self, questions: Iterable[Question], total: int | None, on_answer, index: QuestionIndex | None):
+        """Yields the user interactions of the questionnaire as (method, *args) and receives their results."""
+        queries = list[Query]()
         skip = False
         finish = False
-        print(dedent("""
+        for count, question in enumerate(questions, start=1):
+            if count == 1:
+                yield 'show', dedent("""
                      Here are some additional questions.
                      Please answer them to refine the project description.
                      To mark the answer as not applicable, type 'N/A'. (The question will be marked as answered as not applicable to the project.)
                      To accept the analyst proposal to that question type 'ACCEPT' or 'OK' or just press [enter]. (The question will be marked as answered by the analyst.)
+                     To use the answer of a similar past project, when one is shown, type 'PAST'. (It is never used unless you type it.)
                      To finish the questionnaire type 'SKIP'. (All the remaining questions will be marked as answered by the analyst.)
                      To finish the analysis type 'FINISH'. (All the remaining questions will be marked as answered by the analyst and no more questions will be generated, ending the analysis.)
-                     """))
-        for question in state['questions']:
-            skip=finish
-            count += 1
-            query = Query()
-            query['question'] = question['text'],
-            query['answer'] = None,
-            if not skip:
+                     """)
+            answer = ''
+            command = ''
+            position = f"{count} of {total}" if total is not None else f"{count}"
+            duplicate = index.match(question['text']) if index is not None else None
+            if duplicate is not None:
+                answer = duplicate[0]['answer']
+                if not skip:
+                    yield 'show', f"\nQuestion {position} was already answered:\n{duplicate[0]['question']}\nAnswer: {answer}\n"
+            elif not skip:
                 proposal = ""
-                if (question['proposal'] is not None and question['proposal'] != ''):
+                if question.get('proposal'):
                     proposal = f"""
                                 Analyst Proposal:
                                 {question['proposal']}
                                 """
+                if question.get('past_answer'):
+                    proposal += f"""
+                                Answer of a Similar Past Project (type 'PAST' to use it):
+                                {question['past_answer']}
+                                """
                 prompt = dedent(f"""
-                                 Question {count} of {total}
+                                 Question {position}
                                  {question['text']}{proposal}
                                  Answer:
                                  """)
-                query['answer'] = input(prompt)
-            if query['answer'] == 'N/A':
-                query['answer'] = 'This question is not applicable to the project.',
-            if query['answer'] == 'FINISH':
+                answer = ((yield 'answer', question, prompt) or '').strip()
+                command = answer.upper()
+            if command == 'N/A':
+                answer = 'This question is not applicable to the project.'
+            if command == 'PAST' and question.get('past_answer'):
+                answer = question['past_answer']
+            if command == 'FINISH':
                 finish = True
-                query['answer'] = 'SKIP'
-            if query['answer'] is None or query['answer'] == 'SKIP' or query['answer'] == '':
+            if command in ('FINISH', 'SKIP'):
                 skip = True
-            if skip:
-                query['answer'] = question['proposal'] or 'The analyst can propose the answer to this question.',
-            queries.append(query)
-        if not finish:
-            yes_no = input("Finish the analysis? (yes/[no]): ")
-            finish = (yes_no or "n")[0].lower == "y",
+            if duplicate is None and (skip or command in ('', 'ACCEPT', 'OK')):
+                answer = question.get('proposal') or 'The analyst can propose the answer to this question.'
+            queries.append(Query(question=question['text'], answer=answer))
+            if index is not None:
+                index.add(queries[-1])
+            if on_answer is not None and not skip:
+                on_answer(list(queries))
+        if on_answer is not None and skip and not finish:
+            on_answer(list(queries))
+        if queries and not finish:
+            finish = yield 'confirm', "Finish the analysis? (yes/[no]): "
+        return queries, finish
+
+    def define_requirements(self, state: AnalysisState):
+        """
+        Starts the requirements stage, which forks into the business and system requirements.
+
+        Args:
+            state (AnalysisState): The current state of the analysis.
+
+        Returns:
+            dict: An empty update of the requirements (langgraph requires a node to write a channel).
+                The branches write their own entries of the state.
+        """
         return {
-            **state,
-            'queries': queries,
-            'finish': finish,
+            'requirements': {},
+        }
+
+    def join_requirements(self, state: AnalysisState):
+        """
+        Joins the requirements branches, adding their token usage to the usage of the session.
+
+        Args:
+            state (AnalysisState): The state with the requirements merged from both branches.
+
+        Returns:
+            dict: The updated usage of the session, and the usage of the branches cleared once added.
+        """
+        branches = state.get('branch_usage') or {}
+        return self._add_branches(state, [name for name in branches if not name.startswith('feature:')])
+
+    def plan_work(self, state: AnalysisState):
+        """
+        Fans the identified features out to their own branches, one per feature.
+
+        Features already broken down without errors (e.g. before the session was resumed) are not sent again.
+
+        Args:
+            state (AnalysisState): The state with the identified features.
+
+        Returns:
+            list[Send] | str: A branch per feature to break down, or "join_work" if there is none.
+        """
+        work = state.get('work') or {}
+        branches = [
+            Send('decompose_feature', FeatureState(
+                session_id=state.get('session_id'),
+                project_name=state['project_name'],
+                project_description=project_description(state),
+                feature=feature,
+            ))
+            for feature in state.get('features') or []
+            if feature['name'] not in work or work[feature['name']].get('errors')
+        ]
+        return branches or 'join_work'
+
+    def join_work(self, state: AnalysisState):
+        """
+        Joins the feature branches, adding their token usage to the usage of the session.
+
+        Only the branches that ran since the last join are added: the features broken down before
+        the session was resumed are not sent again, and their usage was already added.
+
+        Args:
+            state (AnalysisState): The state with the work breakdown merged from all the branches.
+
+        Returns:
+            dict: The updated usage of the session, and the usage of the branches cleared once added.
+        """
+        return self._add_branches(state, [f"feature:{feature['name']}" for feature in state.get('features') or []])
+
+    def _add_branches(self, state: AnalysisState, names: list[str]) -> dict:
+        """Adds the usage of the branches to the usage of the session and clears it, so it is only added once."""
+        usage = state.get('usage')
+        branches = state.get('branch_usage') or {}
+        added = [name for name in names if branches.get(name) is not None]
+        for name in added:
+            usage = add_usage(usage, branches[name])
+        return {
+            'usage': usage,
+            'branch_usage': {name: None for name in added},
         }
 
     def has_answers(self, state: AnalysisState):
@@ -0,0 +1,75 @@
+"""Pipelined analysis and questionnaire."""
+
+import contextvars
+import queue
+import threading
+
+from workflows.states import AnalysisState
+
+_DONE = object()
+
+class PipelinedAnalysis():
+    """
+    Runs an analysis round and its questionnaire at the same time.
+
+    The analysis crew runs in a background thread and streams its answer through an
+    incremental parser, and each question is asked as soon as it is complete, so most
+    of the generation time is hidden behind the user's typing.
+
+    Attributes:
+        crew (AnalysisCrew): The crew that analyzes the project.
+        nodes (PlanningNodes): The nodes used to ask the questions.
+    """
+
+    def __init__(self, crew, nodes):
+        self.crew = crew
+        self.nodes = nodes
+
+    def __call__(self, state: AnalysisState) -> dict:
+        """
+        Analyze the project and ask the user the questions as they are generated.
+
+        Args:
+            state (AnalysisState): The current state of the analysis.
+
+        Returns:
+            dict: The updates of the state: the revised description, the generated questions and the new answered queries.
+        """
+        questions = queue.Queue()
+        outcome = {}
+
+        def analyze():
+            try:
+                outcome['state'] = self.crew.kickoff(state, on_question=questions.put)
+            except BaseException as e:  # pylint: disable=broad-except
+                outcome['error'] = e
+            finally:
+                questions.put(_DONE)
+
+        context = contextvars.copy_context()
+        thread = threading.Thread(target=context.run, args=(analyze,), name="pipelined-analysis", daemon=True)
+        thread.start()
+
+        def generated():
+            while True:
+                question = questions.get()
+                if question is _DONE:
+                    return
+                yield question
+
+        queries, finish = self.nodes.ask_questions(generated(), index=self.nodes.question_index(state))
+        thread.join()
+        if 'error' in outcome:
+            raise outcome['error']
+        result = outcome['state']
+        if not queries:
+            return {
+                **result,
+                'questions': None,
+                'finish': True,
+            }
+        return {
+            **result,
+            'queries': queries,
+            'finish': finish,
+        }
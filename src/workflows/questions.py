@@ -0,0 +1,118 @@
+"""Index of the questions already answered in a session."""
+
+import math
+import os
+import threading
+from collections import Counter, OrderedDict
+
+from common import Query, words
+
+class QuestionIndex():
+    """
+    An inverted index of the answered questions of a session, to find the ones a new question repeats.
+
+    The questions are compared by the cosine similarity of their sets of words. A lookup only
+    visits the questions sharing a word with the new question, so it stays fast with thousands
+    of answered questions. The index of each session is kept by the process and extended with
+    the new queries of each round instead of being rebuilt.
+
+    Attributes:
+        queries (list[Query]): The indexed queries, in the order of the session.
+        threshold (float): The similarity from which a question repeats an answered one.
+    """
+
+    _sessions = OrderedDict[str, 'QuestionIndex']()
+    _lock = threading.Lock()
+    MAX_SESSIONS = 256
+
+    def __init__(self, threshold: float = 0.8):
+        self.queries = list[Query]()
+        self.threshold = threshold
+        self._postings = dict[str, list[int]]()
+        self._sizes = list[int]()
+
+    @staticmethod
+    def threshold_from_env() -> float:
+        """
+        Get the similarity threshold from the QUESTION_DEDUP_THRESHOLD environment variable (default 0.8, 0 disables).
+
+        Returns:
+            float: The threshold.
+        """
+        return float(os.environ.get('QUESTION_DEDUP_THRESHOLD') or 0.8)
+
+    @classmethod
+    def of(cls, session_id: str | None, queries: list[Query] | None) -> 'QuestionIndex':
+        """
+        Get the index of the answered questions of a session, updated with its queries.
+
+        Args:
+            session_id (str | None): The id of the session. A session without id gets a new index.
+            queries (list[Query] | None): The queries answered in the session so far.
+
+        Returns:
+            QuestionIndex: The index of the queries.
+        """
+        queries = queries or []
+        with cls._lock:
+            index = cls._sessions.pop(session_id, None) if session_id else None
+            if index is None or not index._extends(queries):
+                index = cls(cls.threshold_from_env())
+            if session_id:
+                cls._sessions[session_id] = index
+                while len(cls._sessions) > cls.MAX_SESSIONS:
+                    cls._sessions.popitem(last=False)
+        for query in queries[len(index.queries):]:
+            index.add(query)
+        return index
+
+    def _extends(self, queries: list[Query]) -> bool:
+        """Whether the queries start with the indexed ones (checked on the last one)."""
+        return len(queries) >= len(self.queries) and (
+            not self.queries or queries[len(self.queries) - 1]['question'] == self.queries[-1]['question'])
+
+    def add(self, query: Query):
+        """
+        Add an answered query to the index.
+
+        Args:
+            query (Query): The query.
+        """
+        position = len(self.queries)
+        terms = set(words(query['question']))
+        self.queries.append(query)
+        self._sizes.append(len(terms))
+        for term in terms:
+            self._postings.setdefault(term, []).append(position)
+
+    def match(self, text: str, threshold: float | None = None, limit: int | None = None) -> tuple[Query, float] | None:
+        """
+        Find the answered query most similar to a question.
+
+        Args:
+            text (str): The text of the question.
+            threshold (float, optional): The minimum similarity. Defaults to the threshold of the index.
+            limit (int, optional): Only match the first queries of the session, e.g. the ones before the current round.
+
+        Returns:
+            tuple[Query, float] | None: The most similar query and its similarity, or None if none reaches the threshold.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        terms = set(words(text))
+        if threshold <= 0 or len(terms) < 2:
+            return None
+        limit = len(self.queries) if limit is None else limit
+        shared = Counter()
+        for term in terms:
+            for position in self._postings.get(term, ()):
+                if position >= limit:
+                    break
+                shared[position] += 1
+        best, score = None, 0.0
+        for position, count in shared.items():
+            similarity = count / math.sqrt(len(terms) * self._sizes[position])
+            if similarity > score or (similarity == score and best is not None and position > best):
+                best, score = position, similarity
+        if best is None or score < threshold:
+            return None
+        return self.queries[best], score
@@ -0,0 +1,185 @@
+"""Offline rendering of the workflow graph."""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from xml.sax.saxutils import escape
+
+logger = logging.getLogger(__name__)
+
+RENDERER_VERSION = 1
+
+NODE_HEIGHT = 36
+LEVEL_HEIGHT = 84
+NODE_GAP = 40
+MARGIN = 40
+CHAR_WIDTH = 7.5
+
+def graph_hash(graph, fmt: str) -> str:
+    """
+    Hash the structure of a graph, to find the renders of the same graph.
+
+    Args:
+        graph: The graph of the compiled workflow (app.get_graph()).
+        fmt (str): The format of the render ("png" or "svg").
+
+    Returns:
+        str: The hash of the nodes, the edges and the format.
+    """
+    structure = {
+        'version': RENDERER_VERSION,
+        'format': fmt,
+        'nodes': sorted(graph.nodes),
+        'edges': sorted(
+            [edge.source, edge.target, None if edge.data is None else str(edge.data), bool(edge.conditional)]
+            for edge in graph.edges),
+    }
+    return hashlib.sha256(json.dumps(structure).encode('utf-8')).hexdigest()
+
+def render_png(graph) -> bytes:
+    """
+    Render a graph as a PNG image with Graphviz, locally.
+
+    Args:
+        graph: The graph of the compiled workflow.
+
+    Returns:
+        bytes: The image.
+
+    Raises:
+        ImportError: If pygraphviz is not installed.
+    """
+    import pygraphviz  # pylint: disable=import-outside-toplevel,unused-import
+    return graph.draw_png()
+
+def _levels(graph) -> dict[str, int]:
+    """Place each node on the level of its shortest path from the start, and the end below all of them."""
+    targets = dict[str, list[str]]()
+    for edge in graph.edges:
+        targets.setdefault(edge.source, []).append(edge.target)
+    incoming = {edge.target for edge in graph.edges}
+    roots = [node for node in graph.nodes if node == '__start__'] or [node for node in graph.nodes if node not in incoming]
+    levels = {node: 0 for node in roots}
+    queue = list(roots)
+    for node in queue:
+        for target in targets.get(node, ()):
+            if target not in levels:
+                levels[target] = levels[node] + 1
+                queue.append(target)
+    last = max(levels.values(), default=-1)
+    for node in graph.nodes:
+        if node not in levels:
+            last += 1
+            levels[node] = last
+    if '__end__' in levels:
+        levels['__end__'] = max((level for node, level in levels.items() if node != '__end__'), default=-1) + 1
+    return levels
+
+def render_svg(graph) -> bytes:
+    """
+    Render a graph as an SVG image, in pure Python.
+
+    The nodes are laid out top-down by their distance from the start. The edges going down
+    are straight, the edges going back up or across loop on the right side, and the
+    conditional edges are dashed.
+
+    Args:
+        graph: The graph of the compiled workflow.
+
+    Returns:
+        bytes: The image.
+    """
+    levels = _levels(graph)
+    rows = dict[int, list[str]]()
+    for node in graph.nodes:
+        rows.setdefault(levels[node], []).append(node)
+    widths = {node: max(100.0, len(node) * CHAR_WIDTH + 24) for node in graph.nodes}
+    row_widths = {level: sum(widths[node] for node in row) + NODE_GAP * (len(row) - 1) for level, row in rows.items()}
+    width = max(row_widths.values(), default=0) + 2 * MARGIN + 120
+    height = (max(rows, default=0) + 1) * LEVEL_HEIGHT + 2 * MARGIN
+    boxes = dict[str, tuple[float, float, float]]()
+    for level, row in rows.items():
+        x = (width - 120 - row_widths[level]) / 2
+        for node in row:
+            boxes[node] = (x, MARGIN + level * LEVEL_HEIGHT, widths[node])
+            x += widths[node] + NODE_GAP
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{height:.0f}" '
+        f'viewBox="0 0 {width:.0f} {height:.0f}" font-family="sans-serif" font-size="13">',
+        '<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="8" markerHeight="8" '
+        'orient="auto-start-reverse"><path d="M 0 0 L 10 5 L 0 10 z" fill="#555"/></marker></defs>',
+        f'<rect width="{width:.0f}" height="{height:.0f}" fill="white"/>',
+    ]
+    for loop, edge in enumerate(graph.edges):
+        sx, sy, sw = boxes[edge.source]
+        tx, ty, tw = boxes[edge.target]
+        dash = ' stroke-dasharray="5,4"' if edge.conditional else ''
+        if levels[edge.target] > levels[edge.source]:
+            x1, y1, x2, y2 = sx + sw / 2, sy + NODE_HEIGHT, tx + tw / 2, ty
+            path = f'M {x1:.1f} {y1:.1f} L {x2:.1f} {y2:.1f}'
+            lx, ly = (x1 + x2) / 2, (y1 + y2) / 2
+        else:
+            x1, y1, x2, y2 = sx + sw, sy + NODE_HEIGHT / 2, tx + tw, ty + NODE_HEIGHT / 2
+            bend = max(x1, x2) + 30 + 12 * (loop % 4)
+            path = f'M {x1:.1f} {y1:.1f} C {bend:.1f} {y1:.1f}, {bend:.1f} {y2:.1f}, {x2:.1f} {y2:.1f}'
+            lx, ly = bend - 8, (y1 + y2) / 2
+        parts.append(f'<path d="{path}" fill="none" stroke="#555"{dash} marker-end="url(#arrow)"/>')
+        if edge.data is not None:
+            parts.append(f'<text x="{lx + 4:.1f}" y="{ly:.1f}" font-size="11" fill="#333">{escape(str(edge.data))}</text>')
+    for node, (x, y, w) in boxes.items():
+        terminal = node in ('__start__', '__end__')
+        fill = '#e8e8e8' if terminal else '#f2f0ff'
+        radius = NODE_HEIGHT / 2 if terminal else 6
+        parts.append(
+            f'<rect x="{x:.1f}" y="{y:.1f}" width="{w:.1f}" height="{NODE_HEIGHT}" rx="{radius:.0f}" '
+            f'fill="{fill}" stroke="#7b6fd6"/>')
+        parts.append(
+            f'<text x="{x + w / 2:.1f}" y="{y + NODE_HEIGHT / 2 + 4:.1f}" text-anchor="middle">{escape(node)}</text>')
+    parts.append('</svg>')
+    return '\n'.join(parts).encode('utf-8')
+
+def render_graph(graph, path: str, cache_dir: str | None = None) -> str:
+    """
+    Render a graph to a file, locally and without network access.
+
+    The format follows the extension of the path: PNG is rendered with Graphviz, and falls
+    back to an SVG next to it when pygraphviz is not installed; SVG is rendered in pure Python.
+    The renders are cached by the hash of the graph structure, so an unchanged graph is
+    copied from the cache instead of being rendered again.
+
+    Args:
+        graph: The graph of the compiled workflow (app.get_graph()).
+        path (str): The path of the image.
+        cache_dir (str | None): The cache folder. Defaults to the GRAPH_CACHE_DIR environment
+            variable or ".cache/graphs".
+
+    Returns:
+        str: The path of the image written.
+    """
+    cache_dir = cache_dir or os.environ.get('GRAPH_CACHE_DIR') or '.cache/graphs'
+    root, extension = os.path.splitext(path)
+    fmt = extension.lstrip('.').lower() or 'svg'
+    if fmt == 'png':
+        try:
+            import pygraphviz  # pylint: disable=import-outside-toplevel,unused-import
+        except ImportError:
+            logger.warning("pygraphviz is not installed, rendering the graph as SVG instead of PNG.")
+            fmt, path = 'svg', f"{root}.svg"
+    elif fmt != 'svg':
+        raise ValueError(f"Unsupported graph format: {fmt} (use png or svg).")
+    cached = os.path.join(cache_dir, f"{graph_hash(graph, fmt)}.{fmt}")
+    if os.path.exists(cached):
+        logger.info("Graph unchanged, using the cached render.")
+    else:
+        image = render_png(graph) if fmt == 'png' else render_svg(graph)
+        os.makedirs(cache_dir, exist_ok=True)
+        temporary = f"{cached}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as file:
+            file.write(image)
+        os.replace(temporary, cached)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    shutil.copyfile(cached, path)
+    return path
@@ -0,0 +1,140 @@
+"""Scheduling of the analysis rounds."""
+
+import logging
+import os
+import time
+
+from workflows.questions import QuestionIndex
+from workflows.states import AnalysisState
+
+logger = logging.getLogger(__name__)
+
+class RoundScheduler():
+    """
+    Decides after each analysis round whether the analyst gets another round.
+
+    The analysis continues while the analyst has questions, unless a budget is exhausted
+    (rounds, tokens or wall time since the session started) or the rounds stopped paying
+    off: the description barely changed in the last round, or most of the new questions
+    duplicate questions the user has already answered. A limit of 0 disables its check, and
+    all the limits are disabled by default. A round cut short by a limit is reported to the
+    user with its reason (a warning), so the analysis never stops silently.
+
+    Attributes:
+        max_rounds (int): The maximum number of analysis rounds.
+        max_tokens (int): The maximum number of tokens used by the session.
+        max_seconds (float): The maximum time since the start of the session in seconds.
+        min_change (float): The minimum share of the description changed by a round.
+        max_duplicates (float): The share of duplicated new questions that stops the analysis.
+        duplicate_similarity (float): The similarity from which a question duplicates an answered one.
+    """
+
+    def __init__(
+            self,
+            max_rounds: int = 0,
+            max_tokens: int = 0,
+            max_seconds: float = 0.0,
+            min_change: float = 0.0,
+            max_duplicates: float = 0.0,
+            duplicate_similarity: float = 0.6):
+        self.max_rounds = max_rounds
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.min_change = min_change
+        self.max_duplicates = max_duplicates
+        self.duplicate_similarity = duplicate_similarity
+
+    @classmethod
+    def from_env(cls) -> 'RoundScheduler':
+        """
+        Create a scheduler configured by the environment variables.
+
+        ANALYSIS_MAX_ROUNDS, ANALYSIS_MAX_TOKENS, ANALYSIS_MAX_SECONDS, ANALYSIS_MIN_CHANGE
+        and ANALYSIS_MAX_DUPLICATES (all default 0, disabled).
+
+        Returns:
+            RoundScheduler: The scheduler.
+        """
+        def value(name: str, default):
+            text = os.environ.get(name)
+            return type(default)(text) if text not in (None, '') else default
+        return cls(
+            max_rounds=value('ANALYSIS_MAX_ROUNDS', 0),
+            max_tokens=value('ANALYSIS_MAX_TOKENS', 0),
+            max_seconds=value('ANALYSIS_MAX_SECONDS', 0.0),
+            min_change=value('ANALYSIS_MIN_CHANGE', 0.0),
+            max_duplicates=value('ANALYSIS_MAX_DUPLICATES', 0.0),
+        )
+
+    def decide(self, state: AnalysisState) -> str:
+        """
+        Decide whether the analysis continues after a round.
+
+        Args:
+            state (AnalysisState): The state after the analysis round.
+
+        Returns:
+            str: "CONTINUE" to ask the questions of the round, or "FINISH" to stop the analysis.
+        """
+        reason = self.stop_reason(state)
+        if reason is None:
+            return "CONTINUE"
+        rounds = len(state.get('revisions') or [])
+        if state.get('questions'):
+            logger.warning(
+                "Stopping the analysis after round %d with %d unanswered questions: %s.",
+                rounds, len(state['questions']), reason)
+        else:
+            logger.info("Stopping the analysis after round %d: %s.", rounds, reason)
+        return "FINISH"
+
+    def stop_reason(self, state: AnalysisState) -> str | None:
+        """
+        Get the reason to stop the analysis after a round.
+
+        Args:
+            state (AnalysisState): The state after the analysis round.
+
+        Returns:
+            str | None: The reason to stop, or None if the analysis continues.
+        """
+        questions = state.get('questions') or []
+        if not questions:
+            return "no more questions"
+        revisions = state.get('revisions') or []
+        rounds = len(revisions)
+        if self.max_rounds and rounds >= self.max_rounds:
+            return f"reached the limit of {self.max_rounds} rounds"
+        tokens = (state.get('usage') or {}).get('total_tokens') or 0
+        if self.max_tokens and tokens >= self.max_tokens:
+            return f"used {tokens:,} tokens of a budget of {self.max_tokens:,}"
+        started_at = state.get('started_at')
+        elapsed = time.time() - started_at if started_at else 0.0
+        if self.max_seconds and elapsed >= self.max_seconds:
+            return f"ran for {elapsed:.0f}s of a budget of {self.max_seconds:.0f}s"
+        changed = revisions[-1]['change'] if revisions else 1.0
+        if self.min_change and rounds > 1 and changed < self.min_change:
+            return f"the description changed {changed:.1%} (minimum {self.min_change:.1%})"
+        duplicates = self.duplicates(state)
+        if self.max_duplicates and duplicates / len(questions) >= self.max_duplicates:
+            return f"{duplicates} of {len(questions)} new questions duplicate answered ones"
+        logger.debug(
+            "Continuing the analysis after round %d: %d tokens, %.0fs, description changed %.1f%%, %d/%d duplicate questions.",
+            rounds, tokens, elapsed, 100 * changed, duplicates, len(questions))
+        return None
+
+    def duplicates(self, state: AnalysisState) -> int:
+        """
+        Count the new questions that duplicate questions answered in the previous rounds.
+
+        Args:
+            state (AnalysisState): The state after the analysis round.
+
+        Returns:
+            int: The number of duplicated new questions.
+        """
+        index = QuestionIndex.of(state.get('session_id'), state.get('queries'))
+        analyzed = state.get('queries_analyzed') or 0
+        return sum(
+            1 for question in state.get('questions') or []
+            if index.match(question['text'], self.duplicate_similarity, limit=analyzed) is not None)
@@ -0,0 +1,140 @@
+"""Async planning service."""
+
+import asyncio
+import uuid
+
+from workflows.states import AnalysisState
+from workflows.users import Prompt, SessionUser
+from workflows.workflow import PlaningWorkflow
+from tracing import close_trace
+
+class _Session():
+    def __init__(self, user: SessionUser, task: asyncio.Task):
+        self.user = user
+        self.task = task
+
+class PlanningService():
+    """
+    Runs many planning sessions concurrently on one event loop.
+
+    Each session runs the async workflow with `ainvoke`, and its user input comes through
+    the session API instead of the console: `prompt` returns the next input requested by
+    the workflow and `reply` answers it. The crews of all the sessions are shared, and so
+    are the pooled HTTP connections to the model provider.
+
+    Attributes:
+        checkpointer (BaseCheckpointSaver | None): Stores the checkpoints of the sessions.
+        llm (BaseLanguageModel | None): A model for dedicated crews. Defaults to the shared crews.
+    """
+
+    def __init__(self, checkpointer=None, llm=None):
+        self.checkpointer = checkpointer
+        self.llm = llm
+        self._sessions = dict[str, _Session]()
+
+    async def start(
+            self,
+            project_name: str,
+            project_description: str,
+            report_path: str | None = None,
+            session_id: str | None = None) -> str:
+        """
+        Start a planning session.
+
+        Args:
+            project_name (str): The name of the project.
+            project_description (str): The description of the project.
+            report_path (str, optional): The path of the report file. Defaults to report.md.
+            session_id (str, optional): The id of the session. Defaults to a new id.
+
+        Returns:
+            str: The id of the session.
+        """
+        session_id = session_id or uuid.uuid4().hex
+        user = SessionUser(asyncio.get_running_loop())
+        app = PlaningWorkflow(checkpointer=self.checkpointer, user=user, llm=self.llm, asynchronous=True).app
+        state = {
+            'session_id': session_id,
+            'project_name': project_name,
+            'project_description': project_description,
+            'report_path': report_path,
+        }
+        config = {'configurable': {'thread_id': session_id}}
+        self._sessions[session_id] = _Session(user, asyncio.create_task(app.ainvoke(state, config)))
+        return session_id
+
+    async def prompt(self, session_id: str, timeout: float | None = None) -> Prompt | None:
+        """
+        Wait for the next input requested by a session.
+
+        Args:
+            session_id (str): The id of the session.
+            timeout (float, optional): The maximum time to wait in seconds.
+
+        Returns:
+            Prompt | None: The prompt to reply to, or None if the session has ended.
+
+        Raises:
+            TimeoutError: If no prompt was requested before the timeout.
+        """
+        session = self._sessions[session_id]
+        if not session.user.prompts.empty():
+            return session.user.prompts.get_nowait()
+        if session.task.done():
+            return None
+        prompt = asyncio.ensure_future(session.user.prompts.get())
+        done, _ = await asyncio.wait({prompt, session.task}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        if prompt in done:
+            return prompt.result()
+        prompt.cancel()
+        if session.task in done:
+            return None
+        raise TimeoutError(f"Session {session_id} did not request any input in {timeout} seconds.")
+
+    async def reply(self, session_id: str, text: str):
+        """
+        Reply to the pending prompt of a session.
+
+        Args:
+            session_id (str): The id of the session.
+            text (str): The answer of the user.
+        """
+        await self._sessions[session_id].user.reply(text)
+
+    def messages(self, session_id: str) -> list[str]:
+        """
+        Get the messages shown to the user of a session.
+
+        Args:
+            session_id (str): The id of the session.
+
+        Returns:
+            list[str]: The messages, in order.
+        """
+        return self._sessions[session_id].user.messages
+
+    def running(self) -> list[str]:
+        """
+        Get the sessions that have not ended.
+
+        Returns:
+            list[str]: The ids of the running sessions.
+        """
+        return [session_id for session_id, session in self._sessions.items() if not session.task.done()]
+
+    async def result(self, session_id: str) -> AnalysisState:
+        """
+        Wait for a session to end and release it, with its trace.
+
+        Args:
+            session_id (str): The id of the session.
+
+        Returns:
+            AnalysisState: The final state of the session.
+        """
+        session = self._sessions[session_id]
+        try:
+            return await session.task
+        finally:
+            del self._sessions[session_id]
+            close_trace(session_id)
@@ -1,21 +1,98 @@
 """State for the planning workflow."""
 
+from typing import Annotated
+
 from typing_extensions import TypedDict
-from common import Query, Question
+from common import Feature, Query, Question, Requirement, Revision, Usage, WorkItem
+
+def append(left: list | None, right: list | None) -> list:
+    """
+    Append the entries written by a node to a log channel.
+
+    The nodes only return their new entries, so the updates (and the checkpoints, see
+    SqliteCheckpointer) grow with what changed instead of with the whole history.
+
+    Args:
+        left (list | None): The current entries of the channel.
+        right (list | None): The new entries.
+
+    Returns:
+        list: The entries of the channel followed by the new ones.
+    """
+    if not right:
+        return left or []
+    return (left or []) + right
+
+def merge(left: dict | None, right: dict | None) -> dict:
+    """
+    Join the entries written by parallel branches into a dict channel.
+
+    Each branch writes its own keys, so the join keeps all of them whatever the order
+    of the updates, and writing the same entries again leaves the channel unchanged.
+
+    Args:
+        left (dict | None): The current value of the channel.
+        right (dict | None): The update of a branch.
+
+    Returns:
+        dict: The merged entries.
+    """
+    return {**(left or {}), **(right or {})}
 
 class AnalysisState(TypedDict):
     """
     Represents the state of a analysis workflow.
 
     Attributes:
+        session_id (str): The id of the planning session.
         project_name (str): The name of the project.
-        project_description (str): The description of the project.
-        queries (list[Query]): The queries already answered by the user.
+        project_description (str): The description of the project, as entered by the user when the analyst edits its sections.
+        description_sections (dict[str, str]): The sections of the description by topic, when the analyst edits them
+            (see DESCRIPTION_EDITS); the analysis rounds only return the sections they edited.
+        queries (list[Query]): The queries already answered by the user (append-only).
         questions (list[Question]): The addtional questions to ask the user.
+        queries_analyzed (int): The number of queries already seen by the analyst.
+        finish (bool): Whether the user asked to finish the analysis.
+        revisions (list[Revision]): The revisions of the description by the analysis rounds (append-only).
+        started_at (float): The time the session started, as a timestamp.
+        final_report (str): The generated project summary report.
+        report_path (str): The path of the report file (defaults to report.md).
+        usage (Usage): The LLM token usage of the session.
+        requirements (dict[str, list[Requirement]]): The requirements of the project by type ("business" or "system").
+        branch_usage (dict[str, Usage | None]): The LLM token usage of the parallel branches, added to usage
+            when they join and then cleared (None), so a branch is only counted for the pass it ran in.
+        features (list[WorkItem]): The features identified from the requirements.
+        work (dict[str, Feature]): The features broken into activities and tasks, by feature name.
     """
+    session_id: str | None
     project_name: str
     project_description: str
-    queries: list[Query]
+    description_sections: Annotated[dict[str, str], merge]
+    queries: Annotated[list[Query], append]
     questions: list[Question] | None
+    queries_analyzed: int | None
     finish: bool
+    revisions: Annotated[list[Revision], append]
+    started_at: float | None
     final_report: str | None
+    report_path: str | None
+    usage: Usage | None
+    requirements: Annotated[dict[str, list[Requirement]], merge]
+    branch_usage: Annotated[dict[str, Usage | None], merge]
+    features: list[WorkItem] | None
+    work: Annotated[dict[str, Feature], merge]
+
+class FeatureState(TypedDict):
+    """
+    Represents the input of the branch that breaks a feature into activities and tasks.
+
+    Attributes:
+        session_id (str): The id of the planning session.
+        project_name (str): The name of the project.
+        project_description (str): The description of the project.
+        feature (WorkItem): The feature to break down.
+    """
+    session_id: str | None
+    project_name: str
+    project_description: str
+    feature: WorkItem
@@ -0,0 +1,229 @@
+"""Users that answer the planning workflow."""
+
+import asyncio
+import itertools
+
+from typing_extensions import TypedDict
+from common import Question
+
+class ConsoleUser():
+    """
+    Represents a user answering the workflow through the console.
+    """
+
+    def show(self, text: str):
+        """
+        Show a message to the user.
+
+        Args:
+            text (str): The message to show.
+        """
+        print(text)
+
+    def ask(self, prompt: str) -> str:
+        """
+        Ask the user for a free text input.
+
+        Args:
+            prompt (str): The prompt to show.
+
+        Returns:
+            str: The text entered by the user.
+        """
+        return input(prompt)
+
+    def answer(self, question: Question, prompt: str) -> str:
+        """
+        Ask the user to answer a question.
+
+        Args:
+            question (Question): The question to answer.
+            prompt (str): The prompt to show.
+
+        Returns:
+            str: The answer entered by the user.
+        """
+        return input(prompt)
+
+    def confirm(self, prompt: str) -> bool:
+        """
+        Ask the user a yes or no question.
+
+        Args:
+            prompt (str): The prompt to show.
+
+        Returns:
+            bool: True if the user answered yes.
+        """
+        return (input(prompt) or "n")[0].lower() == "y"
+
+    async def ashow(self, text: str):
+        """Show a message to the user."""
+        self.show(text)
+
+    async def aask(self, prompt: str) -> str:
+        """Ask the user for a free text input without blocking the event loop."""
+        return await asyncio.to_thread(self.ask, prompt)
+
+    async def aanswer(self, question: Question, prompt: str) -> str:
+        """Ask the user to answer a question without blocking the event loop."""
+        return await asyncio.to_thread(self.answer, question, prompt)
+
+    async def aconfirm(self, prompt: str) -> bool:
+        """Ask the user a yes or no question without blocking the event loop."""
+        return await asyncio.to_thread(self.confirm, prompt)
+
+class ScriptedUser():
+    """
+    Represents a user answering the workflow from pre-supplied answers, without any console interaction.
+
+    Answers given as a dictionary are matched by question text, answers given as a list
+    are used in order. Questions without a scripted answer accept the analyst proposal
+    (never the answer of a past project) and the analysis finishes when the answers run
+    out or after `max_rounds` questionnaires.
+
+    Attributes:
+        answers (dict[str, str] | list[str]): The pre-supplied answers.
+        max_rounds (int): The maximum number of questionnaires to answer.
+        rounds (int): The number of questionnaires answered so far.
+    """
+
+    def __init__(self, answers: dict[str, str] | list[str] | None = None, max_rounds: int = 3):
+        self.answers = answers or []
+        self.max_rounds = max_rounds
+        self.rounds = 0
+        self._next = 0
+
+    def show(self, text: str):
+        """Ignore the messages to the user."""
+
+    def ask(self, prompt: str) -> str:
+        """Return an empty text for free text inputs."""
+        return ''
+
+    def answer(self, question: Question, prompt: str) -> str:
+        """
+        Answer a question from the pre-supplied answers.
+
+        Args:
+            question (Question): The question to answer.
+            prompt (str): The prompt that would be shown.
+
+        Returns:
+            str: The scripted answer or an empty string to accept the analyst proposal.
+        """
+        if isinstance(self.answers, dict):
+            return self.answers.get(question['text'], '')
+        if self._next < len(self.answers):
+            self._next += 1
+            return self.answers[self._next - 1]
+        return ''
+
+    def confirm(self, prompt: str) -> bool:
+        """
+        Decide whether the analysis should finish.
+
+        Args:
+            prompt (str): The prompt that would be shown.
+
+        Returns:
+            bool: True when the answers are exhausted or the maximum number of rounds is reached.
+        """
+        self.rounds += 1
+        exhausted = isinstance(self.answers, list) and self._next >= len(self.answers)
+        return exhausted or self.rounds >= self.max_rounds
+
+    async def ashow(self, text: str):
+        """Ignore the messages to the user."""
+
+    async def aask(self, prompt: str) -> str:
+        """Return an empty text for free text inputs."""
+        return self.ask(prompt)
+
+    async def aanswer(self, question: Question, prompt: str) -> str:
+        """Answer a question from the pre-supplied answers."""
+        return self.answer(question, prompt)
+
+    async def aconfirm(self, prompt: str) -> bool:
+        """Decide whether the analysis should finish."""
+        return self.confirm(prompt)
+
+class Prompt(TypedDict):
+    """
+    Represents an input requested from the user of a session.
+
+    Attributes:
+        id (int): The sequence number of the prompt in the session.
+        kind (str): "text" for a free text input, "question" for a question, or "confirm" for a yes or no question.
+        text (str): The prompt to show.
+        question (Question | None): The question to answer, for "question" prompts.
+    """
+    id: int
+    kind: str
+    text: str
+    question: Question | None
+
+class SessionUser():
+    """
+    Represents a user answering the workflow through the session API of the planning service.
+
+    Every input requested by the workflow is published as a Prompt and waits for the reply
+    sent through the service. The async methods are used by the async nodes; the sync
+    methods can be called from worker threads and wait on the event loop of the session.
+
+    Attributes:
+        prompts (asyncio.Queue[Prompt]): The prompts waiting for a reply.
+        messages (list[str]): The messages shown to the user.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop | None = None):
+        self.prompts = asyncio.Queue()
+        self.messages = list[str]()
+        self._replies = asyncio.Queue()
+        self._loop = loop or asyncio.get_running_loop()
+        self._ids = itertools.count(1)
+
+    async def reply(self, text: str):
+        """
+        Reply to the pending prompt.
+
+        Args:
+            text (str): The answer of the user.
+        """
+        await self._replies.put(text)
+
+    async def _request(self, kind: str, text: str, question: Question | None = None) -> str:
+        await self.prompts.put(Prompt(id=next(self._ids), kind=kind, text=text, question=question))
+        return await self._replies.get()
+
+    async def ashow(self, text: str):
+        """Record a message to the user."""
+        self.messages.append(text)
+
+    async def aask(self, prompt: str) -> str:
+        """Wait for a free text reply."""
+        return await self._request('text', prompt)
+
+    async def aanswer(self, question: Question, prompt: str) -> str:
+        """Wait for the answer to a question."""
+        return await self._request('question', prompt, question)
+
+    async def aconfirm(self, prompt: str) -> bool:
+        """Wait for a yes or no reply."""
+        return ((await self._request('confirm', prompt)) or "n")[0].lower() == "y"
+
+    def show(self, text: str):
+        """Record a message to the user."""
+        self.messages.append(text)
+
+    def ask(self, prompt: str) -> str:
+        """Wait for a free text reply from a worker thread."""
+        return asyncio.run_coroutine_threadsafe(self.aask(prompt), self._loop).result()
+
+    def answer(self, question: Question, prompt: str) -> str:
+        """Wait for the answer to a question from a worker thread."""
+        return asyncio.run_coroutine_threadsafe(self.aanswer(question, prompt), self._loop).result()
+
+    def confirm(self, prompt: str) -> bool:
+        """Wait for a yes or no reply from a worker thread."""
+        return asyncio.run_coroutine_threadsafe(self.aconfirm(prompt), self._loop).result()
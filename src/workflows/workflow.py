@@ -1,10 +1,16 @@
 """Planning workflow."""
 
+import os
+
 from dotenv import load_dotenv
 from langgraph.graph import StateGraph, END
 from workflows.states import AnalysisState
 from workflows.nodes import PlanningNodes
-from crews.crew import AnalysisCrew, ReportingCrew
+from workflows.pipelining import PipelinedAnalysis
+from workflows.scheduling import RoundScheduler
+from crews.crew import AnalysisCrew, ReportingCrew, RequirementsCrew, WorkCrew
+from crews.speculation import SpeculativeAnalysis
+from tracing import traced
 
 load_dotenv()
 
@@ -18,30 +24,104 @@ class PlaningWorkflow():
 
     Attributes:
         app: The compiled workflow application.
+        speculation (SpeculativeAnalysis | None): The speculative analysis rounds, if enabled.
+        scheduler (RoundScheduler): Decides after each analysis round whether the analysis continues.
 
     Methods:
         __init__: Initializes the PlaningWorkflow class.
     """
 
-    def __init__(self):
-        nodes = PlanningNodes()
-        workflow = StateGraph(AnalysisState)
+    def __init__(
+            self,
+            checkpointer=None,
+            user=None,
+            pipelined: bool | None = None,
+            llm=None,
+            speculative: bool | None = None,
+            asynchronous: bool = False,
+            scheduler: RoundScheduler | None = None):
+        """
+        Initializes the PlaningWorkflow class.
 
-        workflow.add_node("start_project", nodes.start_project)
-        workflow.add_node("analyze_description", AnalysisCrew().kickoff)
-        workflow.add_node("query_user", nodes.query_user)
-        workflow.add_node("generate_report", ReportingCrew().kickoff)
+        Args:
+            checkpointer (BaseCheckpointSaver, optional): Stores a checkpoint of the session after each node.
+            user (ConsoleUser | ScriptedUser, optional): The user answering the workflow. Defaults to the console.
+            pipelined (bool, optional): Ask the questions while the analyst is still generating them.
+                Defaults to the PIPELINED_ANALYSIS environment variable.
+            llm (BaseLanguageModel, optional): A model for dedicated crews (e.g. a stub for benchmarks).
+                Defaults to the crews shared by the process.
+            speculative (bool, optional): Start the next analysis round in the background while the user answers.
+                Ignored in pipelined mode. Defaults to the SPECULATIVE_ANALYSIS environment variable.
+            asynchronous (bool, optional): Use the async variants of the nodes, to run the workflow with `ainvoke`
+                (e.g. many sessions of the planning service on one event loop).
+            scheduler (RoundScheduler, optional): Decides after each analysis round whether the analysis continues.
+                Defaults to the limits of the ANALYSIS_* environment variables.
+        """
+        if pipelined is None:
+            pipelined = (os.environ.get('PIPELINED_ANALYSIS') or '').lower() in ('1', 'true', 'yes')
+        if speculative is None:
+            speculative = SpeculativeAnalysis.enabled()
+        analysis_crew = AnalysisCrew(llm=llm) if llm is not None else AnalysisCrew.shared()
+        self.scheduler = scheduler or RoundScheduler.from_env()
+        self.speculation = SpeculativeAnalysis(analysis_crew) if speculative and not pipelined else None
+        nodes = PlanningNodes(user, speculate=self.speculation.submit if self.speculation else None)
+        requirements_crew = RequirementsCrew(llm=llm) if llm is not None else RequirementsCrew.shared()
+        work_crew = WorkCrew(llm=llm) if llm is not None else WorkCrew.shared()
+        reporting_crew = ReportingCrew(llm=llm) if llm is not None else ReportingCrew.shared()
+        workflow = StateGraph(AnalysisState)
 
+        start_project = nodes.astart_project if asynchronous else nodes.start_project
+        workflow.add_node("start_project", traced("start_project", start_project))
+        workflow.add_node("define_requirements", traced("define_requirements", nodes.define_requirements))
+        workflow.add_node("identify_business_requirements", traced(
+            "identify_business_requirements", requirements_crew.business_requirements))
+        workflow.add_node("identify_system_requirements", traced(
+            "identify_system_requirements", requirements_crew.system_requirements))
+        workflow.add_node("join_requirements", traced("join_requirements", nodes.join_requirements))
+        workflow.add_node("identify_features", traced("identify_features", work_crew.identify_features))
+        workflow.add_node("decompose_feature", traced("decompose_feature", work_crew.decompose_feature))
+        workflow.add_node("join_work", traced("join_work", nodes.join_work))
+        generate_report = reporting_crew.akickoff if asynchronous else reporting_crew.kickoff
+        workflow.add_node("generate_report", traced("generate_report", generate_report))
         workflow.set_entry_point("start_project")
         workflow.add_edge('start_project', "analyze_description")
-        workflow.add_edge("analyze_description", "query_user")
-        workflow.add_conditional_edges(
-            'query_user',
-             nodes.has_answers,
-             {
-                "CONTINUE": 'analyze_description',
-                "FINISH": 'generate_report',
-            })
+
+        if pipelined:
+            workflow.add_node("analyze_description", traced("analyze_description", PipelinedAnalysis(analysis_crew, nodes)))
+            workflow.add_conditional_edges(
+                'analyze_description',
+                 self.scheduler.decide,
+                 {
+                    "CONTINUE": 'analyze_description',
+                    "FINISH": 'define_requirements',
+                })
+        else:
+            analyze = self.speculation or analysis_crew
+            analyze = analyze.akickoff if asynchronous else analyze.kickoff
+            query_user = nodes.aquery_user if asynchronous else nodes.query_user
+            workflow.add_node("analyze_description", traced("analyze_description", analyze))
+            workflow.add_node("query_user", traced("query_user", query_user))
+            workflow.add_conditional_edges(
+                'analyze_description',
+                 self.scheduler.decide,
+                 {
+                    "CONTINUE": 'query_user',
+                    "FINISH": 'define_requirements',
+                })
+            workflow.add_conditional_edges(
+                'query_user',
+                 nodes.has_answers,
+                 {
+                    "CONTINUE": 'analyze_description',
+                    "FINISH": 'define_requirements',
+                })
+        workflow.add_edge("define_requirements", "identify_business_requirements")
+        workflow.add_edge("define_requirements", "identify_system_requirements")
+        workflow.add_edge(["identify_business_requirements", "identify_system_requirements"], "join_requirements")
+        workflow.add_edge("join_requirements", "identify_features")
+        workflow.add_conditional_edges("identify_features", nodes.plan_work, ["decompose_feature", "join_work"])
+        workflow.add_edge("decompose_feature", "join_work")
+        workflow.add_edge("join_work", "generate_report")
         workflow.add_edge("generate_report", END)
 
-        self.app = workflow.compile()
+        self.app = workflow.compile(checkpointer=checkpointer)